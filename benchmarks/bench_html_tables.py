@@ -0,0 +1,110 @@
+# benchmark of table extraction on saved pro football reference pages
+# compares the full beautifulsoup parse the scrapers used to do with html_tables.extract_table
+#
+# usage: python -m benchmarks.bench_html_tables [page.htm ...]
+# without arguments, pages saved in the response cache are used, or synthetic pages when the cache is empty
+
+import os
+import sys
+import glob
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import src.data.html_tables as ht
+import src.data.webscraping_functions as wf
+import src.data.datasets as ds
+import pfr_pages
+
+
+def soup_parse(page: str, table_id: str) -> pd.DataFrame:
+    """
+    The previous scraper: a full parse tree of the page, every cell of the table as a string
+    """
+
+    from bs4 import BeautifulSoup
+
+    table = BeautifulSoup(page, 'html.parser').find('table', {'id': table_id})
+    rows = table.find_all('tr')
+    headers = [th.text.strip() for th in rows[0].find_all('th')[1:]]
+    data = [[cell.text.strip() for cell in row.find_all('td')] for row in rows[1:]]
+    return pd.DataFrame([row for row in data if len(row) == len(headers)])
+
+
+def extract(page: str, table_id: str) -> pd.DataFrame:
+    if table_id == 'team_stats':
+        return ht.extract_table(page, table_id, wf.DEFENSE_COLUMNS, numeric = wf.DEFENSE_NUMERIC)
+    return ht.extract_table(page, table_id, wf.PASSING_COLUMNS, numeric = ('pass_yards',))
+
+
+def measure(function, *args, repeat: int = 5):
+    """
+    Returns the best wall time of repeat calls, and the peak traced memory of one call
+    """
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def synthetic_pages() -> list:
+    """
+    Synthetic pages padded with commented out tables, to roughly the size of the live pages
+    """
+
+    defense = pd.read_csv(os.path.join(ds.DATA_DIR, 'raw', 'defense', '2023_nfl_defense_data.txt'))
+    rows = [{'name': f'Player {i}', 'team': 'GNB', 'games': 17, 'pass_yards': 3000 + i} for i in range(110)]
+
+    filler = ''.join(
+        pfr_pages.defense_page(defense.values.tolist(), commented = True).replace('id="team_stats"', f'id="filler_{i}"')
+        for i in range(12)
+        )
+
+    return [
+        ('synthetic opp.htm', filler + pfr_pages.defense_page(defense.values.tolist()), 'team_stats'),
+        ('synthetic passing.htm', filler + pfr_pages.passing_page(rows), 'passing'),
+        ]
+
+
+def saved_pages(paths: list) -> list:
+    pages = []
+    for path in paths:
+        with open(path, encoding = 'utf-8', errors = 'replace') as file:
+            page = file.read()
+        for table_id in ('team_stats', 'passing'):
+            if f'id="{table_id}"' in page:
+                pages.append((os.path.basename(path), page, table_id))
+    return pages
+
+
+def main(paths: list):
+
+    if not paths:
+        paths = glob.glob(os.path.join(ds.CACHE_DIR, 'http', '*.html'))
+
+    pages = saved_pages(paths) or synthetic_pages()
+
+    print(f"{'page':<28}{'size':>9}{'soup ms':>10}{'extract ms':>12}{'speedup':>9}{'soup peak':>11}{'extract peak':>14}")
+
+    for name, page, table_id in pages:
+        soup_time, soup_peak = measure(soup_parse, page, table_id)
+        extract_time, extract_peak = measure(extract, page, table_id)
+
+        print(f"{name[:27]:<28}{len(page) // 1024:>7}kB{soup_time * 1000:>10.1f}{extract_time * 1000:>12.2f}"
+              f"{soup_time / extract_time:>8.0f}x{soup_peak / 2 ** 20:>9.1f}MB{extract_peak / 2 ** 20:>12.2f}MB")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
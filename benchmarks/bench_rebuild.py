@@ -0,0 +1,77 @@
+# benchmark of a full 2005-2024 scrape against the local pro football reference stand-in
+# every scenario starts from an empty response cache, and reports the wall time, the requests the
+# server saw, and how many of them were throttled or failed and retried
+#
+# usage: python -m benchmarks.bench_rebuild [--latency 0.05] [--error-rate 0.05]
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import src.data.http_client as hc
+import src.data.response_cache as rc
+import src.data.webscraping_functions as wf
+from pfr_server import PFRServer, rendered_pages
+
+YEARS = range(2005, 2025)
+
+# (name, scrape_many workers, client settings, server settings)
+SCENARIOS = [
+    ('sequential', 1, {'max_connections': 1, 'interval': 0}, {}),
+    ('concurrent', 8, {'max_connections': 4, 'interval': 0}, {}),
+    ('rate limited client', 8, {'max_connections': 2, 'interval': 0.1}, {}),
+    ('throttled server', 8, {'max_connections': 4, 'interval': 0}, {'rate_limit': (10, 1.0), 'retry_after': 0.5}),
+]
+
+
+def rebuild(server: PFRServer, workers: int, client: hc.Client) -> float:
+    """
+    Scrapes every season's defense and passing pages into an empty response cache, returns the wall time
+    """
+
+    previous = rc.default_cache()
+
+    with tempfile.TemporaryDirectory() as directory:
+        rc.configure(directory = directory)
+        wf._parsed.clear()
+
+        try:
+            start = time.perf_counter()
+            for scraper in (wf.scrape_def, wf.scrape_pass):
+                for _ in wf.scrape_many(YEARS, scraper, max_workers = workers, client = client, base_url = server.url):
+                    pass
+            return time.perf_counter() - start
+
+        finally:
+            rc._cache = previous
+
+
+def main(argv: list):
+    parser = argparse.ArgumentParser(description = 'full rebuild against a local pro football reference')
+    parser.add_argument('--latency', type = float, default = 0.05, help = 'seconds per response')
+    parser.add_argument('--error-rate', type = float, default = 0.0, help = 'share of 503 responses')
+    args = parser.parse_args(argv)
+
+    pages = rendered_pages(YEARS)
+
+    print(f"{'scenario':<22}{'seconds':>9}{'requests':>10}{'429':>6}{'5xx':>6}{'in flight':>11}")
+
+    for name, workers, client_settings, server_settings in SCENARIOS:
+        client = hc.Client(backoff = 0.1, **client_settings)
+
+        with PFRServer(pages, latency = args.latency, error_rate = args.error_rate, **server_settings) as server:
+            seconds = rebuild(server, workers, client)
+            statuses = server.statuses()
+
+        client.close()
+
+        print(f"{name:<22}{seconds:>9.2f}{len(statuses):>10}{statuses.count(429):>6}"
+              f"{sum(status >= 500 for status in statuses):>6}{server.max_in_flight:>11}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
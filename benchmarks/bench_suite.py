@@ -0,0 +1,221 @@
+# timing and memory benchmarks of the model and the database build on synthetic leagues
+# every case runs at each size, reports its best wall time and the peak traced memory of one call,
+# and is compared against the stored baseline, so a slowdown past the tolerance fails the run
+#
+# usage: python -m benchmarks.bench_suite [--sizes 1e3 1e4 1e5] [--cases over_under ...]
+#                                         [--baseline benchmarks/baseline.json] [--tolerance 0.5] [--update]
+# sizes go up to 1e7 rows, the database cases stop at DB_MAX_ROWS
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+import benchmarks.synthetic as syn
+import src.data.database_functions as dbf
+import src.statistics.bayes as bayes
+import src.statistics.statistical_functions as sf
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+SIZES = [10 ** 3, 10 ** 4, 10 ** 5]
+
+# game log files and sqlite tables past this many rows take minutes to build
+DB_MAX_ROWS = 10 ** 6
+
+# share a case may be slower, or use more memory, than its baseline
+TOLERANCE = 0.5
+
+LINE = 250.5
+
+
+def condition_indices(size: int, workdir: str):
+    df = syn.league(size)
+    return lambda: sf.condition_indices(df, ('weighted_yards', 'geq', LINE)), None
+
+
+def conditional_probability(size: int, workdir: str):
+    df = syn.league(size)
+    conditions = [('weighted_yards', 'geq', LINE), ('def_rk', 'leq', 10)]
+    return lambda: sf.conditional_probability(df, conditions), None
+
+
+def last_n_avg(size: int, workdir: str):
+    df = syn.league(size)
+    return lambda: bayes.last_n_avg(df.copy(deep = False), 6, 'weighted_yards', '6_game_avg', 'name'), None
+
+
+def over_under(size: int, workdir: str):
+    df = syn.league(size)
+    qb = df['name'].iloc[0]
+
+    # every call categorizes the players again, as for a new line
+    return lambda: bayes.over_under(df, qb, LINE, 6, 280, log = False), bayes.clear_category_cache
+
+
+def create_gamelogs(size: int, workdir: str):
+    directory = os.path.join(workdir, 'gamelogs')
+    template = os.path.join(workdir, 'defense.db')
+
+    syn.write_gamelogs(directory, size)
+    for year in range(syn.FIRST_YEAR, syn.LAST_YEAR + 1):
+        dbf.add_defense(template, 'defense_stats', year, syn.defense_season(year))
+    dbf.calculate_weights(template, 'defense_stats')
+
+    database = os.path.join(workdir, 'gamelogs.db')
+
+    # a full build every call, into a fresh copy of the defense database
+    def reset():
+        shutil.copy(template, database)
+
+    return lambda: dbf.create_gamelogs(directory, database, 'gamelogs', 'defense_stats', return_frame = False), reset
+
+
+def calculate_weights(size: int, workdir: str):
+    template = os.path.join(workdir, 'weights.db')
+    syn.defense_stats(template, 'defense_stats', size)
+
+    database = os.path.join(workdir, 'defense.db')
+
+    # every weight is computed from scratch every call
+    def reset():
+        shutil.copy(template, database)
+
+    return lambda: dbf.calculate_weights(database, 'defense_stats'), reset
+
+
+CASES = {
+    'condition_indices': condition_indices,
+    'conditional_probability': conditional_probability,
+    'last_n_avg': last_n_avg,
+    'over_under': over_under,
+    'create_gamelogs': create_gamelogs,
+    'calculate_weights': calculate_weights,
+}
+
+DB_CASES = ('create_gamelogs', 'calculate_weights')
+
+
+def measure(function, reset = None, repeat: int = 5) -> tuple[float, int]:
+    """
+    Returns the best wall time of repeat calls, and the peak traced memory of one call.
+    reset runs untimed before every call
+    """
+
+    best = float('inf')
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    if reset is not None:
+        reset()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def run(cases: list, sizes: list) -> dict:
+    """
+    Runs every case at every size
+
+    Returns:
+        dict: {'case/size': {'seconds': best wall time, 'peak_bytes': peak traced memory}}
+    """
+
+    results = {}
+
+    for size in sizes:
+        for case in cases:
+            if case in DB_CASES and size > DB_MAX_ROWS:
+                continue
+
+            with tempfile.TemporaryDirectory() as workdir:
+                function, reset = CASES[case](size, workdir)
+                seconds, peak = measure(function, reset, repeat = 5 if size <= 10 ** 5 else 1)
+
+            results[f'{case}/{size}'] = {'seconds': seconds, 'peak_bytes': peak}
+
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = TOLERANCE) -> list:
+    """
+    Returns the names of the results more than tolerance slower, or heavier, than their baseline
+    """
+
+    regressions = []
+
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+
+        if (result['seconds'] > base['seconds'] * (1 + tolerance)
+                or result['peak_bytes'] > base['peak_bytes'] * (1 + tolerance)):
+            regressions.append(name)
+
+    return regressions
+
+
+def read_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, encoding = 'utf-8') as file:
+        return json.load(file)['results']
+
+
+def write_baseline(path: str, results: dict):
+
+    # results of other cases and sizes are kept
+    merged = {**read_baseline(path), **results}
+
+    with open(path, 'w', encoding = 'utf-8') as file:
+        json.dump({'machine': f'{platform.system()} {platform.machine()}, python {platform.python_version()}',
+                   'results': dict(sorted(merged.items()))}, file, indent = 2)
+        file.write('\n')
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description = 'benchmarks on synthetic leagues')
+    parser.add_argument('--sizes', nargs = '+', type = float, default = SIZES, help = 'rows of game logs')
+    parser.add_argument('--cases', nargs = '+', choices = list(CASES), default = list(CASES))
+    parser.add_argument('--baseline', default = BASELINE)
+    parser.add_argument('--tolerance', type = float, default = TOLERANCE)
+    parser.add_argument('--update', action = 'store_true', help = 'store these results as the baseline')
+    args = parser.parse_args(argv)
+
+    results = run(args.cases, [int(size) for size in args.sizes])
+    baseline = read_baseline(args.baseline)
+    regressions = compare(results, baseline, args.tolerance)
+
+    print(f"{'case':<36}{'ms':>12}{'baseline':>12}{'peak MB':>10}{'baseline':>10}")
+
+    for name, result in results.items():
+        base = baseline.get(name, {})
+        base_ms = f"{base['seconds'] * 1000:.2f}" if base else '-'
+        base_mb = f"{base['peak_bytes'] / 2 ** 20:.1f}" if base else '-'
+        flag = '  slower' if name in regressions else ''
+
+        print(f"{name:<36}{result['seconds'] * 1000:>12.2f}{base_ms:>12}"
+              f"{result['peak_bytes'] / 2 ** 20:>10.1f}{base_mb:>10}{flag}")
+
+    if args.update:
+        write_baseline(args.baseline, results)
+        return 0
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,180 @@
+# deterministic synthetic league data for benchmarks, at any size
+# game logs shaped like all_quarterbacks_weighted.txt, defense seasons with the wf.scrape_def columns the database reads,
+# rows shaped like the defense_stats table, and game log exports shaped like the pro football reference files
+
+import os
+import numpy as np
+import pandas as pd
+
+import src.data.schema as schema
+from src.data.teams import team_abbreviation_dict, abbreviation_team_dict
+
+# the 32 current teams, names that are still what their abbreviation maps to
+TEAMS = [team for team, abbreviation in team_abbreviation_dict.items()
+         if abbreviation_team_dict.get(abbreviation) == team and team not in
+         ('Oakland Raiders', 'San Diego Chargers', 'St. Louis Rams')]
+ABBREVIATIONS = [team_abbreviation_dict[team] for team in TEAMS]
+
+GAMES_PER_PLAYER = 150      # about nine seasons of starts
+WEEKS = 17
+FIRST_YEAR = 2005
+LAST_YEAR = 2024
+
+
+def league(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Game logs of a synthetic league, with the columns and dtypes of ds.load('quarterbacks_weighted')
+
+    Players have GAMES_PER_PLAYER games each, in consecutive blocks of rows like the real file.
+    Yards are normal around a per player mean, so players land on both sides of a line
+
+    Args:
+        rows (int): number of game logs
+        seed (int): the same seed and size always give the same frame
+
+    Returns:
+        Pandas DataFrame: the game logs, with attrs['version'] set like a loaded dataset
+    """
+
+    rows = int(rows)
+    rng = np.random.default_rng(seed)
+
+    players = max(2, -(-rows // GAMES_PER_PLAYER))
+    player = np.arange(rows) * players // rows
+    starts = np.searchsorted(player, np.arange(players))
+    game = np.arange(rows) - starts[player]
+
+    seasons = LAST_YEAR - FIRST_YEAR + 1
+    year = FIRST_YEAR + (game // WEEKS) % seasons
+    week = game % WEEKS + 1
+
+    # every distinct string is built once, and repeated by index
+    names = np.array([f'qb {i:07d}' for i in range(players)], dtype = object)
+    dates = pd.Series(pd.to_datetime([f'{y}-09-08' for y in range(FIRST_YEAR, LAST_YEAR + 1)]))
+    dates = np.array([(date + pd.Timedelta(weeks = w)).strftime('%Y-%m-%d') for date in dates for w in range(WEEKS)],
+                     dtype = object)
+    results = np.array([f'{outcome} {a}-{b}' for outcome in 'WL' for a in range(10, 40, 3) for b in range(7, 35, 3)],
+                       dtype = object)
+    abbreviations = np.array(ABBREVIATIONS, dtype = object)
+
+    player_mean = rng.normal(235, 30, size = players)
+    pass_yards = np.clip(rng.normal(player_mean[player], 75), 0, None).round()
+    def_rk = rng.integers(1, 33, size = rows).astype(float)
+    rank_weights = (1.25 - 0.0125 * def_rk).round(3)
+
+    # columns are built as separate arrays and kept that way, so millions of rows aren't copied again
+    df = pd.DataFrame({
+        'Unnamed: 0': np.arange(rows),
+        'Time': game,
+        'Year': year,
+        'Date': pd.array(dates[(year - FIRST_YEAR) * WEEKS + week - 1], dtype = 'str'),
+        'Week': week,
+        'Tm': pd.array(abbreviations[rng.integers(0, 32, size = players)][player], dtype = 'str'),
+        'Opp': pd.array(abbreviations[rng.integers(0, 32, size = rows)], dtype = 'str'),
+        'Result': pd.array(results[rng.integers(0, len(results), size = rows)], dtype = 'str'),
+        'Home': rng.random(rows) < 0.5,
+        'Started': rng.random(rows) < 0.95,
+        'Att': rng.normal(34, 6, size = rows).round(),
+        'PassYds': pass_yards,
+        'PassTD': rng.poisson(1.5, size = rows).astype(float),
+        'RushYds': rng.poisson(12, size = rows).astype(float),
+        'RushTD': rng.poisson(0.1, size = rows).astype(float),
+        'def_rk': def_rk,
+        'name': pd.array(names[player], dtype = 'str'),
+        'rank_weights': rank_weights,
+        'weighted_yards': (pass_yards * rank_weights).round(2),
+    }, copy = False)
+
+    df.attrs['version'] = f'synthetic-{rows}-{seed}'
+
+    return df
+
+
+def player_logs(players: list, games: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Game logs of a few named players with only the columns the model reads, name and weighted_yards,
+    one block of games per player like the real file. Small frames for tests, where league is for benchmarks
+    """
+
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({
+        'name': np.repeat(players, games),
+        'weighted_yards': rng.normal(240, 60, size = len(players) * games).round(2),
+    })
+
+
+def defense_season(year: int, seed: int = 0) -> pd.DataFrame:
+    """
+    A season of team defense totals, with the columns of wf.scrape_def the database reads
+    """
+
+    rng = np.random.default_rng([seed, year])
+
+    return pd.DataFrame({
+        'Tm': TEAMS,
+        'G': 17,
+        'Yds.1': rng.normal(3700, 400, size = len(TEAMS)).round(),
+    })
+
+
+def defense_stats(database: str, table: str, rows: int, seed: int = 0):
+    """
+    Writes rows of ranked season defenses straight into a defense_stats table, 32 per season, with every
+    weight still 1. Keys are sequential rather than hashed, so tables of millions of rows are quick to build
+    """
+
+    rows = int(rows)
+    rng = np.random.default_rng(seed)
+
+    seasons = -(-rows // len(TEAMS))
+    year = np.repeat(np.arange(seasons), len(TEAMS))[:rows]
+    pyds_allowed = rng.normal(3700, 400, size = rows).round()
+
+    df = pd.DataFrame({
+        'defense_id': [f'defense_{i}' for i in range(rows)],
+        'team': np.tile(TEAMS, seasons)[:rows],
+        'year': year,
+        'pyds_allowed': pyds_allowed,
+        'weight': 1.0,
+    })
+    df['rank'] = df.groupby('year')['pyds_allowed'].rank(method = 'dense').astype(int)
+
+    conn = schema.connect(database)
+    schema.ensure(conn, 'defense_stats', table)
+    with conn:
+        conn.execute(f'DELETE FROM {table}')
+        df.to_sql(table, conn, if_exists = 'append', index = False, chunksize = 100000)
+    conn.close()
+
+
+def write_gamelogs(directory: str, rows: int, seed: int = 0) -> list:
+    """
+    Writes game log exports for a synthetic league, one 'first_last_career.txt' file per player,
+    with the columns create_gamelogs reads. Opponents and years all have a defense_season
+
+    Returns:
+        list: the paths written
+    """
+
+    df = league(rows, seed)
+    os.makedirs(directory, exist_ok = True)
+
+    export = pd.DataFrame({
+        'Rk': df['Time'] + 1,
+        'Year': df['Year'],
+        'Date': df['Date'],
+        'Week': df['Week'],
+        'Tm': df['Tm'],
+        'Opp': df['Opp'],
+        'Result': df['Result'],
+        'Yds': df['PassYds'].astype(int),
+    })
+
+    paths = []
+    for name, games in export.groupby(df['name'], sort = False):
+        path = os.path.join(directory, f"{name.replace(' ', '_')}_career.txt")
+        games.to_csv(path, index = False)
+        paths.append(path)
+
+    return paths
@@ -1,16 +1,29 @@
 # functions for initializing a quarterback passing yards database
 # defensive data included to weight passing yards based on strength of opposition
 
-import sqlite3
 import os
 import numpy as np
 import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import src.data.webscraping_functions as wf
 import src.data.hash as hs
+import src.data.datasets as ds
+import src.data.schema as schema
+import src.instrumentation as inst
+from src.data.teams import team_abbreviation_dict, abbreviation_team_dict
 
+# gamelogs table columns, in table order
+GAMELOG_COLUMNS = ['qb_id', 'year', 'week', 'name', 'team', 'pass_yards', 'opponent',
+                   'defense_id', 'opp_rank', 'weight', 'adjusted_yards']
 
+# aggregated passing stats columns, in table order
+AGG_COLUMNS = ['qb_id', 'year', 'week', 'name', 'team', 'games', 'pass_yards']
 
-def add_defense(database: str, table: str, year: int):
+
+
+@inst.timed()
+def add_defense(database: str, table: str, year: int, df = None, final: bool = False):
 
     """
     Scrapes pro football reference defensive data to create or add to a table in a specified database
@@ -19,12 +32,17 @@ def add_defense(database: str, table: str, year: int):
         - database (str): a sqlite database
         - table (str): a sqlite table
         - year (int): the year of defensive data to be scraped and added to the database table
+        - df (Pandas DataFrame): the season already scraped by wf.scrape_def, scraped here when not given
+        - final (bool): whether the season is over. A season the weekly update (see uf.update_defense) marked
+          in progress stays out of the rank totals until it is added with final set, so a mid season call
+          leaves its partial totals out
 
     Returns: 
         - the sqlite table as a Pandas Dataframe
     """
 
-    df = wf.scrape_def(year)
+    if df is None:
+        df = wf.scrape_def(year)
 
     # keep only the team, and the yards columns
     df = df[['Tm', 'Yds.1']].copy()
@@ -41,22 +59,19 @@ def add_defense(database: str, table: str, year: int):
     # add in a weights column for adjusting qb yards based on strength of defense played
     df['weight'] = 1
     
-    conn = sqlite3.connect(database)
+    conn = schema.connect(database)
 
     # create a table with a primary key for the defense
-    conn.execute(
-                f'CREATE TABLE IF NOT EXISTS {table} (\
-                 defense_id TEXT PRIMARY KEY,\
-                 team TEXT NOT NULL,\
-                 year INTEGER NOT NULL,\
-                 pyds_allowed REAL,\
-                 rank INTEGER,\
-                 weight REAL\
-                 )') 
+    schema.ensure(conn, 'defense_stats', table)
 
     # delete existng rows for the specified year
     conn.execute(f'DELETE FROM {table} WHERE year = ?', (year,))
 
+    # a finished season replaces any season to date rows of the weekly update, and counts in the rank totals
+    if final:
+        schema.ensure(conn, 'season_progress', f'{table}_in_progress')
+        conn.execute(f'DELETE FROM {table}_in_progress WHERE year = ?', (year,))
+
     # write the dataframe to the sqlite table
     df.to_sql(table, conn, if_exists = 'append', index = False)
     conn.commit()
@@ -65,120 +80,210 @@ def add_defense(database: str, table: str, year: int):
     return df.reset_index(inplace = True)
 
 
-def calculate_weights(database: str, table: str):
+@inst.timed()
+def calculate_weights(database: str, table: str, year: int = None):
 
     """
     Calculates weights for stat adjustment in any table with defenseive stats and rankings by that stat
 
+    A defense's weight is the league average of the stat over the average of every defense with the same rank.
+    The sum and count of the stat for every season and rank are kept in a '{table}_rank_totals' table,
+    so after adding one season only that season's totals are aggregated again, and the weights are
+    written in place with a single update
+
     Args:
         - database (str): a sqlite database
         - table (str): a sqlite table with defensive stats, and rankings by that stat
+        - year (int): the only season added or changed since the last call, every season is aggregated when not given
 
     Returns:
         - the sqlite table as a pandas dataframe
     """
 
-    conn = sqlite3.connect(database)
-
-    query = f'''
-    SELECT 
-        ds.defense_id, 
-        ds.team, ds.year, 
-        ds.pyds_allowed, 
-        ds.rank, 
-        (SELECT AVG(pyds_allowed) FROM {table}) / ra.ranked_average AS weight 
-    FROM 
-        {table} ds 
-    JOIN 
-        (SELECT rank, AVG(pyds_allowed) AS ranked_average FROM {table} GROUP BY rank) ra 
-    ON 
-        ds.rank = ra.rank
-    ''' 
-
-    df = pd.read_sql_query(query, conn)
-    
-    df.to_sql(table, conn, if_exists = 'replace', index = False)
-    
-    conn.commit()
+    conn = schema.connect(database)
+    schema.ensure(conn, 'defense_stats', table)
+
+    with conn:
+        totals = update_rank_totals(conn, table, year)
+
+        conn.execute(f'''
+        WITH 
+            ranked AS (SELECT rank, SUM(yards_sum) / SUM(teams) AS ranked_average FROM {totals} GROUP BY rank), 
+            league AS (SELECT SUM(yards_sum) / SUM(teams) AS average FROM {totals}) 
+        UPDATE {table} 
+        SET 
+            weight = league.average / ranked.ranked_average 
+        FROM 
+            ranked, league 
+        WHERE 
+            {table}.rank = ranked.rank 
+            AND {table}.weight IS NOT league.average / ranked.ranked_average 
+        ''')
+
+    df = pd.read_sql_query(f'SELECT defense_id, team, year, pyds_allowed, rank, weight FROM {table}', conn)
     conn.close()
 
     return df
 
 
-def create_gamelogs(directory: str, database: str, table: str, rank_table: str):
+def update_rank_totals(conn, table: str, year: int = None) -> str:
 
     """
-    Compiles qb game logs in csv format into a sqlite database table
+    Refreshes the '{table}_rank_totals' table, the sum and count of yards allowed for every season and rank.
+    Seasons still in progress, recorded in '{table}_in_progress' by the weekly update, are left out
 
     Args:
-        - directory (str): folder where csv gamelogs are stored (pfr prohibits scraping of data of this type)
-        - database (str): a sqlite database
-        - table (str): a sqlite table to be created
-        - rank_table (str): a sqlite table with defensive rankings and weights
+        - conn (sqlite3 connection): an open connection, the refresh joins its current transaction
+        - table (str): a sqlite table with defensive stats, and rankings by that stat
+        - year (int): the only season to aggregate again, every season when not given or when the totals table is new
+
+    Returns:
+        - the name of the totals table
     """
 
-    conn = sqlite3.connect(database)
-    # create table
-    conn.execute(
-                f'''CREATE TABLE IF NOT EXISTS {table} ( 
-                qb_id TEXT PRIMARY KEY,  
-                year INT, 
-                week INT, 
-                name TEXT, 
-                team TEXT NOT NULL,  
-                pass_yards REAL,
-                opponent TEXT,  
-                defense_id TEXT, 
-                opp_rank INTEGER, 
-                weight REAL, 
-                adjusted_yards REAL 
-                 )''') 
-
-    # create dataframe to concatenate individual player data onto
-    game_logs = pd.read_sql_query(f"SELECT * FROM {table}", conn)
-    
-    # loop through the proper directory
-    # add each player to the database table
-    for filename in os.listdir(directory):
-        if filename.endswith('.txt'):
-            file_path = os.path.join(directory, filename)
+    totals = f'{table}_rank_totals'
+    progress = f'{table}_in_progress'
 
-            df = pd.read_csv(file_path)
+    # a new totals table needs every season
+    if schema.ensure(conn, 'rank_totals', totals):
+        year = None
+    schema.ensure(conn, 'season_progress', progress)
 
-            # keep only relevant columns
-            df = df[['Year', 'Week', 'Tm', 'Opp', 'Yds']]
-            df.rename(columns = {'Year': 'year', 'Week': 'week', 'Tm': 'team',
-                                 'Opp': 'opponent', 'Yds': 'pass_yards'}, inplace = True)
+    conn.execute(f'DELETE FROM {totals} WHERE ? IS NULL OR year = ?', (year, year))
+    conn.execute(f'''
+    INSERT INTO {totals} (year, rank, yards_sum, teams) 
+    SELECT year, rank, SUM(pyds_allowed), COUNT(pyds_allowed) 
+    FROM {table} 
+    WHERE (? IS NULL OR year = ?) 
+        AND year NOT IN (SELECT year FROM {progress}) 
+    GROUP BY year, rank 
+    ''', (year, year))
 
-            # find the player name from the filename
-            # filenames are format 'first_last_career.csv
-            name_list = filename.split("_")
-            name = " ".join(name_list[:2])
-            df['name'] = name 
+    return totals
 
-            # format columns
-            df['year'] = df['year'].astype(int)
-            df['week'] = df['week'].astype(int)
 
-            # the data is imported as a team abbreviation, which needs to be mapped to the full team name
-            df['team'] = df['team'].map(abbreviation_team_dict)
-            df['opponent'] = df['opponent'].map(abbreviation_team_dict)
+@inst.timed()
+def create_gamelogs(directory: str, database: str, table: str, rank_table: str,
+                    max_workers: int = 4, return_frame: bool = True):
 
-            # 'rank', 'weight', and 'adjusted_yards' will be assigned to the defenses with a join on defense_id
-            df['opp_rank'] = 0
-            df['weight'] = 0
-            df['adjusted_yards'] = 0
+    """
+    Compiles qb game logs in csv format into a sqlite database table, incrementally
 
-            # add in keys
-            df['qb_id'] = df.apply(lambda row: hs.generate_key(position = 'quarterback', name = row['name']), axis = 1)
-            df['defense_id'] = df.apply(lambda row: hs.generate_key(position = 'defense', team = row['opponent'], year = row['year']), axis = 1)
+    The size, modification time and sha256 of every source file are kept in a '{table}_files'
+    manifest table. Only new or changed files are parsed, their rows are upserted on
+    (qb_id, year, week), and the rows of files that are gone are deleted, so re-running after
+    one file changed only costs that file. When files share a key the file read last holds the row, and
+    a '{table}_overlaps' table records the files it took rows from, so they are read again for those
+    rows once it is changed or gone. Changed files are parsed in parallel and streamed into
+    the table with executemany inside a single transaction, then the defensive rank, weight and
+    adjusted yards are joined in sql for the rows that need them
 
-            # concatenate the dataframe
-            game_logs = pd.concat([game_logs, df])
+    Args:
+        - directory (str): folder where csv gamelogs are stored (pfr prohibits scraping of data of this type)
+        - database (str): a sqlite database
+        - table (str): a sqlite table to be created or updated
+        - rank_table (str): a sqlite table with defensive rankings and weights
+        - max_workers (int): files parsed at the same time
+        - return_frame (bool): read the joined game logs back as a dataframe
 
-    # handle null values
+    Returns:
+        - the game logs joined with the defensive rankings as a pandas dataframe, or None
+    """
 
-    game_logs.to_sql(table, conn, if_exists = "replace", index = False)
+    manifest = f'{table}_files'
+    overlaps = f'{table}_overlaps'
+
+    conn = schema.connect(database)
+
+    # a new game log table has none of the manifest's files
+    if schema.ensure(conn, 'gamelogs', table):
+        conn.execute(f'DROP TABLE IF EXISTS {manifest}')
+        conn.execute(f'DROP TABLE IF EXISTS {overlaps}')
+    schema.ensure(conn, 'gamelog_files', manifest)
+    schema.ensure(conn, 'gamelog_overlaps', overlaps)
+
+    files = {filename: os.stat(os.path.join(directory, filename))
+             for filename in sorted(os.listdir(directory)) if filename.endswith('.txt')}
+    known = {path: (size, mtime_ns, sha256) for path, size, mtime_ns, sha256
+             in conn.execute(f'SELECT path, size, mtime_ns, sha256 FROM {manifest}')}
+
+    removed = [path for path in known if path not in files]
+    changed = {}
+    touched = {}
+
+    for filename, stat in files.items():
+        entry = known.get(filename)
+
+        if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            continue
+
+        # touched files are only re-read when their contents changed
+        sha256 = ds.file_hash(os.path.join(directory, filename))
+        if entry is not None and entry[2] == sha256:
+            touched[filename] = (stat.st_size, stat.st_mtime_ns, sha256)
+        else:
+            changed[filename] = (stat.st_size, stat.st_mtime_ns, sha256)
+
+    upsert = schema.upsert_query(table, GAMELOG_COLUMNS + ['source'], ['qb_id', 'year', 'week'])
+    columns = ', '.join(GAMELOG_COLUMNS + ['source'])
+    insert_missing = f"INSERT INTO {table} ({columns}) VALUES ({', '.join('?' * (len(GAMELOG_COLUMNS) + 1))}) " \
+                     f"ON CONFLICT (qb_id, year, week) DO NOTHING"
+    record = f'INSERT OR REPLACE INTO {manifest} (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)'
+    overlap = f'INSERT OR IGNORE INTO {overlaps} (path, displaced_by) VALUES (?, ?)'
+
+    # files that lost rows to a file whose rows are deleted
+    displaced = set()
+
+    def release(path):
+        displaced.update(row[0] for row in conn.execute(f'SELECT path FROM {overlaps} WHERE displaced_by = ?', (path,)))
+        conn.execute(f'DELETE FROM {overlaps} WHERE displaced_by = ?', (path,))
+        conn.execute(f'DELETE FROM {table} WHERE source = ?', (path,))
+
+    with conn:
+        for path in removed:
+            release(path)
+            conn.execute(f'DELETE FROM {overlaps} WHERE path = ?', (path,))
+            conn.execute(f'DELETE FROM {manifest} WHERE path = ?', (path,))
+
+        # add each player to the database table as their file is parsed
+        paths = [os.path.join(directory, filename) for filename in changed]
+        with inst.span('read_gamelogs') as stage:
+            stage.rows = 0
+            for filename, df in zip(changed, _bounded_map(read_gamelog, paths, max_workers)):
+
+                # games dropped from a file go with the file's old rows
+                release(filename)
+
+                # the file takes over the rows other files hold for its games
+                conn.executemany(overlap, [(owner, filename) for owner in _key_owners(conn, table, df, filename)])
+
+                df['source'] = filename
+                conn.executemany(upsert, df.itertuples(index = False, name = None))
+                conn.execute(record, (filename, *changed[filename]))
+                stage.rows += len(df)
+
+            # unchanged files get back the rows they lost, rows other files hold are kept
+            restored = [filename for filename in sorted(displaced) if filename in files and filename not in changed]
+            paths = [os.path.join(directory, filename) for filename in restored]
+            for filename, df in zip(restored, _bounded_map(read_gamelog, paths, max_workers)):
+                conn.executemany(overlap, [(filename, owner) for owner in _key_owners(conn, table, df, filename)])
+
+                df['source'] = filename
+                conn.executemany(insert_missing, df.itertuples(index = False, name = None))
+                stage.rows += len(df)
+
+        for filename, entry in touched.items():
+            conn.execute(record, (filename, *entry))
+
+        # rows carried over from before the manifest existed, that no file claimed
+        conn.execute(f'DELETE FROM {table} WHERE source IS NULL')
+
+        # 'rank', 'weight', and 'adjusted_yards' are assigned to the defenses with a join on defense_id
+        join_defenses(conn, table, rank_table)
+
+    if not return_frame:
+        conn.close()
+        return None
 
     query = f"""
     SELECT 
@@ -190,9 +295,9 @@ def create_gamelogs(directory: str, database: str, table: str, rank_table: str):
         gl.pass_yards, 
         gl.opponent, 
         gl.defense_id, 
-        ds.rank AS opp_rank, 
-        ds.weight AS weight, 
-        gl.pass_yards * ds.weight AS adjusted_yards 
+        gl.opp_rank, 
+        gl.weight, 
+        gl.adjusted_yards 
     FROM 
         {table} gl 
     JOIN 
@@ -201,81 +306,196 @@ def create_gamelogs(directory: str, database: str, table: str, rank_table: str):
     """
 
     game_logs = pd.read_sql_query(query, conn)
-    conn.commit()
     conn.close()
 
     return game_logs
 
 
+@inst.timed()
+def join_defenses(conn, table: str, rank_table: str, year: int = None):
+
+    """
+    Assigns the opponent's rank, weight, and the adjusted yards to game logs, with a join on defense_id.
+    Only new rows and rows whose defense was re-ranked or re-weighted are written
+
+    Args:
+        - conn (sqlite3 connection): an open connection, the update joins its current transaction
+        - table (str): a sqlite table of game logs
+        - rank_table (str): a sqlite table with defensive rankings and weights
+        - year (int): only join games of this season, every season when not given
+    """
+
+    conn.execute(f"""
+    UPDATE {table} 
+    SET 
+        opp_rank = ds.rank, 
+        weight = ds.weight, 
+        adjusted_yards = {table}.pass_yards * ds.weight 
+    FROM 
+        {rank_table} ds 
+    WHERE 
+        {table}.defense_id = ds.defense_id 
+        AND (? IS NULL OR {table}.year = ?) 
+        AND ({table}.opp_rank IS NOT ds.rank 
+             OR {table}.weight IS NOT ds.weight 
+             OR {table}.adjusted_yards IS NOT {table}.pass_yards * ds.weight) 
+    """, (year, year))
+
+
+def read_gamelog(file_path: str):
+
+    """
+    Reads and formats a single pro football reference game log export
+
+    Args:
+        - file_path (str): a csv game log, named 'first_last_career.txt'
+
+    Returns:
+        - a pandas dataframe with the GAMELOG_COLUMNS columns
+    """
+
+    df = pd.read_csv(file_path)
+
+    # keep only relevant columns
+    df = df[['Year', 'Week', 'Tm', 'Opp', 'Yds']]
+    df = df.rename(columns = {'Year': 'year', 'Week': 'week', 'Tm': 'team',
+                              'Opp': 'opponent', 'Yds': 'pass_yards'})
+
+    # find the player name from the filename
+    # filenames are format 'first_last_career.csv
+    name_list = os.path.basename(file_path).split("_")
+    name = " ".join(name_list[:2])
+    df['name'] = name 
+
+    # format columns
+    df['year'] = df['year'].astype(int)
+    df['week'] = df['week'].astype(int)
+    df['pass_yards'] = df['pass_yards'].astype(float)
+
+    # the data is imported as a team abbreviation, which needs to be mapped to the full team name
+    df['team'] = df['team'].map(abbreviation_team_dict)
+    df['opponent'] = df['opponent'].map(abbreviation_team_dict)
+
+    # 'rank', 'weight', and 'adjusted_yards' will be assigned to the defenses with a join on defense_id
+    df['opp_rank'] = 0
+    df['weight'] = 0
+    df['adjusted_yards'] = 0
+
+    # add in keys, hashing each distinct defense once
+    df['qb_id'] = hs.generate_key(position = 'quarterback', name = name)
+    codes, defenses = pd.MultiIndex.from_arrays([df['opponent'], df['year']]).factorize()
+    keys = np.array([hs.generate_key(position = 'defense', team = team, year = year) for team, year in defenses] + [None])
+    df['defense_id'] = keys[codes]
+
+    # sqlite takes None for nulls
+    df = df[GAMELOG_COLUMNS].astype(object)
+    return df.where(df.notnull(), None)
+
+
+def _key_owners(conn, table: str, df, source: str) -> set:
+
+    """
+    Returns the files other than source holding rows of a game log table with the (qb_id, year, week) keys of a frame
+    """
+
+    # a file holds one player's games, usually no other file has rows of that player
+    players = list(df['qb_id'].dropna().unique())
+    others = conn.execute(f"SELECT 1 FROM {table} WHERE qb_id IN ({', '.join('?' * len(players))}) AND source <> ? LIMIT 1",
+                          (*players, source)).fetchone()
+    if others is None:
+        return set()
+
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS gamelog_keys (qb_id TEXT, year INTEGER, week INTEGER)')
+    conn.execute('DELETE FROM temp.gamelog_keys')
+    conn.executemany('INSERT INTO temp.gamelog_keys (qb_id, year, week) VALUES (?, ?, ?)',
+                     df[['qb_id', 'year', 'week']].itertuples(index = False, name = None))
+
+    return {row[0] for row in conn.execute(f'''
+    SELECT DISTINCT gl.source 
+    FROM temp.gamelog_keys k 
+    JOIN {table} gl 
+     ON gl.qb_id = k.qb_id AND gl.year = k.year AND gl.week = k.week 
+    WHERE gl.source <> ? 
+    ''', (source,))}
+
+
+def _bounded_map(function, items: list, max_workers: int):
+
+    """
+    Maps a function over items on a thread pool, yielding results in order while
+    keeping at most 2 * max_workers results in memory
+    """
+
+    window = max(2 * max_workers, 1)
+
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 # scrape season data
-def agg_passing(database, table, year):
+@inst.timed()
+def agg_passing(database, table, year, week = 0):
 
     """
-    Creates a sqlite table of aggregated quarterback passing yards.
+    Stores a snapshot of season to date quarterback passing stats, the baseline update_gamelogs diffs against.
 
     Args:
         - database (str): a sqlite database
         - table (str): a sqlite table
         - year (int): the year in which the game logs will be collected 
+        - week (int): the last week played, 0 before the season starts
 
     Returns:
         - a pandas dataframe with aggregated passing yards data
     """
 
     # webscraping function adds keys and cleans data
-    df = wf.scrape_pass(year)
+    df = season_totals(wf.scrape_pass(year))
+    df['year'] = year
+    df['week'] = week
+
+    conn = schema.connect(database)
+    schema.ensure(conn, 'agg_passing', table)
 
-    conn = sqlite3.connect(database)
+    # sqlite takes None for nulls
+    rows = df[AGG_COLUMNS].astype(object)
+    rows = rows.where(rows.notnull(), None)
 
-    df.to_sql(table, conn, if_exists="replace", index=False)
+    with conn:
+        conn.execute(f'DELETE FROM {table} WHERE year = ? AND week = ?', (year, week))
+        conn.executemany(schema.upsert_query(table, AGG_COLUMNS, ['qb_id', 'year', 'week']),
+                         rows.itertuples(index = False, name = None))
 
     conn.close()
 
     return df
 
 
+def season_totals(df):
+
+    """
+    Reduces scraped season passing stats to one row per quarterback.
+    Traded quarterbacks have a combined row and a row for each team, their totals are kept with
+    the last team they played for, which pro football reference lists last
 
-team_abbreviation_dict = {
-    'Arizona Cardinals': 'ARI',
-    'Atlanta Falcons': 'ATL',
-    'Baltimore Ravens': 'BAL',
-    'Buffalo Bills': 'BUF',
-    'Carolina Panthers': 'CAR',
-    'Chicago Bears': 'CHI',
-    'Cincinnati Bengals': 'CIN',
-    'Cleveland Browns': 'CLE',
-    'Dallas Cowboys': 'DAL',
-    'Denver Broncos': 'DEN',
-    'Detroit Lions': 'DET',
-    'Green Bay Packers': 'GNB',  
-    'Houston Texans': 'HOU',
-    'Indianapolis Colts': 'IND',
-    'Jacksonville Jaguars': 'JAX',
-    'Kansas City Chiefs': 'KAN',  
-    'Las Vegas Raiders': 'LVR',
-    'Oakland Raiders': 'OAK',
-    'San Diego Chargers': 'SDG',
-    'Los Angeles Chargers': 'LAC',
-    'St. Louis Rams': 'STL',
-    'Los Angeles Rams': 'LAR',
-    'Miami Dolphins': 'MIA',
-    'Minnesota Vikings': 'MIN',
-    'New England Patriots': 'NWE',
-    'New Orleans Saints': 'NOR',
-    'New York Giants': 'NYG',
-    'New York Jets': 'NYJ',
-    'Philadelphia Eagles': 'PHI',
-    'Pittsburgh Steelers': 'PIT',
-    'San Francisco 49ers': 'SFO',
-    'Seattle Seahawks': 'SEA',
-    'Tampa Bay Buccaneers': 'TAM',
-    'Tennessee Titans': 'TEN',
-    'Washington Commanders': 'WAS',
-    'Washington Redskins': 'WAS',
-    'Washington Football Team': 'WAS'
-}
-
-# Reverse the dictionary
-abbreviation_team_dict = {value: key for key, value in team_abbreviation_dict.items()}
+    Args:
+        - df (Pandas DataFrame): season passing stats from wf.scrape_pass
+
+    Returns:
+        - a pandas dataframe with qb_id, name, team, games and pass_yards columns
+    """
 
+    df = df.dropna(subset = ['qb_id'])
 
+    return df.groupby('qb_id', sort = False).agg(
+        name = ('name', 'first'),
+        team = ('team', 'last'),
+        games = ('games', 'max'),
+        pass_yards = ('pass_yards', 'max'),
+        ).reset_index()
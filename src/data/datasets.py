@@ -0,0 +1,402 @@
+# lazy, cached loading of the processed datasets
+# nothing is read from disk until a dataset is first requested
+
+import os
+import json
+import hashlib
+import weakref
+import numpy as np
+import pandas as pd
+
+# repository folders
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(ROOT_DIR, 'data')
+PROCESSED_DIR = os.path.join(DATA_DIR, 'processed')
+LOG_DIR = os.path.join(ROOT_DIR, 'logging')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+
+# processed datasets by name
+DATASETS = {
+    'quarterbacks_weighted': 'all_quarterbacks_weighted.txt',   # active quarterbacks with strength of defense adjusted passing yards
+    'defense': 'all_defense.txt',
+    'defense_05_24': '05_24_defense.txt',
+}
+
+# loaded frames by (dataset name, compact)
+_cache = {}
+
+# text columns with at most this share of distinct values become categoricals in compact frames
+CATEGORY_SHARE = 0.5
+
+# integers a float32 holds exactly
+FLOAT32_EXACT = 2 ** 24
+
+# the narrowest integer type of compact frames, wide enough that arithmetic on counts and yards
+# (Att * 10, a season's yards) doesn't wrap around
+MIN_INTEGER = np.int32
+
+# content fingerprints by the buffers they were computed from, see fingerprint()
+_fingerprints = {}
+
+
+def load(name: str, binary: bool = True, compact: bool = False) -> pd.DataFrame:
+    """
+    Loads a processed dataset, reading it from disk only the first time it is requested
+
+    Args:
+        name (str): a key of DATASETS
+        binary (bool): read through the columnar binary cache (see read_cached)
+        compact (bool): return the typed, compact frame, see compact_frame()
+
+    Returns:
+        Pandas DataFrame: a shallow copy of the cached frame, so callers can add columns without
+            changing the cache. The frame's attrs['version'] fingerprints the source file
+    """
+
+    if name not in DATASETS:
+        raise ValueError(f"Unknown dataset {name}. Use one of: {', '.join(DATASETS)}.")
+
+    if (name, False) not in _cache:
+        path = dataset_path(name)
+
+        if binary:
+            df = read_cached(path, os.path.join(CACHE_DIR, name))
+        else:
+            df = pd.read_csv(path)
+            df.attrs['version'] = file_version(path)
+
+        _cache[(name, False)] = df
+
+    if compact and (name, True) not in _cache:
+        _cache[(name, True)] = compact_frame(_cache[(name, False)])
+
+    return _cache[(name, compact)].copy(deep = False)
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a typed, compact copy of a frame holding the same values
+
+    Text columns of dates are parsed, other text columns with repeated values (names, teams, results)
+    become categoricals, so equality tests compare integer codes. Integer columns, and float columns
+    of whole numbers without nulls, become the smallest integer type that holds them, but no narrower
+    than MIN_INTEGER, so arithmetic on them doesn't overflow. Whole numbers
+    with nulls become float32 when it holds them exactly. Other floats stay float64, so every
+    value, and every result computed from the frame, is unchanged
+
+    Args:
+        df (Pandas DataFrame): a frame as read from csv
+
+    Returns:
+        Pandas DataFrame: the compact frame, with the same attrs
+    """
+
+    data = {}
+
+    for column, series in df.items():
+
+        if pd.api.types.is_bool_dtype(series.dtype):
+            data[column] = series
+
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            data[column] = _downcast(series)
+
+        elif pd.api.types.is_float_dtype(series.dtype):
+            values = series.to_numpy()
+            finite = values[~np.isnan(values)]
+            whole = len(finite) > 0 and np.array_equal(finite, np.round(finite))
+
+            if whole and len(finite) == len(values):
+                data[column] = _downcast(series.astype(np.int64))
+            elif whole and np.abs(finite).max() < FLOAT32_EXACT:
+                data[column] = series.astype(np.float32)
+            else:
+                data[column] = series
+
+        elif pd.api.types.infer_dtype(series, skipna = True) == 'string':
+            dates = pd.to_datetime(series, format = '%Y-%m-%d', errors = 'coerce')
+
+            if dates.notna().sum() == series.notna().sum():
+                data[column] = dates
+            elif series.nunique() <= CATEGORY_SHARE * len(series):
+                data[column] = series.astype('category')
+            else:
+                data[column] = series
+
+        else:
+            data[column] = series
+
+    compacted = pd.DataFrame(data, index = df.index)
+    compacted.attrs = dict(df.attrs)
+
+    return compacted
+
+
+def _downcast(series: pd.Series) -> pd.Series:
+    """
+    The smallest integer type holding the series, at least MIN_INTEGER
+    """
+
+    downcast = pd.to_numeric(series, downcast = 'integer')
+    return downcast.astype(np.promote_types(downcast.dtype, MIN_INTEGER))
+
+
+def invalidate(name: str = None):
+    """
+    Drops a cached dataset so the next load reads it again, or every dataset when no name is given
+    """
+
+    if name is None:
+        _cache.clear()
+    else:
+        _cache.pop((name, False), None)
+        _cache.pop((name, True), None)
+
+
+def dataset_path(name: str) -> str:
+    """
+    Returns the path of a processed dataset
+    """
+
+    return os.path.join(PROCESSED_DIR, DATASETS[name])
+
+
+def file_version(path: str) -> str:
+    """
+    Fingerprints a file by its size and modification time
+    """
+
+    stat = os.stat(path)
+    return hashlib.md5(f"{stat.st_size}_{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+
+
+def read_cached(path: str, cache_path: str) -> pd.DataFrame:
+    """
+    Reads a csv file through a columnar binary copy
+
+    The first read parses the csv and writes every column to cache_path + '.npz' with its dtype,
+    next to a cache_path + '.json' fingerprint of the source (size, modification time and sha256).
+    Later reads load the binary copy while the fingerprint matches, and fall back to the csv,
+    rewriting the cache, once the source changes
+
+    Args:
+        path (str): a csv file
+        cache_path (str): path of the cache files, without extension
+
+    Returns:
+        Pandas DataFrame: the csv contents, with attrs['version'] set to the start of the source sha256
+    """
+
+    stat = os.stat(path)
+    meta = _read_meta(cache_path + '.json')
+
+    if meta is not None and (meta['size'], meta['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+
+        # touched but possibly unchanged, compare contents
+        if meta['sha256'] == file_hash(path):
+            meta['size'], meta['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+            _write_meta(cache_path + '.json', meta)
+        else:
+            meta = None
+
+    if meta is not None:
+        try:
+            df = _read_columns(cache_path + '.npz', meta)
+            df.attrs['version'] = meta['sha256'][:16]
+            return df
+        except (OSError, KeyError, ValueError):
+            pass
+
+    sha256 = file_hash(path)
+    df = pd.read_csv(path)
+    df.attrs['version'] = sha256[:16]
+
+    meta = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok = True)
+        if _write_columns(cache_path + '.npz', df, meta):
+            _write_meta(cache_path + '.json', meta)
+    except OSError:
+        # the cache is an optimization, an unwritable cache folder only costs speed
+        pass
+
+    return df
+
+
+def file_hash(path: str) -> str:
+    """
+    Returns the sha256 of a file's contents
+    """
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_frame(path: str, df: pd.DataFrame) -> bool:
+    """
+    Writes a frame to path + '.npz', with its column names and dtypes in path + '.json', without pickling
+
+    Returns:
+        bool: False, writing nothing, when a column can't be stored without pickling
+    """
+
+    meta = {}
+
+    if not _write_columns(path + '.npz', df, meta):
+        return False
+
+    _write_meta(path + '.json', meta)
+
+    return True
+
+
+def read_frame(path: str):
+    """
+    Reads a frame written by write_frame
+
+    Returns:
+        Pandas DataFrame: the frame, or None when it is missing or unreadable
+    """
+
+    meta = _read_meta(path + '.json')
+    if meta is None:
+        return None
+
+    try:
+        return _read_columns(path + '.npz', meta)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def fingerprint(df: pd.DataFrame, columns: list) -> str:
+    """
+    Returns a hash of the index and the values of some columns of a frame
+
+    The hash is computed once per set of buffers holding them. Shallow copies of a frame share its
+    buffers and reuse the hash, while filtered and derived frames, and columns given new values
+    (copy on write), have new buffers and are hashed again. Unlike attrs, it isn't inherited by subsets
+
+    Args:
+        df (Pandas DataFrame): the frame
+        columns (list): the columns hashed
+
+    Returns:
+        str: the fingerprint
+    """
+
+    columns = list(columns)
+    buffers = [_buffer(df.index)] + [_buffer(df[column]) for column in columns]
+    arrays = [buffer for buffer in buffers if isinstance(buffer, np.ndarray)]
+    key = (len(df), tuple(columns), tuple(id(buffer) if isinstance(buffer, np.ndarray) else buffer for buffer in buffers))
+
+    # an id is only reused once its array is freed, so a living array of the same id is the same array
+    entry = _fingerprints.get(key)
+    if entry is not None and all(ref() is array for ref, array in zip(entry[0], arrays)):
+        return entry[1]
+
+    hashed = pd.util.hash_pandas_object(df[columns], index = True)
+    digest = hashlib.md5(hashed.to_numpy().tobytes()).hexdigest()[:16]
+
+    # entries of freed frames are dropped as new ones are added
+    for stale in [stale for stale, (refs, _) in _fingerprints.items() if any(ref() is None for ref in refs)]:
+        del _fingerprints[stale]
+
+    _fingerprints[key] = ([weakref.ref(array) for array in arrays], digest)
+
+    return digest
+
+
+def _buffer(values):
+    """
+    The array holding an index or a column, the codes of a categorical, or the bounds of a range index
+    """
+
+    if isinstance(values, pd.RangeIndex):
+        return ('range', values.start, values.stop, values.step)
+
+    array = values.array
+    if isinstance(array, pd.Categorical):
+        array = array.codes
+
+    array = np.asarray(array)
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+
+    return array
+
+
+def _write_columns(path: str, df: pd.DataFrame, meta: dict) -> bool:
+    """
+    Writes every column of a frame to an npz file and records the column names and dtypes in meta
+    Returns False, writing nothing, when a column can't be stored without pickling
+    """
+
+    arrays = {}
+    columns = []
+
+    for i, (column, series) in enumerate(df.items()):
+
+        if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype) or \
+                series.dtype.kind == 'M':
+            arrays[f'c{i}'] = series.to_numpy()
+
+        elif pd.api.types.infer_dtype(series, skipna = True) in ('string', 'empty') or \
+                (isinstance(series.dtype, pd.CategoricalDtype) and
+                 pd.api.types.infer_dtype(series.cat.categories) in ('string', 'empty')):
+            # dictionary encoded, codes of -1 are null
+            codes, uniques = pd.factorize(series)
+            arrays[f'c{i}'] = codes.astype(np.int32)
+            arrays[f'u{i}'] = np.array(list(uniques), dtype = str)
+
+        else:
+            return False
+
+        columns.append([column, str(series.dtype)])
+
+    meta['columns'] = columns
+
+    # write then rename, so readers never see a partial file
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(temporary, path)
+
+    return True
+
+
+def _read_columns(path: str, meta: dict) -> pd.DataFrame:
+    """
+    Reads a frame written by _write_columns
+    """
+
+    data = {}
+
+    with np.load(path, allow_pickle = False) as arrays:
+        for i, (column, dtype) in enumerate(meta['columns']):
+            values = arrays[f'c{i}']
+
+            if f'u{i}' in arrays:
+                # a trailing null for the codes of -1
+                uniques = np.append(arrays[f'u{i}'].astype(object), np.nan)
+                values = uniques[values]
+
+            data[column] = pd.Series(values, dtype = dtype, copy = False)
+
+    return pd.DataFrame(data, copy = False)
+
+
+def _read_meta(path: str):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(path: str, meta: dict):
+    with open(path, 'w') as file:
+        json.dump(meta, file)
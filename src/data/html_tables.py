@@ -0,0 +1,114 @@
+# targeted extraction of pro football reference tables
+# only the html of the target table is scanned, and only the requested data-stat cells are kept,
+# instead of building a full parse tree of the page
+
+import re
+import html as htmllib
+import numpy as np
+import pandas as pd
+
+_ROW = re.compile(r'<tr\b([^>]*)>(.*?)</tr>', re.S)
+_CELL = re.compile(r'<(td|th)\b[^>]*?\bdata-stat="([^"]*)"[^>]*>(.*?)</\1>', re.S)
+_TAG = re.compile(r'<[^>]+>')
+_CLASS = re.compile(r'\bclass="([^"]*)"')
+
+# rows of the table body that repeat headers or separate sections
+SKIP_ROW_CLASSES = ('thead', 'over_header', 'spacer')
+
+
+def table_html(html: str, table_id: str) -> str:
+    """
+    Cuts the html of a single table out of a page, including tables shipped inside html comments
+
+    Args:
+        html (str): the page
+        table_id (str): the id attribute of the table
+
+    Returns:
+        str: the table, from its opening <table to its closing </table>
+    """
+
+    position = html.find(f'id="{table_id}"')
+    start = html.rfind('<table', 0, position)
+    end = html.find('</table>', position)
+
+    if position == -1 or start == -1 or end == -1:
+        raise ValueError(f"No table with id {table_id} found")
+
+    return html[start:end + len('</table>')]
+
+
+def extract_table(html: str, table_id: str, columns: dict, numeric = ()) -> pd.DataFrame:
+    """
+    Extracts the body rows of a table, keeping only the requested columns
+
+    Args:
+        html (str): a page, or the html of the table itself
+        table_id (str): the id attribute of the table
+        columns (dict): maps the data-stat attribute of each wanted cell to its column name.
+            A key can be a tuple of alternative data-stat names, for tables that were renamed on the site
+        numeric (iterable): column names converted to float64, with empty cells as NaN
+
+    Returns:
+        Pandas DataFrame: one row per body row of the table, columns in the order they were requested
+    """
+
+    table = table_html(html, table_id)
+
+    # only the table body holds data, the header and footer rows are labels and league totals
+    start = table.find('<tbody')
+    end = table.rfind('</tbody>')
+    if start != -1 and end != -1:
+        table = table[start:end]
+
+    stats = {}
+    for key, name in columns.items():
+        for stat in (key if isinstance(key, tuple) else (key,)):
+            stats[stat] = name
+
+    names = list(columns.values())
+    numeric = set(numeric)
+    values = {name: [] for name in names}
+
+    for attributes, row in _ROW.findall(table):
+
+        row_class = _CLASS.search(attributes)
+        if row_class and any(skip in row_class.group(1).split() for skip in SKIP_ROW_CLASSES):
+            continue
+
+        cells = {}
+        for _, stat, text in _CELL.findall(row):
+            name = stats.get(stat)
+            if name is not None and name not in cells:
+                cells[name] = text
+
+        # rows without any requested cell are separators
+        if not cells:
+            continue
+
+        for name in names:
+            text = cells.get(name, '')
+            if '<' in text:
+                text = _TAG.sub('', text)
+            text = htmllib.unescape(text).strip()
+
+            if name in numeric:
+                values[name].append(_number(text))
+            else:
+                values[name].append(text if text else np.nan)
+
+    return pd.DataFrame({
+        name: np.array(values[name], dtype = float) if name in numeric else pd.Series(values[name], dtype = object)
+        for name in names
+        })
+
+
+def _number(text: str) -> float:
+    """
+    Converts a cell to a float, empty and non numeric cells are NaN
+    """
+
+    try:
+        return float(text.replace(',', '').rstrip('%'))
+    except ValueError:
+        return np.nan
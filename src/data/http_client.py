@@ -0,0 +1,191 @@
+# shared http session for scraping pro football reference
+# requests are spaced out by a polite per host rate limit, capped in concurrency per host,
+# and retried with exponential backoff on throttling and server errors
+
+import time
+import random
+import threading
+import email.utils
+from urllib.parse import urlsplit
+
+# pro football reference blocks clients making more than about 20 requests a minute
+MIN_INTERVAL = 3.0          # seconds between the start of two requests to the same host
+MAX_CONNECTIONS = 2         # requests in flight per host
+RETRIES = 4
+BACKOFF = 2.0               # seconds before the first retry, doubled on every attempt
+TIMEOUT = 30
+
+# responses worth retrying
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    """
+    Spaces out calls to wait() so that at most one returns every interval seconds
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+
+        # reserve the next slot, then sleep outside the lock so other threads can reserve theirs
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+
+        if start > now:
+            time.sleep(start - now)
+
+
+class Client:
+    """
+    A pooled requests session with a per host rate limit, concurrency cap and retries
+
+    Args:
+        interval (float): seconds between the start of two requests to the same host
+        max_connections (int): requests in flight per host
+        retries (int): attempts after the first one, for connection errors and RETRY_STATUS responses
+        backoff (float): seconds before the first retry, doubled on every attempt.
+            A Retry-After header takes precedence
+        timeout (float): seconds before a request times out
+    """
+
+    def __init__(self, interval: float = MIN_INTERVAL, max_connections: int = MAX_CONNECTIONS,
+                 retries: int = RETRIES, backoff: float = BACKOFF, timeout: float = TIMEOUT):
+
+        self.interval = interval
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._session = None
+        self._limiters = {}
+        self._semaphores = {}
+
+    @property
+    def session(self):
+
+        # requests is only imported once something is fetched
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections = 4, pool_maxsize = self.max_connections)
+                self._session.mount('https://', adapter)
+                self._session.mount('http://', adapter)
+
+            return self._session
+
+    def get(self, url: str, headers: dict = None):
+        """
+        Fetches a url
+
+        Returns:
+            requests.Response: the response. 304 Not Modified responses are returned as is
+
+        Raises:
+            requests.HTTPError: when the last attempt still fails with an error status
+            requests.RequestException: when the last attempt fails to connect
+        """
+
+        import requests
+
+        session = self.session
+        host = urlsplit(url).netloc
+        limiter, semaphore = self._host(host)
+
+        for attempt in range(self.retries + 1):
+
+            with semaphore:
+                limiter.wait()
+
+                try:
+                    response = session.get(url, headers = headers, timeout = self.timeout)
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt == self.retries:
+                        raise
+                    delay = self.backoff * 2 ** attempt
+                else:
+                    if response.status_code not in RETRY_STATUS or attempt == self.retries:
+                        response.raise_for_status()
+                        return response
+                    delay = retry_after(response)
+                    if delay is None:
+                        delay = self.backoff * 2 ** attempt
+
+            # jitter keeps workers that failed together from retrying together
+            time.sleep(delay + random.uniform(0, self.backoff / 2))
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _host(self, host: str):
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(self.interval)
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_connections)
+            return self._limiters[host], self._semaphores[host]
+
+
+def retry_after(response):
+    """
+    Returns the seconds to wait from a Retry-After header, or None when there isn't one
+    """
+
+    value = response.headers.get('Retry-After')
+
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+# client shared by every scraping function
+_client = None
+_client_lock = threading.Lock()
+
+
+def default_client() -> Client:
+    """
+    Returns the shared client, creating it on first use
+    """
+
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = Client()
+        return _client
+
+
+def configure(**kwargs) -> Client:
+    """
+    Replaces the shared client with one built from the given Client arguments
+    """
+
+    global _client
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = Client(**kwargs)
+        return _client
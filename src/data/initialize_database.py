@@ -1,25 +1,33 @@
 # initializing NFL passing yards database
 
-import src.data.database_functions as df
 import os
+import src.data.database_functions as df
+import src.data.webscraping_functions as wf
+import src.data.datasets as ds
+import src.instrumentation as inst
 
 database = r"C:\Users\jonat\OneDrive\projects\scrape_and_score\data\quarterback.db"
 directory = r"C:\Users\jonat\OneDrive\projects\scrape_and_score\data\raw\gamelogs"
 
-os.remove(database)
 year = 2024
 
-# create a table for defensive data
-for year in range(2005, year + 1):
+# create a table for defensive data, seasons are scraped concurrently and written as they arrive.
+# seasons before this year are over, the current one stays out of the rank totals if the weekly update marked it
+for season, defense in wf.scrape_many(range(2005, year + 1), wf.scrape_def):
 
-    df.add_defense(database, "defense_stats", year)
+    df.add_defense(database, "defense_stats", season, defense, final = season < year)
 
 
 # add a 'weights' column for adjusted yards metrics
 df.calculate_weights(database, "defense_stats")
 
 # quarterback game logs table
-df.create_gamelogs(directory, database, table = "gamelogs", rank_table = "defense_stats")
+df.create_gamelogs(directory, database, table = "gamelogs", rank_table = "defense_stats", return_frame = False)
 
 # quarterback aggregated passing stats
-df.agg_passing(database, "agg_passing_stats", year)
\ No newline at end of file
+df.agg_passing(database, "agg_passing_stats", year)
+
+# with INSTRUMENT=1 set, the slowest stages of the run are shown and every stage is kept in the log
+if inst.enabled():
+    inst.export_jsonl(os.path.join(ds.LOG_DIR, 'stages.jsonl'))
+    print(inst.summary(top = 10).to_string(index = False))
@@ -0,0 +1,143 @@
+# on-disk cache of scraped pages
+# pages are stored by url with their ETag and Last-Modified headers, refreshed with conditional requests,
+# and can be replayed offline so the pipeline and tests run without the network
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+import src.data.http_client as hc
+from src.data.datasets import CACHE_DIR
+
+# replay pages from disk only, never touching the network
+OFFLINE = os.environ.get('SCRAPE_OFFLINE', '') not in ('', '0')
+
+
+class ResponseCache:
+    """
+    Raw page bodies on disk, keyed by the sha256 of their url
+
+    Args:
+        directory (str): folder for the cached pages, a .html body and .json metadata file per url
+        offline (bool): serve only cached pages, raising LookupError for anything else
+    """
+
+    def __init__(self, directory: str = os.path.join(CACHE_DIR, 'http'), offline: bool = OFFLINE):
+        self.directory = directory
+        self.offline = offline
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str, client = None, refresh: bool = True) -> str:
+        """
+        Returns the body of a page
+
+        Args:
+            url (str): the page
+            client (hc.Client): used for requests, defaults to the shared client
+            refresh (bool): revalidate a cached page with a conditional request.
+                When False a cached page is returned without touching the network
+
+        Returns:
+            str: the page html
+        """
+
+        body_path, meta_path = self._paths(url)
+        meta = self._read_meta(meta_path)
+
+        if meta is not None and (self.offline or not refresh):
+            return self._read_body(body_path)
+
+        if self.offline:
+            raise LookupError(f"{url} is not cached, and the response cache is offline")
+
+        # ask the server to only send the page if it changed
+        headers = {}
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = (client or hc.default_client()).get(url, headers = headers)
+
+        if response.status_code == 304 and meta is not None:
+            meta['checked_at'] = time.time()
+            self._write(meta_path, json.dumps(meta).encode())
+            return self._read_body(body_path)
+
+        body = response.content
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': hashlib.sha256(body).hexdigest(),
+            'fetched_at': time.time(),
+            'checked_at': time.time(),
+        }
+
+        # the body is written before the metadata, so a page only counts as cached once both exist
+        self._write(body_path, body)
+        self._write(meta_path, json.dumps(meta).encode())
+
+        return body.decode('utf-8', errors = 'replace')
+
+    def cached(self, url: str) -> bool:
+        return os.path.exists(self._paths(url)[1])
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.directory, f'{key}.html'), os.path.join(self.directory, f'{key}.json')
+
+    def _read_meta(self, path: str):
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _read_body(self, path: str) -> str:
+        with open(path, 'rb') as file:
+            return file.read().decode('utf-8', errors = 'replace')
+
+    def _write(self, path: str, data: bytes):
+
+        # write then rename, so concurrent readers never see a partial file
+        with self._lock:
+            os.makedirs(self.directory, exist_ok = True)
+            temporary = f'{path}.{threading.get_ident()}.tmp'
+            with open(temporary, 'wb') as file:
+                file.write(data)
+            os.replace(temporary, path)
+
+
+# cache shared by every scraping function
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def default_cache() -> ResponseCache:
+    """
+    Returns the shared response cache, creating it on first use
+    """
+
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def configure(**kwargs) -> ResponseCache:
+    """
+    Replaces the shared response cache with one built from the given ResponseCache arguments,
+    i.e. configure(offline = True) for offline replay
+    """
+
+    global _cache
+
+    with _cache_lock:
+        _cache = ResponseCache(**kwargs)
+        return _cache
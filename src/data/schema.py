@@ -0,0 +1,260 @@
+# sqlite schema of the quarterback database, and the connection every database function goes through
+# each kind of table is created from a versioned template, tables built from an older template are
+# rebuilt in place, keeping their rows
+
+import sqlite3
+
+# connection settings
+MMAP_SIZE = 256 * 1024 * 1024       # bytes of the database file read through memory mapping
+CACHED_STATEMENTS = 256             # prepared statements kept per connection
+
+# table recording the template version every table was built from
+VERSIONS_TABLE = 'schema_versions'
+
+# templates by kind of table: a version, the create statement and the indexes, formatted with the table name.
+# bump the version whenever a template changes
+TABLES = {
+    'defense_stats': {
+        'version': 1,
+        'create': '''CREATE TABLE {table} (
+                     defense_id TEXT PRIMARY KEY,
+                     team TEXT NOT NULL,
+                     year INTEGER NOT NULL,
+                     pyds_allowed REAL,
+                     rank INTEGER,
+                     weight REAL
+                     )''',
+        'indexes': [
+            # rankings by season, covering the rank averages
+            'CREATE INDEX IF NOT EXISTS {table}_year_rank ON {table} (year, rank, pyds_allowed)',
+            'CREATE INDEX IF NOT EXISTS {table}_team ON {table} (team)',
+        ],
+    },
+    'season_progress': {
+        # seasons whose defense rows are season to date totals from the weekly update, as of a week.
+        # they are left out of the rank totals until the full season is added
+        'version': 1,
+        'create': '''CREATE TABLE {table} (
+                     year INTEGER PRIMARY KEY,
+                     week INTEGER NOT NULL
+                     )''',
+        'indexes': [],
+    },
+    'defense_weekly': {
+        # season to date yards allowed as of the end of each week, with the week's own yards and the rank
+        # and weight the defense had at that point
+        'version': 1,
+        'create': '''CREATE TABLE {table} (
+                     defense_id TEXT NOT NULL,
+                     team TEXT NOT NULL,
+                     year INTEGER NOT NULL,
+                     week INTEGER NOT NULL,
+                     games INTEGER,
+                     pyds_allowed REAL,
+                     week_games INTEGER,
+                     week_yards REAL,
+                     rank INTEGER,
+                     weight REAL,
+                     PRIMARY KEY (defense_id, week)
+                     )''',
+        'indexes': [
+            'CREATE INDEX IF NOT EXISTS {table}_year_week ON {table} (year, week)',
+        ],
+    },
+    'rank_totals': {
+        'version': 1,
+        'create': '''CREATE TABLE {table} (
+                     year INTEGER NOT NULL,
+                     rank INTEGER NOT NULL,
+                     yards_sum REAL,
+                     teams INTEGER,
+                     PRIMARY KEY (year, rank)
+                     )''',
+        'indexes': [],
+    },
+    'gamelogs': {
+        'version': 1,
+        'create': '''CREATE TABLE {table} (
+                     qb_id TEXT NOT NULL,
+                     year INTEGER NOT NULL,
+                     week INTEGER NOT NULL,
+                     name TEXT,
+                     team TEXT NOT NULL,
+                     pass_yards REAL,
+                     opponent TEXT,
+                     defense_id TEXT,
+                     opp_rank INTEGER,
+                     weight REAL,
+                     adjusted_yards REAL,
+                     source TEXT,
+                     PRIMARY KEY (qb_id, year, week)
+                     )''',
+        'indexes': [
+            'CREATE INDEX IF NOT EXISTS {table}_defense ON {table} (defense_id)',
+            'CREATE INDEX IF NOT EXISTS {table}_name ON {table} (name, year, week)',
+            'CREATE INDEX IF NOT EXISTS {table}_source ON {table} (source)',
+        ],
+    },
+    'agg_passing': {
+        # season to date totals, as of the end of each week
+        'version': 1,
+        'create': '''CREATE TABLE {table} (
+                     qb_id TEXT NOT NULL,
+                     year INTEGER NOT NULL,
+                     week INTEGER NOT NULL,
+                     name TEXT,
+                     team TEXT,
+                     games INTEGER,
+                     pass_yards REAL,
+                     PRIMARY KEY (qb_id, year, week)
+                     )''',
+        'indexes': [],
+    },
+    'gamelog_overlaps': {
+        # files whose games a file read later took over, re-read for those games once that file's rows are deleted
+        'version': 1,
+        'create': '''CREATE TABLE {table} (
+                     path TEXT NOT NULL,
+                     displaced_by TEXT NOT NULL,
+                     PRIMARY KEY (path, displaced_by)
+                     )''',
+        'indexes': [
+            'CREATE INDEX IF NOT EXISTS {table}_displaced_by ON {table} (displaced_by)',
+        ],
+    },
+    'gamelog_files': {
+        'version': 1,
+        'create': '''CREATE TABLE {table} (
+                     path TEXT PRIMARY KEY,
+                     size INTEGER,
+                     mtime_ns INTEGER,
+                     sha256 TEXT
+                     )''',
+        'indexes': [],
+    },
+}
+
+
+def connect(database: str) -> sqlite3.Connection:
+    """
+    Opens a connection to a database with the settings shared by every database function
+
+    Writes go to a write ahead log, so readers aren't blocked while a table is rebuilt, and are only
+    synced at checkpoints. Temporary tables and indexes are kept in memory, the file is read through
+    memory mapping, and prepared statements are cached for the repeated inserts of the ingestion functions
+
+    Args:
+        database (str): a sqlite database
+
+    Returns:
+        sqlite3.Connection: the open connection
+    """
+
+    conn = sqlite3.connect(database, cached_statements = CACHED_STATEMENTS)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+
+    return conn
+
+
+def ensure(conn: sqlite3.Connection, kind: str, table: str = None) -> bool:
+    """
+    Creates a table from its template, or migrates it when it was built from an older template
+
+    Args:
+        conn (sqlite3.Connection): an open connection
+        kind (str): a key of TABLES
+        table (str): the table name, defaults to the kind
+
+    Returns:
+        bool: True when the table didn't exist and was created empty
+    """
+
+    if kind not in TABLES:
+        raise ValueError(f"Unknown table kind {kind}. Use one of: {', '.join(TABLES)}.")
+
+    table = table or kind
+    template = TABLES[kind]
+
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} (name TEXT PRIMARY KEY, kind TEXT NOT NULL, version INTEGER NOT NULL)')
+
+    version = conn.execute(f'SELECT version FROM {VERSIONS_TABLE} WHERE name = ?', (table,)).fetchone()
+    created = not _exists(conn, table)
+
+    with conn:
+        if created:
+            conn.execute(template['create'].format(table = table))
+        elif version is None or version[0] != template['version']:
+            # tables without a recorded version predate the schema module
+            _rebuild(conn, template, table)
+
+        for index in template['indexes']:
+            conn.execute(index.format(table = table))
+
+        conn.execute(f'INSERT OR REPLACE INTO {VERSIONS_TABLE} (name, kind, version) VALUES (?, ?, ?)',
+                     (table, kind, template['version']))
+
+    return created
+
+
+def upsert_query(table: str, columns: list, key: list) -> str:
+    """
+    Returns a parameterized insert of columns that updates the existing row when the key is taken
+
+    Args:
+        table (str): the table
+        columns (list): the inserted columns, in parameter order
+        key (list): the columns of the table's primary key or a unique index
+    """
+
+    updates = ', '.join(f'{column} = excluded.{column}' for column in columns if column not in key)
+
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) " \
+           f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}"
+
+
+def _exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> dict:
+    """
+    Returns whether each column of a table is declared not null, by column name
+    """
+
+    return {row[1]: bool(row[3]) for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _rebuild(conn: sqlite3.Connection, template: dict, table: str):
+    """
+    Rebuilds a table from its template, copying the columns both versions share.
+    Rows that would break the new keys keep the row inserted last, rows missing a required value are dropped.
+    Raises a ValueError, leaving the table as it was, when the table lacks a column the template requires
+    """
+
+    rebuilt = f'{table}_rebuilt'
+
+    conn.execute(f'DROP TABLE IF EXISTS {rebuilt}')
+    conn.execute(template['create'].format(table = rebuilt))
+
+    old = _columns(conn, table)
+    new = _columns(conn, rebuilt)
+    shared = [column for column in new if column in old]
+    required = [column for column in shared if new[column]]
+
+    # no row could be copied, the old table and its rows are kept
+    missing = [column for column, not_null in new.items() if not_null and column not in old]
+    if missing:
+        conn.execute(f'DROP TABLE {rebuilt}')
+        raise ValueError(f"Cannot migrate {table}, it has no {', '.join(missing)} column for the new template. "
+                         f"Add the column or drop the table.")
+
+    columns = ', '.join(shared)
+    where = ' AND '.join(f'{column} IS NOT NULL' for column in required) or '1'
+    conn.execute(f'INSERT OR REPLACE INTO {rebuilt} ({columns}) SELECT {columns} FROM {table} WHERE {where} ORDER BY rowid')
+
+    # dropping the old table drops its indexes, the template's are created on the rebuilt table
+    conn.execute(f'DROP TABLE {table}')
+    conn.execute(f'ALTER TABLE {rebuilt} RENAME TO {table}')
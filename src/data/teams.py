@@ -0,0 +1,44 @@
+# mapping between pro football reference team names and abbreviations
+
+team_abbreviation_dict = {
+    'Arizona Cardinals': 'ARI',
+    'Atlanta Falcons': 'ATL',
+    'Baltimore Ravens': 'BAL',
+    'Buffalo Bills': 'BUF',
+    'Carolina Panthers': 'CAR',
+    'Chicago Bears': 'CHI',
+    'Cincinnati Bengals': 'CIN',
+    'Cleveland Browns': 'CLE',
+    'Dallas Cowboys': 'DAL',
+    'Denver Broncos': 'DEN',
+    'Detroit Lions': 'DET',
+    'Green Bay Packers': 'GNB',  
+    'Houston Texans': 'HOU',
+    'Indianapolis Colts': 'IND',
+    'Jacksonville Jaguars': 'JAX',
+    'Kansas City Chiefs': 'KAN',  
+    'Las Vegas Raiders': 'LVR',
+    'Oakland Raiders': 'OAK',
+    'San Diego Chargers': 'SDG',
+    'Los Angeles Chargers': 'LAC',
+    'St. Louis Rams': 'STL',
+    'Los Angeles Rams': 'LAR',
+    'Miami Dolphins': 'MIA',
+    'Minnesota Vikings': 'MIN',
+    'New England Patriots': 'NWE',
+    'New Orleans Saints': 'NOR',
+    'New York Giants': 'NYG',
+    'New York Jets': 'NYJ',
+    'Philadelphia Eagles': 'PHI',
+    'Pittsburgh Steelers': 'PIT',
+    'San Francisco 49ers': 'SFO',
+    'Seattle Seahawks': 'SEA',
+    'Tampa Bay Buccaneers': 'TAM',
+    'Tennessee Titans': 'TEN',
+    'Washington Commanders': 'WAS',
+    'Washington Redskins': 'WAS',
+    'Washington Football Team': 'WAS'
+}
+
+# Reverse the dictionary
+abbreviation_team_dict = {value: key for key, value in team_abbreviation_dict.items()}
@@ -1,79 +1,261 @@
 # script to update quarterback gamelogs and defensive stats on a weekly basis during the nfl season
 
-# download the season schedule updated at start of the season
-# create a qb database with each quarterbacks info that will be updated at the start of the season
-
-# subtract the yards weekly to find how many points was put up by opponent that week
-    # match yards to quarterback using qb table
-
-    # create game log for that week with week, year 
-        # qb name, team, id FROM qb
-        # opponent FROM schedule
-        # opp_rank, defense_id, weight, adjusted_yards FROM defense_stats
-        # append it all onto gamelogs every week if not BYE
+# each week the season to date defense and passing totals are scraped, and subtracted from the previous week's
+# snapshot to find the yards allowed by every defense, and the yards thrown by every quarterback, that week.
+# update_defense runs first, so the week's game logs are joined to the defensive ranks as of that week
 
 # database = r"C:\Users\jonat\OneDrive\projects\scrape_and_score\data\nfl_database.db"
 
-# scrape current defense data
-# subtract from last week
-# store as a dataframe with team, opponent, and yards allowed
-# map onto the 'active_qb' table, which has quarterback, team, team_id,
-# store this as a single week of data
-# map this onto rankings, weights, and adjusted yards
-# append on to the 
-
-# scrape qb season rankings;
-# subtract them from last week
-# use schedule to map this onto the opponent
-    # this may actually be somewhat tricky
-# then it's easy
-import sqlite3
-import hashlib
-import os
 import numpy as np
 import pandas as pd
 import src.data.webscraping_functions as wf
+import src.data.database_functions as dbf
+import src.data.schema as schema
+import src.data.hash as hs
 
 #mschedule = r"C:\Users\jonat\OneDrive\projects\scrape_and_score\data\processed\2024_schedule.txt"
 
-def update_defense(year: int):
+# source of game logs added by the weekly update, rather than from an exported file
+WEEKLY_SOURCE = 'weekly'
+
+
+def update_defense(database: str, year: int, week: int, table: str = 'defense_stats',
+                   weekly_table: str = 'defense_weekly', df = None):
     """
-    updates the defense_stats table every week
+    Updates the defense_stats table with a week of games
+
+    The season to date yards allowed are stored as this week's snapshot in weekly_table, and the week's own
+    yards are the difference from the latest earlier snapshot. Defenses are ranked by yards allowed per game
+    as of this week, and weighted with the rank averages of the finished seasons in the rank totals table
+    (see dbf.calculate_weights), so earlier weeks and seasons are never recomputed. The current season's rows
+    of the defense table are then upserted with the new totals, ranks and weights, and the season is recorded
+    as in progress, which keeps its partial totals out of the rank totals until dbf.add_defense writes the
+    finished season with final set. Run this before update_gamelogs, which joins the week's games to these ranks
+
+    Args:
+        - database (str): a sqlite database
+        - year (int): the season
+        - week (int): the week just played
+        - table (str): a sqlite table with defensive stats, rankings and weights
+        - weekly_table (str): a sqlite table of weekly defensive snapshots
+        - df (Pandas DataFrame): season to date defense stats already scraped by wf.scrape_def, scraped here when not given
+
+    Returns:
+        - the week's snapshot as a pandas dataframe
     """
-    pass
+
+    if df is None:
+        df = wf.scrape_def(year)
+
+    # keep only the team, games, and the yards columns
+    df = df[['Tm', 'G', 'Yds.1']].rename(columns = {'Tm': 'team', 'G': 'games', 'Yds.1': 'pyds_allowed'})
+    df = df.dropna(subset = ['team'])
+    df['defense_id'] = [hs.generate_key(position = 'defense', team = team, year = year) for team in df['team']]
+    df['year'] = year
+    df['week'] = week
+
+    columns = ['defense_id', 'team', 'year', 'week', 'games', 'pyds_allowed']
+
+    # sqlite takes None for nulls
+    rows = df[columns].astype(object)
+    rows = rows.where(rows.notnull(), None)
+
+    conn = schema.connect(database)
+    schema.ensure(conn, 'defense_stats', table)
+    schema.ensure(conn, 'defense_weekly', weekly_table)
+
+    # the rank averages of finished seasons, aggregated once when the totals table is new
+    totals = f'{table}_rank_totals'
+    progress = f'{table}_in_progress'
+    schema.ensure(conn, 'season_progress', progress)
+    if schema.ensure(conn, 'rank_totals', totals):
+        with conn:
+            dbf.update_rank_totals(conn, table)
+
+    with conn:
+        # the season's rows in the defense table are season to date from here on
+        conn.execute(schema.upsert_query(progress, ['year', 'week'], ['year']), (year, week))
+
+        conn.executemany(schema.upsert_query(weekly_table, columns, ['defense_id', 'week']),
+                         rows.itertuples(index = False, name = None))
+
+        # subtract from the latest earlier week, the first week of a season is its own total
+        conn.execute(f"""
+        UPDATE {weekly_table} 
+        SET 
+            week_games = {weekly_table}.games - COALESCE(previous.games, 0), 
+            week_yards = {weekly_table}.pyds_allowed - COALESCE(previous.pyds_allowed, 0) 
+        FROM 
+            (SELECT defense_id, week FROM {weekly_table} WHERE year = ? AND week = ?) current 
+        LEFT JOIN 
+            {weekly_table} previous 
+        ON 
+            previous.defense_id = current.defense_id 
+            AND previous.week = (SELECT MAX(week) FROM {weekly_table} WHERE defense_id = current.defense_id AND week < current.week) 
+        WHERE 
+            {weekly_table}.defense_id = current.defense_id 
+            AND {weekly_table}.week = current.week 
+        """, (year, week))
+
+        # rank by yards allowed per game, teams that haven't played yet rank last
+        conn.execute(f"""
+        WITH 
+            ranked AS (
+                SELECT 
+                    defense_id, 
+                    DENSE_RANK() OVER (ORDER BY pyds_allowed / NULLIF(games, 0) IS NULL, pyds_allowed / NULLIF(games, 0)) AS rank 
+                FROM {weekly_table} 
+                WHERE year = ? AND week = ?), 
+            history AS (SELECT rank, SUM(yards_sum) / SUM(teams) AS ranked_average FROM {totals} WHERE year != ? GROUP BY rank), 
+            league AS (SELECT SUM(yards_sum) / SUM(teams) AS average FROM {totals} WHERE year != ?), 
+            weights AS (
+                SELECT 
+                    ranked.defense_id, 
+                    ranked.rank, 
+                    COALESCE(league.average / history.ranked_average, 1) AS weight 
+                FROM ranked 
+                LEFT JOIN history ON history.rank = ranked.rank 
+                CROSS JOIN league) 
+        UPDATE {weekly_table} 
+        SET 
+            rank = weights.rank, 
+            weight = weights.weight 
+        FROM 
+            weights 
+        WHERE 
+            {weekly_table}.defense_id = weights.defense_id 
+            AND {weekly_table}.week = ? 
+        """, (year, week, year, year, week))
+
+        # the current season's defenses, as of this week
+        conn.execute(f"""
+        INSERT INTO {table} (defense_id, team, year, pyds_allowed, rank, weight) 
+        SELECT defense_id, team, year, pyds_allowed, rank, weight 
+        FROM {weekly_table} 
+        WHERE year = ? AND week = ? 
+        ON CONFLICT (defense_id) DO UPDATE SET 
+            pyds_allowed = excluded.pyds_allowed, 
+            rank = excluded.rank, 
+            weight = excluded.weight 
+        """, (year, week))
+
+    snapshot = pd.read_sql_query(f'SELECT * FROM {weekly_table} WHERE year = ? AND week = ? ORDER BY rank',
+                                 conn, params = (year, week))
+    conn.close()
+
+    return snapshot
 
 
-def update_gamelogs(database: str, table: str, agg_table: str, schedule: str, year: int, week: int):
+def update_gamelogs(database: str, table: str, agg_table: str, schedule: str, year: int, week: int,
+                    rank_table: str = 'defense_stats', df = None):
     """
-    Updates quarterback gamelogs
+    Updates quarterback gamelogs with a week of games
+
+    Season to date totals are diffed against the latest snapshot stored in agg_table before this week,
+    giving each quarterback's yards for the week. Quarterbacks whose team had a bye, or whose games played
+    didn't go up by one, are skipped. The week's games are upserted on (qb_id, year, week) with their opponent's
+    rank and weight, and the totals are stored as this week's snapshot, in one transaction, so running a week
+    again replaces it. Weeks missed by the update can be backfilled with dbf.create_gamelogs from exports
 
     Args:
         - database (str): a sqlite database
         - table (str): a sqlite table where gamelogs will be appended
         - agg_table (str): a sqlite table with quarterback aggregated passing stats for a given year
-        - schedule (str): a csv file containing an nfl schedule 
+        - schedule (str): a csv file containing an nfl schedule, with a row of week, team and opp for each team's game
+        - year (int): the season
+        - week (int): the week just played
+        - rank_table (str): a sqlite table with defensive rankings and weights
+        - df (Pandas DataFrame): season to date passing stats already scraped by wf.scrape_pass, scraped here when not given
+
+    Returns:
+        - the week's game logs as a pandas dataframe
     """
 
-    df = wf.scrape_pass(year)
+    if df is None:
+        df = wf.scrape_pass(year)
 
-    schedule = pd.read_csv(schedule)
-    # find games for current week
-    schedule = schedule.loc[schedule['week'] == week]       # week is str?
-    schedule_dict = dict(zip(schedule['team'], schedule['opp']))
-    df['opponent'] = df['team'].map(schedule_dict)
-    
-    # subtract pass_yards from season data
-    conn = sqlite3.connect(database)
-    agg_df = pd.read_sql_query(f"SELECT * FROM {agg_table}", conn)
-    
-    
-    # overwrite old aggregate data
+    totals = dbf.season_totals(df)
+    totals['year'] = year
+    totals['week'] = week
+
+    # find games for current week, teams on a bye have no opponent
+    opponents = week_opponents(schedule, week)
+
+    conn = schema.connect(database)
+    schema.ensure(conn, 'gamelogs', table)
+    schema.ensure(conn, 'agg_passing', agg_table)
+
+    # each quarterback's latest totals before this week
+    previous = pd.read_sql_query(f"""
+    SELECT 
+        qb_id, 
+        games AS previous_games, 
+        pass_yards AS previous_yards 
+    FROM 
+        {agg_table} agg 
+    WHERE 
+        year = ? 
+        AND week = (SELECT MAX(week) FROM {agg_table} WHERE qb_id = agg.qb_id AND year = agg.year AND week < ?) 
+    """, conn, params = (year, week))
+
+    games = totals.merge(previous, on = 'qb_id', how = 'left')
+    games[['previous_games', 'previous_yards']] = games[['previous_games', 'previous_yards']].fillna(0)
+    games['opponent'] = games['team'].map(opponents)
+
+    # subtract pass_yards from season data, for quarterbacks who played one game against this week's opponent
+    played = (games['games'] - games['previous_games'] == 1) & games['opponent'].notna()
+    games = games.loc[played].copy()
+    games['pass_yards'] = games['pass_yards'] - games['previous_yards']
+
+    games['defense_id'] = [hs.generate_key(position = 'defense', team = team, year = year) for team in games['opponent']]
+
+    # 'rank', 'weight', and 'adjusted_yards' are assigned to the defenses with a join on defense_id
+    games['opp_rank'] = 0
+    games['weight'] = 0
+    games['adjusted_yards'] = 0
+    games['source'] = WEEKLY_SOURCE
+
+    # sqlite takes None for nulls
+    rows = games[dbf.GAMELOG_COLUMNS + ['source']].astype(object)
+    rows = rows.where(rows.notnull(), None)
+    snapshot = totals[dbf.AGG_COLUMNS].astype(object)
+    snapshot = snapshot.where(snapshot.notnull(), None)
 
+    with conn:
+        conn.executemany(schema.upsert_query(table, dbf.GAMELOG_COLUMNS + ['source'], ['qb_id', 'year', 'week']),
+                         rows.itertuples(index = False, name = None))
 
-    # df['pass_yards'] = df['pass_yards] - season_df['pass_yards]
+        # overwrite old aggregate data
+        conn.execute(f'DELETE FROM {agg_table} WHERE year = ? AND week = ?', (year, week))
+        conn.executemany(schema.upsert_query(agg_table, dbf.AGG_COLUMNS, ['qb_id', 'year', 'week']),
+                         snapshot.itertuples(index = False, name = None))
 
-    # operations to append on and multiply, either new function or existing function
+        dbf.join_defenses(conn, table, rank_table, year)
+
+    game_logs = pd.read_sql_query(f"""
+    SELECT {', '.join(dbf.GAMELOG_COLUMNS)} FROM {table} WHERE year = ? AND week = ? AND source = ?
+    """, conn, params = (year, week, WEEKLY_SOURCE))
+    conn.close()
+
+    return game_logs
+
+
+def week_opponents(schedule: str, week: int) -> dict:
+    """
+    Maps every team playing in a week to its opponent
+
+    Args:
+        - schedule (str): a csv file containing an nfl schedule, with week (or Week), team and opp columns
+        - week (int): the week
+
+    Returns:
+        - dict: opponent by team, teams on a bye are left out
+    """
+
+    schedule = pd.read_csv(schedule)
+    schedule = schedule.rename(columns = {'Week': 'week'})
 
-    # Append on to gamelogs
+    # repeated header rows make the week column text
+    schedule = schedule.loc[pd.to_numeric(schedule['week'], errors = 'coerce') == week]
 
-    pass
+    return dict(zip(schedule['team'], schedule['opp']))
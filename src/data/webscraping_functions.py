@@ -3,61 +3,59 @@
 # understandably, pro football reference does not condone scraping of player game logs, 
 # but still generously offers manual export options for these tables
 
+import os
+import hashlib
+import datetime
 import pandas as pd
 import numpy as np
-import requests
-from bs4 import BeautifulSoup
 import src.data.hash as hs
-from src.data.database_functions import *
+import src.data.http_client as hc
+import src.data.html_tables as ht
+import src.data.response_cache as rc
+import src.data.datasets as ds
+import src.instrumentation as inst
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.data.teams import team_abbreviation_dict, abbreviation_team_dict
+
+# cells kept from each table, by data-stat attribute. The passing table renamed its player and team cells in 2024.
+# every team_stats column is kept, under the header names of the raw defense files (repeated headers numbered)
+DEFENSE_COLUMNS = {
+    'team': 'Tm', 'g': 'G', 'points': 'PA', 'total_yards': 'Yds', 'plays_offense': 'Ply',
+    'yds_per_play_offense': 'Y/P', 'turnovers': 'TO', 'fumbles_lost': 'FL', 'first_down': '1stD',
+    'pass_cmp': 'Cmp', 'pass_att': 'Att', 'pass_yds': 'Yds.1', 'pass_td': 'TD', 'pass_int': 'Int',
+    'pass_net_yds_per_att': 'NY/A', 'pass_fd': '1stD.2', 'rush_att': 'Att.3', 'rush_yds': 'Yds.4',
+    'rush_td': 'TD.5', 'rush_yds_per_att': 'Y/A', 'rush_fd': '1stD.6', 'penalties': 'Pen',
+    'penalties_yds': 'Yds.7', 'pen_fd': '1stPy', 'score_pct': 'Sc%', 'turnover_pct': 'TO%', 'exp_pts_tot': 'EXP',
+}
+DEFENSE_NUMERIC = tuple(name for name in DEFENSE_COLUMNS.values() if name != 'Tm')
+PASSING_COLUMNS = {('name_display', 'player'): 'name', ('team_name_abbr', 'team'): 'team', ('games', 'g'): 'games',
+                   'pass_yds': 'pass_yards'}
+
+# site the pages are scraped from, point it at a local stand-in with PFR_BASE_URL
+BASE_URL = os.environ.get('PFR_BASE_URL', 'https://www.pro-football-reference.com')
 
 
-def scrape_def(year: int, cache = False):
+@inst.timed()
+def scrape_def(year: int, cache = False, client = None, refresh = None, base_url = None):
 
     """
     scrapes and caches pro football reference defensive season rankings dataframes 
+    requests go through the shared, rate limited http client unless another client is given.
+    pages come from the on-disk response cache, see page(), and from base_url, defaulting to BASE_URL
     """
 
     # opening webpage
     
-    url = f"https://www.pro-football-reference.com/years/{year}/opp.htm"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    # locate the data
-
-    table = soup.find('table', {'id': 'team_stats'})
+    url = f"{base_url or BASE_URL}/years/{year}/opp.htm"
+    table = ht.table_html(page(url, year, client, refresh), 'team_stats')
 
-    # extract subheaders. In this case, we are uninterested in the headers, so we start at the second row.
-
-    subheaders = []
-    header_row = table.find_all('tr')[1]    # taking the second row
-    repeat_counter = 1                      # needed to identify repeat column labels
-
-    for th in header_row.find_all('th')[1:]:    # 'rank' column is encoded as a header, so we skip this
-        subheader = th.text.strip()
-        if subheader in subheaders:
-            subheader = f"{subheader}.{repeat_counter}"
-            repeat_counter += 1
-        subheaders.append(subheader)
-
-    # extract the data rows
-    
-    rows = []
-    for row in table.find_all('tr')[2:-3]:    # skip the first two header rows and last three compiled stat rows
-        cells = row.find_all('td')     # last three rows are average team stats
-        cells = [cell.text.strip() for cell in cells]
-        if len(cells) == len(subheaders):  # Ensure the number of columns match. In this case, the table is so large there are multiple headers embedded in the data
-            rows.append(cells)
-        else:
-            print(f"Skipping row with {len(cells)} columns, expected {len(subheaders)}")
-
-    # create dataframe
-    df = pd.DataFrame(rows, columns = subheaders)
-    df.replace("", np.nan, inplace = True)
+    df = parsed(table, parse_def)
 
     if cache == True:
-        # cache raw data
-        df.to_csv(rf"C:\Users\jonat\OneDrive\projects\scrape_and_score\data\raw\defense\{year}_nfl_defense_data.txt", index = False)
+        # cache the table outside data/raw/defense, so the tracked raw files aren't overwritten
+        path = defense_cache_path(year)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        df.to_csv(path, index = False)
 
     return df
 
@@ -66,40 +64,37 @@ def scrape_def(year: int, cache = False):
     # map the value over
 
 
-def scrape_pass(year: int):
+def defense_cache_path(year: int) -> str:
+
+    """
+    the csv scrape_def(cache = True) writes the season's team_stats table to, under data/cache rather than
+    data/raw/defense, which holds the tracked raw files
+    """
+
+    return os.path.join(ds.CACHE_DIR, 'defense', f'{year}_defense.txt')
+
+
+def parse_def(table: str):
+
+    """
+    extracts every column of the team_stats table, numbers as floats
+    """
+
+    return ht.extract_table(table, 'team_stats', DEFENSE_COLUMNS, numeric = DEFENSE_NUMERIC)
+
+
+@inst.timed()
+def scrape_pass(year: int, client = None, refresh = None, base_url = None):
 
     """
     scrapes and caches pro football reference qb season rankings dataframes 
+    pages come from base_url, defaulting to BASE_URL
     """
 
-    url = f"https://www.pro-football-reference.com/years/{year}/passing.htm"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, 'html.parser')
-    table = soup.find('table', {'id': 'passing'})
-
-    # extract headers
-    headers = []
-    header_row = table.find_all('tr')[0]    # taking the headers
-
-    for th in header_row.find_all('th')[1:]:    # 'rank' column is encoded as a header, so we skip this
-        subheader = th.text.strip()
-        headers.append(subheader)
-
-    # extract the data rows
-    rows = []
-    for row in table.find_all('tr')[1:]:    # skip the first header row
-        cells = row.find_all('td')     # last three rows are average team stats
-        cells = [cell.text.strip() for cell in cells]
-        if len(cells) == len(headers):  # Ensure the number of columns match. In this case, the table is so large there are multiple headers embedded in the data
-            rows.append(cells)
-        else:
-            print(f"Skipping row with {len(cells)} columns, expected {len(headers)}")
-
-    # create dataframe
-    df = pd.DataFrame(rows, columns = headers)                                                                  # create dataframe
-    df = df.loc[:, ~df.columns.duplicated()]                                                                    # dropping duplicate column names
-    df = df[["Player", "Team", "Yds"]]                                                                          # keeping only relevant columns
-    df = df.rename(columns = {'Player': 'name', 'Team': 'team', 'Yds': 'pass_yards'})                           # rename columns
+    url = f"{base_url or BASE_URL}/years/{year}/passing.htm"
+    table = ht.table_html(page(url, year, client, refresh), 'passing')
+
+    df = parsed(table, parse_pass)
     df['name'] = df['name'].str.lower()                                                                         # change names to lowercase
     df['qb_id'] = df.apply(lambda row: hs.generate_key(position = 'quarterback', name = row['name']), axis = 1)    # creat qb_id key
     df['team'] = df['team'].map(abbreviation_team_dict)
@@ -108,45 +103,104 @@ def scrape_pass(year: int):
     return df
 
 
-team_abbreviation_dict = {
-    'Arizona Cardinals': 'ARI',
-    'Atlanta Falcons': 'ATL',
-    'Baltimore Ravens': 'BAL',
-    'Buffalo Bills': 'BUF',
-    'Carolina Panthers': 'CAR',
-    'Chicago Bears': 'CHI',
-    'Cincinnati Bengals': 'CIN',
-    'Cleveland Browns': 'CLE',
-    'Dallas Cowboys': 'DAL',
-    'Denver Broncos': 'DEN',
-    'Detroit Lions': 'DET',
-    'Green Bay Packers': 'GNB',  
-    'Houston Texans': 'HOU',
-    'Indianapolis Colts': 'IND',
-    'Jacksonville Jaguars': 'JAX',
-    'Kansas City Chiefs': 'KAN',  
-    'Las Vegas Raiders': 'LVR',
-    'Oakland Raiders': 'OAK',
-    'San Diego Chargers': 'SDG',
-    'Los Angeles Chargers': 'LAC',
-    'St. Louis Rams': 'STL',
-    'Los Angeles Rams': 'LAR',
-    'Miami Dolphins': 'MIA',
-    'Minnesota Vikings': 'MIN',
-    'New England Patriots': 'NWE',
-    'New Orleans Saints': 'NOR',
-    'New York Giants': 'NYG',
-    'New York Jets': 'NYJ',
-    'Philadelphia Eagles': 'PHI',
-    'Pittsburgh Steelers': 'PIT',
-    'San Francisco 49ers': 'SFO',
-    'Seattle Seahawks': 'SEA',
-    'Tampa Bay Buccaneers': 'TAM',
-    'Tennessee Titans': 'TEN',
-    'Washington Commanders': 'WAS',
-    'Washington Redskins': 'WAS',
-    'Washington Football Team': 'WAS'
-}
+def parse_pass(table: str):
+
+    """
+    extracts the player, team, games played and passing yards columns of the passing table
+    """
+
+    return ht.extract_table(table, 'passing', PASSING_COLUMNS, numeric = ('games', 'pass_yards'))
+
+
+def page(url: str, year: int, client = None, refresh = None) -> str:
+
+    """
+    returns a page through the shared response cache
+    seasons that are over never change, so by default only the current season is revalidated with the server
+
+    Args:
+        - url (str): the page
+        - year (int): the season the page belongs to
+        - client (hc.Client): defaults to the shared client
+        - refresh (bool): revalidate a cached page, defaults to whether the season is still in progress
+    """
+
+    if refresh is None:
+        refresh = year >= current_season()
+
+    return rc.default_cache().fetch(url, client = client, refresh = refresh)
+
+
+def current_season() -> int:
+
+    """
+    the season in progress, seasons run from september through the february super bowl
+    """
+
+    today = datetime.date.today()
+    return today.year if today.month >= 3 else today.year - 1
+
+
+def parsed(table: str, parser):
+
+    """
+    parses a table, reusing the result of an earlier parse of identical table html
+    results are kept in memory and on disk, keyed by the hash of the table content
+    """
+
+    key = hashlib.sha256(f'{parser.__name__}_{PARSE_VERSION}\n{table}'.encode()).hexdigest()
+
+    if key not in _parsed:
+        path = os.path.join(ds.CACHE_DIR, 'parsed', key)
+
+        # stored as npz arrays read without pickling, so nothing in the cache folder can run code
+        df = ds.read_frame(path)
+
+        if df is None:
+            df = parser(table)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok = True)
+                ds.write_frame(path, df)
+            except OSError:
+                pass
+
+        _parsed[key] = df
+
+    return _parsed[key].copy()
+
+
+# parsed tables by content hash, bump PARSE_VERSION when a parser's output changes
+_parsed = {}
+PARSE_VERSION = 5
+
+
+def scrape_many(years, scraper = scrape_def, max_workers: int = 4, client = None, base_url = None):
+
+    """
+    scrapes many seasons at once, yielding (year, dataframe) pairs as each page is parsed
+    the shared http client keeps the requests within its rate limit and per host connection cap,
+    so a full rebuild is bounded by the rate limit rather than by sequential round trips
+
+    Args:
+        - years (iterable): the seasons to scrape
+        - scraper (function): scrape_def or scrape_pass
+        - max_workers (int): pages fetched and parsed at the same time
+        - client (hc.Client): defaults to the shared client
+        - base_url (str): site the pages are scraped from, defaults to BASE_URL
+
+    Returns:
+        - a generator of (year, dataframe) in the order the pages finish
+    """
+
+    client = client or hc.default_client()
+
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        futures = {executor.submit(scraper, year, client = client, base_url = base_url): year for year in years}
 
-# Reverse the dictionary
-abbreviation_team_dict = {value: key for key, value in team_abbreviation_dict.items()}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # stop queued pages if the consumer stops early or a page fails
+            for future in futures:
+                future.cancel()
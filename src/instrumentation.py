@@ -0,0 +1,380 @@
+# timing and memory spans for the pipeline and the model
+# a span records the wall time, cpu time, rows processed and memory of a stage. Spans nest, and are
+# named by their path, like 'over_under/player_categories'. Turned off, a span is a shared no-op
+# and a timed function is called straight through, so instrumentation can stay in the hot paths
+
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+import tracemalloc
+import functools
+import collections
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, rss is left out
+    resource = None
+
+# turned on for the whole run with INSTRUMENT=1, or INSTRUMENT=memory to also trace python allocations
+_setting = os.environ.get('INSTRUMENT', '')
+
+_enabled = _setting not in ('', '0')
+_memory = _setting == 'memory'
+
+if _memory:
+    tracemalloc.start()
+
+# finished spans kept, the oldest are dropped past this so long runs and servers don't grow without bound
+MAX_RECORDS = 100000
+
+_lock = threading.Lock()
+_records = collections.deque(maxlen = MAX_RECORDS)
+
+# open spans and collected records, by thread
+_local = threading.local()
+
+
+class Span:
+    """
+    A stage being measured. Set rows to the number of rows the stage processed
+    """
+
+    def __init__(self, name: str, rows: int = None):
+        self.name = name
+        self.rows = rows
+        self.peak = 0
+
+
+class _NullSpan:
+
+    # setting or adding to rows on a disabled span does nothing
+    rows = 0
+
+    def __setattr__(self, name, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullSpan()
+
+
+def enable(memory: bool = False):
+    """
+    Turns on instrumentation
+
+    Args:
+        memory (bool): also trace python allocations with tracemalloc, for the peak of every span.
+            Tracing slows allocation heavy code down several times
+    """
+
+    global _enabled, _memory
+
+    _enabled = True
+    _memory = memory
+
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """
+    Turns off instrumentation, the records so far are kept
+    """
+
+    global _enabled, _memory
+
+    _enabled = False
+
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _memory = False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, rows: int = None):
+    """
+    Measures the block it wraps
+
+    Example:
+        with span('read_gamelogs') as stage:
+            df = read()
+            stage.rows = len(df)
+
+    Args:
+        name (str): the stage, nested under the spans already open in this thread
+        rows (int): rows processed, can also be set on the span inside the block
+    """
+
+    if not _enabled:
+        return _NULL
+
+    return _measure(name, rows)
+
+
+def timed(name: str = None):
+    """
+    Decorator measuring every call of a function. The length of a returned frame counts as the rows processed
+
+    Args:
+        name (str): the stage, defaults to the function name
+    """
+
+    def decorator(function):
+
+        stage = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+
+            if not _enabled:
+                return function(*args, **kwargs)
+
+            with _measure(stage, None) as current:
+                result = function(*args, **kwargs)
+                if isinstance(result, (pd.DataFrame, pd.Series)):
+                    current.rows = len(result)
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+@contextlib.contextmanager
+def _measure(name: str, rows):
+
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+
+    current = Span(f'{stack[-1].name}/{name}' if stack else name, rows)
+
+    if _memory:
+        # the enclosing span keeps the peak so far, before it is reset for this one
+        peak = tracemalloc.get_traced_memory()[1]
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+
+    # the process high-water mark only rises, so the stage's share is how far it rose during the stage
+    rss = _max_rss()
+
+    stack.append(current)
+    started = time.time()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+
+    try:
+        yield current
+
+    finally:
+        record = {
+            'stage': current.name,
+            'start': started,
+            'wall': time.perf_counter() - wall,
+            'cpu': time.process_time() - cpu,
+            'rows': current.rows,
+            'pid': os.getpid(),
+        }
+
+        stack.pop()
+
+        if rss is not None:
+            record['max_rss'] = _max_rss()
+            record['rss_growth'] = record['max_rss'] - rss
+
+        if _memory:
+            current.peak = max(current.peak, tracemalloc.get_traced_memory()[1])
+            record['peak_traced'] = current.peak
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, current.peak)
+
+        _add(record)
+
+
+def _max_rss():
+    """
+    The highest resident set size of the process since it started, in bytes, or None without the resource module
+    """
+
+    if resource is None:
+        return None
+
+    # kilobytes on linux, bytes on macos
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _add(record: dict):
+
+    collected = getattr(_local, 'records', None)
+    if collected is not None:
+        collected.append(record)
+        return
+
+    with _lock:
+        _records.append(record)
+
+
+@contextlib.contextmanager
+def collect():
+    """
+    Holds the records of this thread's spans in a list instead of the shared records.
+    Worker processes return their records to the parent this way, see extend()
+    """
+
+    previous = getattr(_local, 'records', None)
+    _local.records = []
+
+    try:
+        yield _local.records
+    finally:
+        _local.records = previous
+
+
+def extend(spans: list):
+    """
+    Adds records measured elsewhere, like in a worker process
+    """
+
+    for record in spans:
+        _add(record)
+
+
+def records() -> list[dict]:
+    """
+    The records so far, one dict per finished span, at most the last MAX_RECORDS
+    """
+
+    with _lock:
+        return list(_records)
+
+
+def reset():
+    """
+    Clears the records
+    """
+
+    with _lock:
+        _records.clear()
+
+
+def summary(spans: list[dict] = None, top: int = None) -> pd.DataFrame:
+    """
+    Totals the records by stage, slowest stages first
+
+    Args:
+        spans (list[dict]): records, defaults to every record so far
+        top (int): only the slowest stages
+
+    Returns:
+        Pandas DataFrame: calls, total and mean wall time, cpu time, rows and the memory of every stage. max_rss is
+            the process high-water mark at the end of the stage, which an earlier stage may have set, rss_growth the
+            most a single call raised it
+    """
+
+    df = pd.DataFrame(records() if spans is None else spans)
+
+    if df.empty:
+        return pd.DataFrame(columns = ['stage', 'calls', 'wall', 'mean_wall', 'cpu', 'rows'])
+
+    columns = {'calls': ('wall', 'size'), 'wall': ('wall', 'sum'), 'mean_wall': ('wall', 'mean'),
+               'cpu': ('cpu', 'sum'), 'rows': ('rows', lambda rows: rows.sum(min_count = 1))}
+    for peak in ('max_rss', 'rss_growth', 'peak_traced'):
+        if peak in df.columns:
+            columns[peak] = (peak, 'max')
+
+    table = df.groupby('stage').agg(**columns).sort_values('wall', ascending = False).reset_index()
+
+    return table if top is None else table.head(top)
+
+
+def export_jsonl(path: str, spans: list[dict] = None):
+    """
+    Appends records, defaulting to every record so far, to a json lines file, one line per span
+    """
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+
+    with open(path, 'a', encoding = 'utf-8') as file:
+        for record in (records() if spans is None else spans):
+            file.write(json.dumps(record, separators = (',', ':')) + '\n')
+
+
+def prometheus(spans: list[dict] = None) -> str:
+    """
+    The per stage totals in the prometheus text exposition format, over the records kept (see MAX_RECORDS)
+    """
+
+    table = summary(spans)
+    lines = []
+
+    metrics = [('stage_calls_total', 'calls', 'counter', 'Finished spans'),
+               ('stage_wall_seconds_total', 'wall', 'counter', 'Wall time spent in the stage'),
+               ('stage_cpu_seconds_total', 'cpu', 'counter', 'Process cpu time spent in the stage'),
+               ('stage_rows_total', 'rows', 'counter', 'Rows processed by the stage'),
+               ('process_max_rss_bytes', 'max_rss', 'gauge', 'Process resident set high-water mark at the end of the stage'),
+               ('stage_rss_growth_bytes', 'rss_growth', 'gauge', 'Most a call of the stage raised the process high-water mark'),
+               ('stage_peak_traced_bytes', 'peak_traced', 'gauge', 'Peak python allocations during the stage')]
+
+    for metric, column, kind, description in metrics:
+        if column not in table.columns:
+            continue
+
+        lines.append(f'# HELP {metric} {description}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for stage, value in zip(table['stage'], table[column]):
+            if pd.notna(value):
+                label = stage.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{metric}{{stage="{label}"}} {float(value):g}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def serve(port: int = 9108, host: str = '127.0.0.1'):
+    """
+    Serves prometheus() on /metrics from a background thread
+
+    Returns:
+        http.server.HTTPServer: the server, shutdown() stops it
+    """
+
+    # imported here, so importing the instrumented modules doesn't load the http stack
+    import http.server
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+
+            body = prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+
+    return server
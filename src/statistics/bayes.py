@@ -2,18 +2,37 @@
 
 import pandas as pd
 import numpy as np
-from collections import deque
 import src.statistics.statistical_functions as sf
+import src.statistics.bootstrap as bs
+import src.statistics.model_log as ml
+import src.data.datasets as ds
+import src.instrumentation as inst
 
 import logging
 
-# active 2024 quarterbacks with strength of defense adjusted passing yards metrics
+# model results are logged here
+LOG_DIR = ml.LOG_DIR
 
-all_qb_weighted = pd.read_csv(r"C:\Users\jonat\OneDrive\projects\scrape_and_score\data\processed\all_quarterbacks_weighted.txt")
+# player categories by (line, dataset version)
+_category_cache = {}
+_category_cache_size = 256
 
 
 
-def over_under(df, qb: str, line: float, games: int, avg_yards: float) -> list:
+def __getattr__(name):
+
+    # active 2024 quarterbacks with strength of defense adjusted passing yards metrics, read on first access.
+    # the compact frame, so names compare as categorical codes
+    if name == 'all_qb_weighted':
+        return ds.load('quarterbacks_weighted', compact = True)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+
+@inst.timed()
+def over_under(df, qb: str, line: float, games: int, avg_yards: float, log: bool = True,
+               bootstrap: int = 0, block: str = 'game', level: float = 0.95, seed = None, processes: int = 1) -> list:
     """
     Determines whether a quarterbacks passing yards projection is overfit to recent data
     
@@ -23,45 +42,145 @@ def over_under(df, qb: str, line: float, games: int, avg_yards: float) -> list:
         line (float): passing yards projection
         games (int): number of games played in most recent season
         avg_yards (float) average yards over that interval of games
+        log (bool): whether to log the model results
+        bootstrap (int): number of bootstrap resamples for confidence intervals, 0 for none
+        block (str): resample individual 'game's or whole 'player' careers
+        level (float): coverage of the confidence intervals
+        seed (int): seeds the resamples
+        processes (int): worker processes for the resamples
 
     Returns:
+        see proj_under and proj_over. With bootstrap resamples a third element is added, a dictionary of
+        (low, high) intervals for 'qb_is_cat_over' and 'probability', see bootstrap.confidence_intervals
     """
 
     # create new dataframe with the n_game_averages column
     df = last_n_avg(df, games, 'weighted_yards', f'{games}_game_avg', 'name')
 
-    # create a dictionary for holding the odds that a player will hit the weighted yards value over the course of their career
-    categories = {}
+    result = project_line(df, qb, line, games, avg_yards, log = log)
 
-    for player in df['name'].unique():
+    if bootstrap:
+        # resamples evaluate the branch of the model the point estimate took
+        branch = player_categories(df, line)[0][qb]
+        result.append(bs.confidence_intervals(df, qb, line, games, avg_yards, branch, resamples = bootstrap,
+                                              block = block, level = level, seed = seed, processes = processes))
 
-        # if the probability of the qb hitting the line is over fifty, they are categorized as 'over
-        prob = sf.conditional_probability(df, [('weighted_yards', 'geq', line), ('name', 'eq', player)])                                
-        if prob > 0.5:
-            categories[player] = 'over'
+    return result
 
-        else:
-            categories[player] = 'under'
 
-        # store pobability qb of interest hits line
-        if player == qb:
-            qb_hits_line = prob
 
-    # map players to their category in a category column
-    df['category'] = df['name'].map(categories)
+@inst.timed()
+def project_line(df, qb: str, line: float, games: int, avg_yards: float, log: bool = True, index = None) -> list:
+    """
+    Runs the over_under model on game logs that already have the '{games}_game_avg' column,
+    so callers evaluating many lines can compute the rolling averages once
+
+    Args:
+        see over_under
+        index (ECDFIndex): optional index of df grouped by the category column df holds for this line,
+            built once for props sharing a line (see slate.prepare_frames). Without one the probabilities are scans
+
+    Returns:
+        see proj_under and proj_over
+    """
 
-    if prob < 50:
+    # the odds each player hits the line over the course of their career, and their resulting category
+    categories, hit_rates = player_categories(df, line)
 
-        return proj_under(df, categories, qb, line, games, avg_yards, qb_hits_line)
+    if qb not in hit_rates:
+        raise ValueError(f"No game logs found for {qb}")
+
+    # store pobability qb of interest hits line
+    qb_hits_line = hit_rates[qb]
+
+    # map players to their category, unless the index was built on this frame's category column
+    if index is None or not index.built_from(df, [('category', 'eq', 'over')]):
+        df['category'] = category_column(df, categories)
+
+    # quarterbacks who hit the line in at most half their games are projected to hit the under
+    if categories[qb] == 'under':
+
+        return proj_under(df, categories, qb, line, games, avg_yards, qb_hits_line, log = log, index = index)
 
     else:
 
-        return proj_over(df, categories, qb, line, games, avg_yards, qb_hits_line)
-    
+        return proj_over(df, categories, qb, line, games, avg_yards, qb_hits_line, log = log, index = index)
+
+
+
+@inst.timed()
+def player_categories(df, line: float) -> tuple[dict, dict]:
+    """
+    Categorizes every player as 'over' or 'under' a line in one grouped pass over the game logs
+    Results are cached per (line, dataset version), so repeated lines on a slate reuse them
+
+    Args:
+        df (Pandas DataFrame): dataframe with game logs of quarterbacks concatenated together
+        line (float): passing yards projection
+
+    Returns:
+        a tuple with two dictionaries
+            - the first maps players to their category, 'over' if they hit the line in more than half their games
+            - the second maps players to the probability they hit the line
+    """
+
+    key = (line, dataset_version(df))
+
+    if key not in _category_cache:
+
+        if df['name'].isnull().any():
+            raise ValueError("Null values detected in the column name")
+
+        # hit rate of every player, P(weighted_yards >= line | name == player)
+        hits = pd.Series(sf.condition_mask(df, ('weighted_yards', 'geq', line)), index = df.index)
+        hit_rates = hits.groupby(df['name'], sort = False, observed = True).mean().to_dict()
+
+        categories = {player: 'over' if prob > 0.5 else 'under' for player, prob in hit_rates.items()}
+
+        # keep the cache bounded, dropping the oldest entry
+        if len(_category_cache) >= _category_cache_size:
+            del _category_cache[next(iter(_category_cache))]
+
+        _category_cache[key] = (categories, hit_rates)
+
+    categories, hit_rates = _category_cache[key]
+
+    return dict(categories), dict(hit_rates)
+
+
+def category_column(df, categories: dict) -> pd.Series:
+    """
+    The category of every game log's player, a categorical when the names are
+    """
+
+    column = df['name'].map(categories)
+    if isinstance(df['name'].dtype, pd.CategoricalDtype):
+        column = column.astype('category')
 
+    return column
+
+
+def dataset_version(df, columns: tuple = ('name', 'weighted_yards')) -> str:
+    """
+    Returns a fingerprint of the game log data used by the model, see datasets.fingerprint
+
+    Hashes the index and the name and weighted_yards columns once per frame, so a subset of a
+    frame is never mistaken for the whole of it
+    """
+
+    return ds.fingerprint(df, columns)
+
+
+def clear_category_cache():
+    """
+    Empties the player category cache
+    """
+
+    _category_cache.clear()
 
 
 
+@inst.timed()
 def last_n_avg(df, n: int, column_1: str, column_2: str, on_column: str):
     """
     creates a new column in a dataframe with the average value of the last n rows, where the value of a second column in the dataframe is unchanged
@@ -77,51 +196,46 @@ def last_n_avg(df, n: int, column_1: str, column_2: str, on_column: str):
         New Pandas dataframe with 'last_n_avg' column
     """
 
-    # initialize a queue to calculate averages
-    queue = deque()
+    values = df[column_1].to_numpy(dtype = float)
+    averages = np.full(len(df), np.nan)
 
-    # store first on_column value
-    on_column_val = df.loc[0, on_column]
+    if 0 < n <= len(df):
 
-    # create a new column to store the average of the last n values
-    df[column_2] = np.nan
-
-    for index, row in df.iterrows():
-
-        # check if on_column value has changed
-        if on_column_val != row[on_column]:
-
-            # remove all values from queue
-            queue = deque()
-
-        # append value from column where averages are calculated
-        queue.append(row[column_1])
+        # label each run of rows where the on_column value is unchanged
+        keys = df[on_column]
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            keys = keys.cat.codes
+        runs = (keys != keys.shift()).cumsum().to_numpy()
 
-        # ensure there is the proper number of elements
-        if len(queue) == n:
-            
-            # calculate the average
-            average = sum(queue) / n
+        # a view of the last n values ending at every row from the (n - 1)th onwards
+        windows = np.lib.stride_tricks.sliding_window_view(values, n)
 
-            df.loc[index, column_2] = average
+        # sum the columns of the window left to right, the same order a running queue would add them
+        total = windows[:, 0].copy()
+        for i in range(1, n):
+            total += windows[:, i]
 
-            # remove the first element
-            queue.popleft()
+        # a window only counts if it doesn't cross a change in the on_column value
+        complete = runs[n - 1:] == runs[:len(runs) - n + 1]
+        averages[n - 1:] = np.where(complete, total / n, np.nan)
 
-        # update 'on_column'
-        on_column_val = row[on_column] 
+    # create a new column to store the average of the last n values
+    df[column_2] = averages
 
     return df 
 
 
 
-def proj_under(df, categories: dict, qb: str, line: float, games: int, avg_yards: float, qb_hits_line: float):
+@inst.timed()
+def proj_under(df, categories: dict, qb: str, line: float, games: int, avg_yards: float, qb_hits_line: float, log: bool = True,
+               index = None):
     """
     Calculates the probability a quarterback will hit the over on their line given 
     that they are projected to hit the under based on historical data
 
     Args: 
         df (Pandas DataFrame): a dataframe with a category over or under column
+        index (ECDFIndex): optional index of df grouped by category, built on the dropna frame
 
     Returns:
         a list with two elements
@@ -129,18 +243,23 @@ def proj_under(df, categories: dict, qb: str, line: float, games: int, avg_yards
             - second element is the probability that the quarterback hits their line  
     """
 
-    # calculate probability quarterback projected to hit the over hits the given string of games
-    hit_avg_gvn_ovr = sf.conditional_probability(df, [(f'{games}_game_avg', 'geq', avg_yards), ('category', 'eq', 'over')], null = True)
+    # the component probabilities share the dropna frame and the category condition, so they run as one batch
+    query = sf.ProbabilityQuery(df, index = index)
 
-    # calculate odds a quarterback is category over
-    overs = sum(1 for value in categories.values() if value == 'over')
-    cat_over = overs / len(categories)
+    # calculate probability quarterback projected to hit the over hits the given string of games
+    query.conditional_probability([(f'{games}_game_avg', 'geq', avg_yards), ('category', 'eq', 'over')], null = True)
 
     # odds a quarterback hits the over given they are category over
-    hit_ovr_gvn_ovr = sf.conditional_probability(df, [('weighted_yards', 'geq', line), ('category', 'eq', 'over')], null = True)
+    query.conditional_probability([('weighted_yards', 'geq', line), ('category', 'eq', 'over')], null = True)
 
     # odds of any player hitting n game avg 
-    hit_avg = sf.probability(df, (f'{games}_game_avg', 'geq', avg_yards), null = True)
+    query.probability((f'{games}_game_avg', 'geq', avg_yards), null = True)
+
+    hit_avg_gvn_ovr, hit_ovr_gvn_ovr, hit_avg = query.run()
+
+    # calculate odds a quarterback is category over
+    overs = sum(1 for value in categories.values() if value == 'over')
+    cat_over = overs / len(categories)
 
     # Bayesian analysis (odds of that line given category 1 (log this), times odds of category 1 (log this), 
         # over total odds of hitting that avg over that game span (log this) = odds of category 1 given that run) 
@@ -155,21 +274,35 @@ def proj_under(df, categories: dict, qb: str, line: float, games: int, avg_yards
 
     # log results
 
-    logging_probabilities(df, categories, qb, games, avg_yards, qb_hits_line, cat_over,
-                        qb_is_cat_over, expected_probability)
+    if log:
+        logging_probabilities(df, categories, qb, games, avg_yards, qb_hits_line, cat_over,
+                            qb_is_cat_over, expected_probability)
 
     return [df, expected_probability]
 
 
 
-def proj_over(df, categories: dict, qb: str, line: float, games: int, avg_yards: float, qb_hits_line: float):
+@inst.timed()
+def proj_over(df, categories: dict, qb: str, line: float, games: int, avg_yards: float, qb_hits_line: float, log: bool = True,
+              index = None):
     """
     Calculates probability a quarterback will hit the over on their line given 
     that they are projected to hit the over based on historical data
     """
 
+    # the component probabilities share the dropna frame, so they run as one batch
+    query = sf.ProbabilityQuery(df, index = index)
+
     # calculate probability quarterback projected to hit under misses the given string of games
-    miss_avg_gvn_under = sf.conditional_probability(df, [(f'{games}_game_avg', 'leq', avg_yards), ('category', 'eq', 'over')], null = True)
+    query.conditional_probability([(f'{games}_game_avg', 'leq', avg_yards), ('category', 'eq', 'over')], null = True)
+
+    # odds a player misses line given they are category under
+    query.conditional_probability([('weighted_yards', 'leq', line), ('category', 'eq', 'under')], null = True)
+
+    # odds of any player missing the n-game average 
+    query.probability((f'{games}_game_avg', 'geq', avg_yards), null = True)
+
+    miss_avg_gvn_under, miss_ovr_gvn_undr, miss_avg = query.run()
 
     # odds of a player being category under
     unders = sum(1 for value in categories.values() if value == 'under')
@@ -178,12 +311,6 @@ def proj_over(df, categories: dict, qb: str, line: float, games: int, avg_yards:
     # odds of a player being category over
     cat_over = 1 - cat_under
 
-    # odds a player misses line given they are category under
-    miss_ovr_gvn_undr = sf.conditional_probability(df, [('weighted_yards', 'leq', line), ('category', 'eq', 'under')], null = True)
-
-    # odds of any player missing the n-game average 
-    miss_avg = sf.probability(df, (f'{games}_game_avg', 'geq', avg_yards), null = True)
-
     # Bayesian analysis (odds of missing that average given category under, times odds of category under, 
         # over total odds of missing that average = probability qb misses line given that string of games
 
@@ -196,31 +323,35 @@ def proj_over(df, categories: dict, qb: str, line: float, games: int, avg_yards:
     # return the complement of the expected probability qb misses line
     expected_probability = (qb_is_cat_under) * (miss_ovr_gvn_undr) + (1 - qb_is_cat_under) * (1 - qb_hits_line)
 
-    logging_probabilities(df, categories, qb, games, avg_yards, qb_hits_line, (1 - cat_over), (1 - qb_is_cat_under), expected_probability)
+    if log:
+        logging_probabilities(df, categories, qb, games, avg_yards, qb_hits_line, (1 - cat_over), (1 - qb_is_cat_under), expected_probability)
 
     return [df, 1 - expected_probability]
 
 
 
 
+@inst.timed()
 def logging_probabilities(df, categories: dict, qb: str, games: int, avg_yards,
                             qb_hits_line: float, cat_over: float, 
                             qb_is_cat_over: float, expected_probability: float):
     """
-    calculates and returns all the probabilities needed for over_under functions
+    Logs a model run, queued for the background writer so the model never waits on disk
+
+    The run's probabilities and the sizes of its categories go to the run log as one json line,
+    and the full frame is dumped for a sampled share of runs, see model_log.configure
     """
 
-    # create a dataframe to return with all relevant values
-    logging_df = pd.DataFrame({'model': ['bayes'], 
-                            'name': [f'{qb}'], 
-                            'games': [games], 
-                            'avg': [avg_yards],
-                            f'hist over (qb)': [qb_hits_line], 
-                            'hist over (all)' : [cat_over], 
-                            f'bayes over': [qb_is_cat_over],
-                            f'odds hits over': [expected_probability]})
-    
-    # log the model results
-    logging_df.to_csv(r"C:\Users\jonat\OneDrive\projects\scrape_and_score\logging\models\bayes.log")
-    df.to_csv(r"C:\Users\jonat\OneDrive\projects\scrape_and_score\logging\models\df.log")
-    pd.Series(categories).to_csv(r"C:\Users\jonat\OneDrive\projects\scrape_and_score\logging\models\categories.log")
+    overs = sum(1 for value in categories.values() if value == 'over')
+
+    ml.log_run({'model': 'bayes',
+                'name': qb,
+                'games': games,
+                'avg': avg_yards,
+                'hist_over_qb': qb_hits_line,
+                'hist_over_all': cat_over,
+                'bayes_over': qb_is_cat_over,
+                'odds_hits_over': expected_probability,
+                'players': len(categories),
+                'over_players': overs,
+                'rows': len(df)}, frame = df)
@@ -0,0 +1,244 @@
+# bootstrap confidence intervals for the bayes model
+# every resample is a row of weights over the game logs, so the model's frequencies become weighted counts,
+# and a whole chunk of resamples is evaluated with a single matrix product
+
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+import src.statistics.statistical_functions as sf
+import src.instrumentation as inst
+
+# resamples evaluated at once, bounding the weight matrix to chunk_size x rows
+CHUNK_SIZE = 500
+
+# indicator columns summed per player for every resample
+_INDICATORS = ['games', 'hits', 'valid', 'avg_geq', 'avg_leq', 'line_geq', 'line_leq']
+
+# problem shared with the worker processes
+_problem = None
+
+
+@inst.timed()
+def confidence_intervals(df, qb: str, line: float, games: int, avg_yards: float, branch: str,
+                         resamples: int = 10000, block: str = 'game', level: float = 0.95, seed = None,
+                         processes: int = 1, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Bootstraps the bayes model's probabilities for a quarterback's line
+
+    Each resample redraws the game logs with replacement, either game by game or as whole player careers,
+    and recomputes every component of the model from the resample: the players' hit rates and categories,
+    the share of over players, the conditional frequencies, the posterior probability the quarterback is
+    category over, and the final probability of the over. Resamples are drawn as multinomial weight matrices,
+    so the frequencies of a chunk of resamples are weighted counts from one matrix product
+
+    Args:
+        df (Pandas DataFrame): game logs with the '{games}_game_avg' column, see bayes.last_n_avg
+        qb (str): name of the quarterback
+        line (float): passing yards projection
+        games (int): number of games in the rolling average
+        avg_yards (float): average yards over that interval of games
+        branch (str): 'under' or 'over', the quarterback's category in the full data. Every resample
+            evaluates the same branch of the model, so the intervals describe the point estimate
+        resamples (int): number of bootstrap resamples
+        block (str): 'game' to resample individual games, 'player' to resample whole careers
+        level (float): coverage of the percentile intervals
+        seed (int): seeds the resamples, results don't depend on the number of processes
+        processes (int): worker processes sharing the chunks of resamples, 1 runs in this process
+        chunk_size (int): resamples evaluated at once
+
+    Returns:
+        dict: (low, high) percentile intervals for 'qb_is_cat_over' and 'probability', resamples where
+            a value is undefined, like one without the quarterback, are left out
+    """
+
+    if block not in ('game', 'player'):
+        raise ValueError(f"Unknown block {block}. Use 'game' or 'player'.")
+
+    if branch not in ('under', 'over'):
+        raise ValueError(f"Unknown branch {branch}. Use 'under' or 'over'.")
+
+    if not 0 < level < 1:
+        raise ValueError("level must be between 0 and 1")
+
+    if resamples < 1:
+        raise ValueError("resamples must be positive")
+
+    problem = prepare(df, qb, line, games, avg_yards, branch, block)
+
+    # one seed per chunk, so the draws are the same however the chunks are spread over processes
+    sizes = [min(chunk_size, resamples - start) for start in range(0, resamples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = list(zip(sizes, seeds))
+
+    processes = min(processes or 1, len(tasks))
+
+    if processes <= 1:
+        chunks = [_evaluate(problem, size, chunk_seed) for size, chunk_seed in tasks]
+
+    else:
+        context = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+        with context.Pool(processes, initializer = _init_worker, initargs = (problem,)) as pool:
+            chunks = pool.map(_worker, tasks, chunksize = 1)
+
+    qb_is_cat_over = np.concatenate([chunk[0] for chunk in chunks])
+    probability = np.concatenate([chunk[1] for chunk in chunks])
+
+    return {
+        'qb_is_cat_over': percentile_interval(qb_is_cat_over, level),
+        'probability': percentile_interval(probability, level),
+    }
+
+
+def prepare(df, qb: str, line: float, games: int, avg_yards: float, branch: str, block: str) -> dict:
+    """
+    Reduces the game logs to the indicator columns the model counts
+
+    Returns:
+        dict: the player of every row, the indicators as a rows x (indicators * players) matrix whose
+            weighted column sums are the per player counts, and the model settings
+    """
+
+    if df['name'].isnull().any():
+        raise ValueError("Null values detected in the column name")
+
+    codes, players = pd.factorize(df['name'])
+
+    if qb not in players:
+        raise ValueError(f"No game logs found for {qb}")
+
+    avg_column = f'{games}_game_avg'
+
+    # the conditional frequencies of the model drop rows with a null in any column
+    valid = df.notna().all(axis = 1).to_numpy()
+    complete = df[valid]
+
+    def on_complete(event):
+        mask = np.zeros(len(df), dtype = bool)
+        mask[valid] = sf.condition_mask(complete, event)
+        return mask
+
+    indicators = np.column_stack([
+        np.ones(len(df), dtype = bool),
+        sf.condition_mask(df, ('weighted_yards', 'geq', line)),
+        valid,
+        on_complete((avg_column, 'geq', avg_yards)),
+        on_complete((avg_column, 'leq', avg_yards)),
+        on_complete(('weighted_yards', 'geq', line)),
+        on_complete(('weighted_yards', 'leq', line)),
+    ]).astype(float)
+
+    # indicators spread into one block of columns per player
+    onehot = np.zeros((len(df), len(players)))
+    onehot[np.arange(len(df)), codes] = 1.0
+    spread = (indicators[:, :, None] * onehot[:, None, :]).reshape(len(df), -1)
+
+    return {
+        'codes': codes,
+        'players': len(players),
+        'qb': players.get_loc(qb),
+        'spread': spread,
+        # per player totals, enough for resampling whole careers
+        'totals': spread.sum(axis = 0).reshape(len(_INDICATORS), len(players)).T,
+        'branch': branch,
+        'block': block,
+    }
+
+
+def statistics(problem: dict, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Evaluates the model for rows of resample weights
+
+    Args:
+        problem (dict): from prepare
+        weights (np.ndarray): resamples x rows weights for game resampling, resamples x players for player resampling
+
+    Returns:
+        tuple: arrays of qb_is_cat_over and the final probability, one value per resample
+    """
+
+    if problem['block'] == 'game':
+        sums = (weights @ problem['spread']).reshape(len(weights), len(_INDICATORS), problem['players'])
+    else:
+        sums = weights[:, None, :] * problem['totals'].T[None, :, :]
+
+    counts = dict(zip(_INDICATORS, np.moveaxis(sums, 1, 0)))
+
+    # a career drawn twice counts as two players
+    players = weights if problem['block'] == 'player' else (counts['games'] > 0)
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+
+        # hit rate of every player drawn, and their resulting category
+        drawn = counts['games'] > 0
+        hit_rates = counts['hits'] / counts['games']
+        over = drawn & (hit_rates > 0.5)
+        under = drawn & ~over
+
+        qb_hits_line = hit_rates[:, problem['qb']]
+        cat_over = (players * over).sum(axis = 1) / players.sum(axis = 1)
+
+        def conditional(event, given):
+            # frequency of an event among the complete rows of the given category, 0 when there are none
+            space = (counts['valid'] * given).sum(axis = 1)
+            joint = (counts[event] * given).sum(axis = 1)
+            return np.where(space > 0, joint / space, 0.0)
+
+        hit_avg = counts['avg_geq'].sum(axis = 1) / counts['valid'].sum(axis = 1)
+
+        if problem['branch'] == 'under':
+            hit_avg_gvn_ovr = conditional('avg_geq', over)
+            hit_ovr_gvn_ovr = conditional('line_geq', over)
+
+            qb_is_cat_over = np.where(hit_avg == 0, np.inf, hit_avg_gvn_ovr * cat_over / hit_avg)
+            probability = qb_is_cat_over * hit_ovr_gvn_ovr + (1 - qb_is_cat_over) * qb_hits_line
+
+        else:
+            miss_avg_gvn_under = conditional('avg_leq', over)
+            miss_ovr_gvn_undr = conditional('line_leq', under)
+            cat_under = 1 - cat_over
+
+            qb_is_cat_under = np.where(hit_avg == 0, np.inf, miss_avg_gvn_under * cat_under / hit_avg)
+            expected_probability = qb_is_cat_under * miss_ovr_gvn_undr + (1 - qb_is_cat_under) * (1 - qb_hits_line)
+
+            qb_is_cat_over = 1 - qb_is_cat_under
+            probability = 1 - expected_probability
+
+    return qb_is_cat_over, probability
+
+
+def percentile_interval(values: np.ndarray, level: float) -> tuple[float, float]:
+    """
+    Returns the equal tailed percentile interval of the defined values
+    """
+
+    values = values[~np.isnan(values)]
+
+    if len(values) == 0:
+        return (np.nan, np.nan)
+
+    tail = (1 - level) / 2 * 100
+    low, high = np.percentile(values, [tail, 100 - tail])
+
+    return (float(low), float(high))
+
+
+def _evaluate(problem: dict, size: int, seed) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+
+    # every resample draws as many games, or players, as the data has. Counting the draws of each unit gives
+    # multinomial weights several times faster than sampling the multinomial directly
+    units = len(problem['codes']) if problem['block'] == 'game' else problem['players']
+    draws = rng.integers(0, units, size = (size, units)) + np.arange(size)[:, None] * units
+    weights = np.bincount(draws.ravel(), minlength = size * units).reshape(size, units).astype(float)
+
+    return statistics(problem, weights)
+
+
+def _worker(task: tuple) -> tuple[np.ndarray, np.ndarray]:
+    size, seed = task
+    return _evaluate(_problem, size, seed)
+
+
+def _init_worker(problem: dict):
+    global _problem
+    _problem = problem
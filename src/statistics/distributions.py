@@ -0,0 +1,266 @@
+# smooth per quarterback models of passing yards
+# a distribution is fit once to a quarterback's game logs and tabulated as a cdf on a yards grid spanning the data,
+# so the probability of any line or range is an interpolated lookup instead of a count over the rows
+
+import os
+import math
+import hashlib
+import numpy as np
+import src.data.datasets as ds
+import src.statistics.bayes as bayes
+
+# cdfs are tabulated in half yard steps, from TAILS spreads below the lowest value to TAILS spreads above
+# the highest, so the mass a fit puts outside its grid is at most TAIL_MASS, checked when the fit is made
+STEP = 0.5
+TAILS = 8
+TAIL_MASS = 1e-6
+GAMMA_MASS = 1e-3
+
+KINDS = ('kde', 'normal', 'gamma')
+
+# fitted cdfs, one .npy file per fit named by the hash of the data it was fit to
+CACHE_DIR = os.path.join(ds.CACHE_DIR, 'distributions')
+
+# bump when a fitting function changes, so persisted fits are refit
+FIT_VERSION = 2
+
+# fitted distributions by (dataset version, quarterback, column, kind)
+_cache = {}
+_cache_size = 256
+
+
+class Distribution:
+    """
+    A distribution tabulated as its cdf on a grid
+
+    Args:
+        cdf (np.ndarray): P(X <= x) at every grid point
+        grid (np.ndarray): increasing grid points
+    """
+
+    def __init__(self, cdf: np.ndarray, grid: np.ndarray):
+        self.grid = grid
+        self.table = cdf
+
+    def cdf(self, yards):
+        """
+        P(X <= yards), for a number or an array
+        """
+
+        return np.interp(yards, self.grid, self.table, left = 0.0, right = 1.0)
+
+    def sf(self, yards):
+        """
+        P(X >= yards), the probability of hitting a line
+        """
+
+        return 1 - self.cdf(yards)
+
+    def probability(self, low: float = None, high: float = None) -> float:
+        """
+        P(low <= X <= high), either bound can be left open
+        """
+
+        upper = 1.0 if high is None else self.cdf(high)
+        lower = 0.0 if low is None else self.cdf(low)
+
+        return float(upper - lower)
+
+
+def fit(values, kind: str = 'kde', grid: np.ndarray = None) -> Distribution:
+    """
+    Fits a distribution to a sample and tabulates its cdf
+
+    Args:
+        values (array like): the sample, without nulls
+        kind (str): 'kde' for a gaussian kernel density estimate with Silverman's bandwidth,
+            'normal' or 'gamma' for a parametric fit by the method of moments
+        grid (np.ndarray): increasing grid points to tabulate the cdf at, defaults to one spanning the sample.
+            A ValueError is raised when the fit puts more than TAIL_MASS outside the grid
+
+    Returns:
+        Distribution: the fitted distribution
+    """
+
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind {kind}. Use one of: {', '.join(KINDS)}.")
+
+    values = np.asarray(values, dtype = float)
+
+    if len(values) < 2 or np.isnan(values).any():
+        raise ValueError("At least two values without nulls are needed to fit a distribution")
+
+    mean = values.mean()
+    std = values.std(ddof = 1)
+
+    if grid is None:
+        grid = sample_grid(values, std)
+
+    if kind == 'normal':
+        cdf = normal_cdf((grid - mean) / max(std, 1e-9))
+
+    elif kind == 'gamma':
+        cdf = gamma_cdf(grid, mean, std)
+
+    else:
+        # the mean of a normal cdf centered on every value
+        q75, q25 = np.percentile(values, [75, 25])
+        spread = min(std, (q75 - q25) / 1.34) or std
+        bandwidth = max(0.9 * spread * len(values) ** (-1 / 5), 1e-9)
+
+        cdf = normal_cdf((grid[:, None] - values[None, :]) / bandwidth).mean(axis = 1)
+
+    if cdf[0] > TAIL_MASS or cdf[-1] < 1 - TAIL_MASS:
+        raise ValueError(f"The grid from {grid[0]} to {grid[-1]} leaves out more than {TAIL_MASS} of the {kind} fit")
+
+    return Distribution(cdf, grid)
+
+
+def sample_grid(values: np.ndarray, std: float) -> np.ndarray:
+    """
+    Grid points every STEP yards, from TAILS standard deviations below the lowest value to TAILS above the highest
+    """
+
+    spread = TAILS * max(std, STEP)
+    low = math.floor((values.min() - spread) / STEP) * STEP
+    high = math.ceil((values.max() + spread) / STEP) * STEP
+
+    return np.linspace(low, high, int(round((high - low) / STEP)) + 1)
+
+
+def player_distribution(df, qb: str, kind: str = 'kde', column: str = 'weighted_yards',
+                        persist: bool = True) -> Distribution:
+    """
+    Returns the distribution of a quarterback's game logs, fitting it only when their data changed
+
+    Fits are cached in memory by a fingerprint of the frame (see bayes.dataset_version), and on disk by the
+    hash of the quarterback's values, so a new dataset version only refits quarterbacks whose games
+    changed, and worker processes load fits instead of refitting them
+
+    Args:
+        df (Pandas DataFrame): dataframe with game logs of quarterbacks concatenated together
+        qb (str): name of the quarterback
+        kind (str): see fit
+        column (str): the column to model
+        persist (bool): read and write fits in CACHE_DIR
+
+    Returns:
+        Distribution: the fitted distribution
+    """
+
+    key = (bayes.dataset_version(df, ('name', column)), qb, column, kind)
+
+    if key not in _cache:
+
+        values = df.loc[df['name'] == qb, column].to_numpy(dtype = float)
+
+        if len(values) == 0:
+            raise ValueError(f"No game logs found for {qb}")
+
+        digest = hashlib.sha256(f'{kind}_{FIT_VERSION}_{STEP}_{TAILS}'.encode())
+        digest.update(values.tobytes())
+        path = os.path.join(CACHE_DIR, f'{digest.hexdigest()[:32]}.npy')
+
+        distribution = _read_fit(path) if persist else None
+
+        if distribution is None:
+            distribution = fit(values, kind)
+            if persist:
+                _write_fit(path, distribution)
+
+        # keep the cache bounded, dropping the oldest entry
+        if len(_cache) >= _cache_size:
+            del _cache[next(iter(_cache))]
+
+        _cache[key] = distribution
+
+    return _cache[key]
+
+
+def line_probability(df, qb: str, line: float, kind: str = 'kde', column: str = 'weighted_yards') -> float:
+    """
+    Probability a quarterback's yards reach a line, P(yards >= line), from their fitted distribution
+    """
+
+    return float(player_distribution(df, qb, kind, column).sf(line))
+
+
+def clear_cache():
+    """
+    Empties the in memory cache of fitted distributions
+    """
+
+    _cache.clear()
+
+
+def normal_cdf(z: np.ndarray) -> np.ndarray:
+    """
+    The standard normal cdf, vectorized
+    """
+
+    return 0.5 * (1 + erf(np.asarray(z) / math.sqrt(2)))
+
+
+def erf(x: np.ndarray) -> np.ndarray:
+    """
+    The error function, vectorized, from Abramowitz and Stegun 7.1.26 (absolute error below 1.5e-7)
+    """
+
+    x = np.asarray(x, dtype = float)
+    sign = np.sign(x)
+    x = np.abs(x)
+
+    t = 1 / (1 + 0.3275911 * x)
+    polynomial = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+
+    return sign * (1 - polynomial * np.exp(-x * x))
+
+
+def gamma_cdf(grid: np.ndarray, mean: float, std: float) -> np.ndarray:
+    """
+    The cdf of the gamma distribution with a given mean and standard deviation,
+    integrated numerically from its density on the grid
+    """
+
+    if mean <= 0 or std <= 0:
+        raise ValueError("A gamma fit needs a positive mean and standard deviation")
+
+    shape = (mean / std) ** 2
+    scale = std ** 2 / mean
+
+    x = np.clip(grid, 0, None)
+    with np.errstate(divide = 'ignore'):
+        log_density = (shape - 1) * np.log(x) - x / scale - math.lgamma(shape) - shape * math.log(scale)
+    density = np.where(grid > 0, np.exp(log_density), 0.0)
+
+    # trapezoid rule, normalized so the grid holds all the mass once it is known to hold nearly all of it.
+    # the quadrature error is far above TAIL_MASS near zero yards, so the mass is checked to GAMMA_MASS
+    cdf = np.concatenate([[0.0], np.cumsum((density[1:] + density[:-1]) / 2 * np.diff(grid))])
+
+    if abs(cdf[-1] - 1) > GAMMA_MASS:
+        raise ValueError(f"The grid from {grid[0]} to {grid[-1]} holds {cdf[-1]:.4f} of the gamma fit")
+
+    return cdf / cdf[-1]
+
+
+def _read_fit(path: str):
+
+    # the grid and the cdf as two rows
+    try:
+        grid, cdf = np.load(path, allow_pickle = False)
+        return Distribution(cdf, grid)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_fit(path: str, distribution: Distribution):
+
+    # write then rename, so workers never read a partial file. An unwritable cache only costs refits
+    try:
+        os.makedirs(CACHE_DIR, exist_ok = True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as file:
+            np.save(file, np.stack([distribution.grid, distribution.table]))
+        os.replace(temporary, path)
+    except OSError:
+        pass
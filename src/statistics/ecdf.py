@@ -0,0 +1,195 @@
+# sorted value arrays for answering threshold probabilities with a binary search instead of a scan
+
+import weakref
+
+import numpy as np
+import pandas as pd
+
+
+class ECDFIndex:
+    """
+    Per-group and global sorted arrays of the numeric columns in a dataframe
+
+    Built once from a game log frame, the index answers queries of the form
+    P(column op value) and P(column op value | group_column == group) with np.searchsorted.
+    Pass it to sf.probability or sf.conditional_probability through the index argument,
+    queries that don't fit its shape, or against a frame other than the one it was built from,
+    fall back to the normal scan
+
+    Args:
+        df (pd.DataFrame): the dataframe containing the data
+        group_column (str): column identifying a group, i.e. the quarterback name
+        columns (list[str]): numeric columns to index, defaults to every numeric column
+        null (bool): build the index on df.dropna(), matching the null argument of the sf functions
+    """
+
+    def __init__(self, df, group_column: str = 'name', columns: list[str] = None, null = False):
+
+        self.null = null != False
+        self.source_rows = len(df)
+        self.group_column = group_column
+        source = df
+
+        if self.null:
+            df = df.dropna()
+
+        self.size = len(df)
+
+        if columns is None:
+            columns = [column for column in df.select_dtypes(include = 'number').columns if column != group_column]
+
+        # columns with null values are left out, the sf functions raise on them
+        columns = [column for column in columns if not df[column].isnull().any()]
+
+        # global index for marginal probabilities
+        self.columns = {column: np.sort(df[column].to_numpy(dtype = float)) for column in columns}
+
+        # the source frame and the buffers of its indexed columns, so queries on another frame, or on a column
+        # given new values since, aren't answered from the index
+        self.source = weakref.ref(source)
+        self.source_columns = list(source.columns)
+        self.sources = {column: _buffer(source[column]) for column in [*columns, group_column] if column in source.columns}
+
+        # per group index for probabilities conditional on the group
+        self.groups = {column: {} for column in columns}
+
+        if group_column in df.columns and not df[group_column].isnull().any():
+
+            codes, uniques = pd.factorize(df[group_column])
+
+            for column in columns:
+                values = df[column].to_numpy(dtype = float)
+
+                # sort by group, then by value, and split the sorted values at the group boundaries
+                order = np.lexsort((values, codes))
+                bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+                sorted_values = values[order]
+
+                self.groups[column] = {
+                    group: sorted_values[bounds[i]:bounds[i + 1]] for i, group in enumerate(uniques)
+                    }
+
+        else:
+            self.group_column = None
+
+    def __getstate__(self):
+
+        # pickled with the frame it was built from, i.e. to a spawned worker along with the frame
+        state = dict(self.__dict__)
+        state['source'] = self.source()
+        return state
+
+    def __setstate__(self, state):
+
+        source = state['source']
+        self.__dict__.update(state)
+
+        # the unpickled frame holds the same values in new buffers
+        if source is None:
+            self.source = lambda: None
+        else:
+            self.source = weakref.ref(source)
+            self.sources = {column: _buffer(source[column]) for column in state['sources']}
+
+    def built_from(self, df, conditions: list[tuple]) -> bool:
+        """
+        Checks that df is the frame the index was built from, and that the columns of the conditions
+        still hold the values indexed. Copy on write gives a column a new buffer when it is changed
+        """
+
+        if df is not self.source() or len(df) != self.source_rows:
+            return False
+
+        # the rows dropna keeps depend on every column
+        if self.null and list(df.columns) != self.source_columns:
+            return False
+
+        for condition in conditions:
+            column = condition[0]
+            if column not in self.sources or _buffer(df[column]) != self.sources[column]:
+                return False
+
+        return True
+
+    def lookup(self, conditions: list[tuple]):
+        """
+        Answers a probability query from the index
+
+        Args:
+            conditions (list[tuple]): the event followed by the conditions, as in sf.conditional_probability
+                only a single condition (group_column, 'eq', group) is supported
+
+        Returns:
+            float: the probability, or None when the query doesn't fit the index
+        """
+
+        event = conditions[0]
+
+        if event[0] not in self.columns or not _supported(event):
+            return None
+
+        if len(conditions) == 1:
+            values = self.columns[event[0]]
+
+        elif len(conditions) == 2 and conditions[1][0] == self.group_column and conditions[1][1] == 'eq':
+            values = self.groups[event[0]].get(conditions[1][2])
+
+            # the conditioning event never happened
+            if values is None:
+                return 0
+
+        else:
+            return None
+
+        if len(values) == 0:
+            return None if len(conditions) == 1 else 0
+
+        return _count(values, event[1], event[2]) / len(values)
+
+
+def _buffer(column: pd.Series) -> tuple:
+    """
+    The address, shape and strides of the memory holding a column, codes for a categorical
+    """
+
+    values = column.array
+    if isinstance(values, pd.Categorical):
+        values = values.codes
+
+    interface = np.asarray(values).__array_interface__
+
+    return interface['data'][0], interface['shape'], interface['strides']
+
+
+def _supported(event: tuple) -> bool:
+    """
+    Checks that an event compares against numbers the index can search for
+    """
+
+    values = event[2] if event[1] == 'in_range' else (event[2],)
+
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, float, np.number)) or np.isnan(value):
+            return False
+
+    return event[1] in ('geq', 'g', 'eq', 'l', 'leq', 'in_range')
+
+
+def _count(values: np.ndarray, operator: str, value) -> int:
+    """
+    Counts the elements of a sorted array satisfying a condition
+    """
+
+    if operator == 'geq':
+        return len(values) - np.searchsorted(values, value, side = 'left')
+    elif operator == 'g':
+        return len(values) - np.searchsorted(values, value, side = 'right')
+    elif operator == 'l':
+        return np.searchsorted(values, value, side = 'left')
+    elif operator == 'leq':
+        return np.searchsorted(values, value, side = 'right')
+    elif operator == 'eq':
+        return np.searchsorted(values, value, side = 'right') - np.searchsorted(values, value, side = 'left')
+    else:
+        low, high = value
+        return max(np.searchsorted(values, high, side = 'right') - np.searchsorted(values, low, side = 'left'), 0)
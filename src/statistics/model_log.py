@@ -0,0 +1,282 @@
+# append only log of model runs, written by a background thread
+# runs are put on a bounded queue and never wait on disk: when the writer falls behind, records are dropped
+# and counted. The writer appends one json line per run to a rotating file, and can sample the full frame
+# of a run to a separate npz file (see ds.write_frame), deleted when its run rotates out of the log
+
+import os
+import json
+import time
+import uuid
+import queue
+import random
+import atexit
+import logging
+import threading
+import contextlib
+import logging.handlers
+
+import src.data.datasets as ds
+
+LOG_DIR = os.path.join(ds.LOG_DIR, 'models')
+RUN_LOG = os.path.join(LOG_DIR, 'runs.jsonl')
+
+MAX_BYTES = 16 * 1024 * 1024    # size a log file rotates at
+BACKUPS = 5                     # rotated files kept
+QUEUE_SIZE = 10000              # runs waiting for the writer before new ones are dropped
+
+# share of runs whose full frame is dumped, 0 for none
+FRAME_SAMPLE = float(os.environ.get('MODEL_LOG_FRAME_SAMPLE', 0))
+
+_logger = logging.getLogger(__name__)
+_logger.propagate = False
+_logger.setLevel(logging.INFO)
+
+_lock = threading.Lock()
+_writer = None
+
+# records of runs inside collect(), by thread
+_local = threading.local()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    A queue handler that drops records instead of blocking when the queue is full
+    """
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # the listener runs in this process, so the record is passed along unformatted
+        return record
+
+
+class JsonLinesHandler(logging.handlers.RotatingFileHandler):
+    """
+    Writes the dict message of every record as a json line, and its sampled frame with ds.write_frame
+    """
+
+    def __init__(self, path: str, max_bytes: int = MAX_BYTES, backups: int = BACKUPS):
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        super().__init__(path, maxBytes = max_bytes, backupCount = backups, encoding = 'utf-8', delay = True)
+        self.frames = os.path.join(os.path.dirname(path), 'frames')
+
+    def format(self, record):
+        return json.dumps(record.msg, default = _json_default, separators = (',', ':'))
+
+    def emit(self, record):
+        frame = getattr(record, 'frame', None)
+
+        if frame is not None:
+            try:
+                os.makedirs(self.frames, exist_ok = True)
+                path = os.path.join(self.frames, record.msg['run'])
+
+                # read back with ds.read_frame, frames with columns that can't be stored without pickling are skipped
+                if ds.write_frame(path, frame):
+                    record.msg['frame'] = path
+            except Exception:
+                self.handleError(record)
+
+        super().emit(record)
+
+    def doRollover(self):
+
+        # the oldest file is deleted by the rollover, and the frames of its runs with it
+        if self.backupCount > 0:
+            self.drop_frames(self.rotation_filename(f'{self.baseFilename}.{self.backupCount}'))
+
+        super().doRollover()
+
+    def drop_frames(self, path: str):
+        """
+        Deletes the frames of the runs logged in a file
+        """
+
+        try:
+            with open(path, encoding = 'utf-8') as file:
+                lines = file.readlines()
+        except OSError:
+            return
+
+        for line in lines:
+            try:
+                frame = json.loads(line).get('frame')
+            except ValueError:
+                continue
+
+            if frame is None:
+                continue
+
+            for extension in ('.npz', '.json'):
+                with contextlib.suppress(OSError):
+                    os.remove(frame + extension)
+
+
+class _Listener(logging.handlers.QueueListener):
+
+    def enqueue_sentinel(self):
+        # waits for room, so stopping can't be dropped like a run
+        self.queue.put(self._sentinel)
+
+
+class _Writer:
+
+    def __init__(self, path: str, max_bytes: int, backups: int, queue_size: int):
+        self.pid = os.getpid()
+        self.queue = queue.Queue(queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.file_handler = JsonLinesHandler(path, max_bytes, backups)
+        self.listener = _Listener(self.queue, self.file_handler)
+        self.listener.start()
+        _logger.addHandler(self.handler)
+
+    def flush(self):
+        self.queue.join()
+        self.file_handler.flush()
+
+    def stop(self):
+        _logger.removeHandler(self.handler)
+        self.listener.stop()
+        self.file_handler.close()
+
+
+# settings of the writer, see configure
+_settings = {'path': RUN_LOG, 'max_bytes': MAX_BYTES, 'backups': BACKUPS, 'queue_size': QUEUE_SIZE}
+_frame_sample = FRAME_SAMPLE
+
+
+def configure(path: str = RUN_LOG, frame_sample: float = None, max_bytes: int = MAX_BYTES,
+              backups: int = BACKUPS, queue_size: int = QUEUE_SIZE):
+    """
+    Changes the settings of the writer, a running one writes its queued runs and is replaced on the next run
+
+    Args:
+        path (str): the json lines file runs are appended to
+        frame_sample (float): share of runs whose full frame is dumped, defaults to FRAME_SAMPLE
+        max_bytes (int): size the file rotates at
+        backups (int): rotated files kept
+        queue_size (int): runs waiting for the writer before new ones are dropped
+    """
+
+    global _frame_sample
+
+    stop()
+
+    with _lock:
+        _settings.update(path = path, max_bytes = max_bytes, backups = backups, queue_size = queue_size)
+        _frame_sample = FRAME_SAMPLE if frame_sample is None else frame_sample
+
+
+def log_run(record: dict, frame = None):
+    """
+    Queues a run for the writer, never waiting on disk
+
+    Args:
+        record (dict): json serializable values describing the run
+        frame (Pandas DataFrame): the run's full frame, dumped for a sampled share of runs
+    """
+
+    record = {'run': uuid.uuid4().hex, 'time': time.time(), **record}
+
+    # the caller may keep changing its frame, a sampled one is copied
+    if frame is not None and _frame_sample and random.random() < _frame_sample:
+        frame = frame.copy()
+    else:
+        frame = None
+
+    _emit(record, frame)
+
+
+@contextlib.contextmanager
+def collect():
+    """
+    Holds the runs logged by this thread instead of writing them, to be passed to replay().
+    Worker processes return their runs to the parent this way, so only one process writes the log
+    """
+
+    previous = getattr(_local, 'records', None)
+    _local.records = []
+
+    try:
+        yield _local.records
+    finally:
+        _local.records = previous
+
+
+def replay(records: list):
+    """
+    Logs the runs held by collect()
+    """
+
+    for record, frame in records:
+        _emit(record, frame)
+
+
+def dropped() -> int:
+    """
+    Number of runs dropped because the writer fell behind
+    """
+
+    return 0 if _writer is None else _writer.handler.dropped
+
+
+def flush():
+    """
+    Blocks until every queued run is written
+    """
+
+    if _writer is not None and _writer.pid == os.getpid():
+        _writer.flush()
+
+
+def stop():
+    """
+    Writes the queued runs and stops the writer, runs at exit
+    """
+
+    global _writer
+
+    with _lock:
+        if _writer is not None and _writer.pid == os.getpid():
+            _writer.stop()
+        _writer = None
+
+
+def _emit(record: dict, frame):
+
+    collected = getattr(_local, 'records', None)
+    if collected is not None:
+        collected.append((record, frame))
+        return
+
+    _current()
+    _logger.info(record, extra = {} if frame is None else {'frame': frame})
+
+
+def _json_default(value):
+    # numpy scalars as python numbers, anything else as text
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def _current() -> _Writer:
+    global _writer
+
+    # started on first use, and again in a forked child, which doesn't inherit the writer thread
+    with _lock:
+        if _writer is None or _writer.pid != os.getpid():
+            if _writer is not None:
+                _logger.removeHandler(_writer.handler)
+            _writer = _Writer(**_settings)
+
+    return _writer
+
+
+atexit.register(stop)
@@ -0,0 +1,160 @@
+# evaluating every quarterback prop on a slate with the bayes model, spread across a process pool
+
+import os
+import multiprocessing as mp
+import pandas as pd
+import src.statistics.bayes as bayes
+import src.statistics.model_log as ml
+import src.instrumentation as inst
+from src.statistics.ecdf import ECDFIndex
+
+# columns of a slate, one row per prop
+SLATE_COLUMNS = ['qb', 'line', 'games', 'avg_yards']
+
+# props sharing a line and number of games that are answered from a sorted index instead of scans.
+# building the index costs a little more than one prop's scans, so it pays off from the second prop
+INDEX_PROPS = 2
+
+# game log frames prepared for each rolling window length, inherited by forked workers
+_frames = None
+
+
+def run_slate(slate, df = None, processes: int = None, log: bool = False) -> pd.DataFrame:
+    """
+    Runs the over_under model for every prop on a slate
+
+    The game logs are prepared once: the rolling averages are computed for each distinct
+    number of games, and the player categories for each distinct line. Workers then inherit
+    the prepared frames through fork, or receive them once at startup where fork isn't available,
+    so nothing is pickled per prop
+
+    Args:
+        slate (Pandas DataFrame or list): rows of (qb, line, games, avg_yards)
+        df (Pandas DataFrame): game logs of quarterbacks concatenated together, defaults to bayes.all_qb_weighted
+        processes (int): number of worker processes, defaults to the number of cpus. 1 runs in this process
+        log (bool): whether to log the model results for every prop
+
+    Returns:
+        Pandas DataFrame: the slate in input order with a 'probability' column. With instrumentation
+            on, the slowest stages of the run are in attrs['stages'], see instrumentation.summary
+    """
+
+    with inst.collect() as spans:
+        with inst.span('run_slate', rows = len(slate)):
+            results = _run_slate(slate, df, processes, log, spans)
+
+    inst.extend(spans)
+
+    if inst.enabled():
+        results.attrs['stages'] = inst.summary(spans)
+
+    return results
+
+
+def _run_slate(slate, df, processes: int, log: bool, spans: list) -> pd.DataFrame:
+
+    global _frames
+
+    if not isinstance(slate, pd.DataFrame):
+        slate = pd.DataFrame(list(slate), columns = SLATE_COLUMNS)
+
+    results = slate.reset_index(drop = True).copy()
+    props = list(results[SLATE_COLUMNS].itertuples(index = False, name = None))
+
+    if df is None:
+        df = bayes.all_qb_weighted
+
+    frames = prepare_frames(df, props)
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    processes = min(processes, len(props))
+
+    if processes <= 1:
+        results['probability'] = [_evaluate(frames, prop, log) for prop in props]
+        return results
+
+    tasks = [(prop, log) for prop in props]
+
+    if 'fork' in mp.get_all_start_methods():
+        # forked workers share the prepared frames copy-on-write
+        _frames = frames
+        try:
+            with mp.get_context('fork').Pool(processes) as pool:
+                outputs = pool.map(_worker, tasks, chunksize = 1)
+        finally:
+            _frames = None
+
+    else:
+        # spawned workers receive the prepared frames once, at startup
+        with mp.get_context('spawn').Pool(processes, initializer = _init_worker, initargs = (frames,)) as pool:
+            outputs = pool.map(_worker, tasks, chunksize = 1)
+
+    # the workers' runs are logged, and their spans recorded, here
+    for _, runs, worker_spans in outputs:
+        ml.replay(runs)
+        spans.extend(worker_spans)
+
+    results['probability'] = [probability for probability, _, _ in outputs]
+
+    return results
+
+
+def prepare_frames(df, props: list[tuple]) -> dict:
+    """
+    Computes the shared preprocessing for a slate
+
+    Args:
+        df (Pandas DataFrame): game logs of quarterbacks concatenated together
+        props (list[tuple]): rows of (qb, line, games, avg_yards)
+
+    Returns:
+        dict: a game log frame with the '{games}_game_avg' column for every distinct number of games, and for
+            every (games, line) of at least INDEX_PROPS props a (frame, index) pair, the frame holding the line's
+            category column and the index its sorted averages and yards by category
+    """
+
+    frames = {}
+
+    for games in sorted({prop[2] for prop in props}):
+
+        # shallow copies share the game log columns, each only adds its own rolling average
+        frame = df.copy(deep = False)
+        frames[games] = bayes.last_n_avg(frame, games, 'weighted_yards', f'{games}_game_avg', 'name')
+
+    # warm the category cache before the workers inherit it
+    for line in sorted({prop[1] for prop in props}):
+        bayes.player_categories(frames[props[0][2]], line)
+
+    counts = pd.Series([(prop[2], prop[1]) for prop in props]).value_counts()
+
+    for games, line in sorted(counts.index[counts >= INDEX_PROPS]):
+        frame = frames[games].copy(deep = False)
+        frame['category'] = bayes.category_column(frame, bayes.player_categories(frame, line)[0])
+        index = ECDFIndex(frame, group_column = 'category', columns = [f'{games}_game_avg', 'weighted_yards'], null = True)
+        frames[(games, line)] = (frame, index)
+
+    return frames
+
+
+def _evaluate(frames: dict, prop: tuple, log: bool) -> float:
+    qb, line, games, avg_yards = prop
+
+    if (games, line) in frames:
+        frame, index = frames[(games, line)]
+        return bayes.project_line(frame, qb, line, games, avg_yards, log = log, index = index)[1]
+
+    return bayes.project_line(frames[games], qb, line, games, avg_yards, log = log)[1]
+
+
+def _worker(task: tuple) -> tuple[float, list, list]:
+    prop, log = task
+    with ml.collect() as runs, inst.collect() as spans:
+        probability = _evaluate(_frames, prop, log)
+    return probability, runs, spans
+
+
+def _init_worker(frames: dict):
+    global _frames
+    _frames = frames
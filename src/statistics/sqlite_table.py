@@ -0,0 +1,225 @@
+# probability queries answered by sqlite, without loading the table into pandas
+# condition tuples compile to parameterized SELECT COUNT(*) / SUM(CASE ...) queries. The conditions of a
+# conditional probability go in the WHERE clause, so indexes on them (like gamelogs_name) narrow the rows
+# sqlite reads, and a batch of queries is answered in a single pass over the table
+
+import os
+import sqlite3
+from urllib.request import pathname2url
+
+import src.data.schema as schema
+
+# sql of each operator, formatted with the quoted column
+OPERATORS = {
+    'geq': '{} >= ?',
+    'g': '{} > ?',
+    'eq': '{} = ?',
+    'l': '{} < ?',
+    'leq': '{} <= ?',
+    'in_range': '{} BETWEEN ? AND ?',
+}
+
+
+class SQLiteTable:
+    """
+    A table of a sqlite database, passed to the sf functions in place of a dataframe
+
+    Example:
+        gamelogs = SQLiteTable('data/quarterback.db', 'gamelogs')
+        sf.conditional_probability(gamelogs, [('adjusted_yards', 'geq', 250.5), ('name', 'eq', 'Jared Goff')])
+
+    Args:
+        database (str): a sqlite database, opened read only
+        table (str): the table the queries count rows of
+    """
+
+    def __init__(self, database: str, table: str):
+
+        self.database = database
+        self.table = table
+        self._conn = None
+
+        # whether each column holds a null, checked once per version of the database
+        self._nulls = {}
+        self._data_version = None
+
+        # identifiers can't be parameters, so only the table's own column names reach the sql
+        self.columns = [row[0] for row in self.connection().execute('SELECT name FROM pragma_table_info(?)', (table,))]
+
+        if not self.columns:
+            raise ValueError(f"No table {table} in the database {database}")
+
+    def connection(self) -> sqlite3.Connection:
+
+        if self._conn is None:
+            uri = f'file:{pathname2url(os.path.abspath(self.database))}?mode=ro'
+            self._conn = sqlite3.connect(uri, uri = True, cached_statements = schema.CACHED_STATEMENTS)
+            self._conn.execute(f'PRAGMA mmap_size = {schema.MMAP_SIZE}')
+
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.connection().execute(f'SELECT COUNT(*) FROM {_quote(self.table)}').fetchone()[0]
+
+    def probability(self, event: tuple, null = False) -> float:
+        """
+        P(event), see sf.probability
+        """
+        return self.run([('probability', [event], null != False)])[0]
+
+    def joint_probability(self, events: list[tuple], null = False) -> float:
+        """
+        P(every event), see sf.joint_probability
+        """
+        return self.run([('joint', list(events), null != False)])[0]
+
+    def conditional_probability(self, conditions: list[tuple], null = False) -> float:
+        """
+        P(first condition | the other conditions), see sf.conditional_probability
+        """
+
+        null = null != False
+        self._check_nulls(conditions, null)
+
+        given, given_parameters = self._compile(conditions[1:])
+        event, event_parameters = self._compile(conditions[:1])
+
+        query = f'SELECT COUNT(*), SUM(CASE WHEN {event} THEN 1 ELSE 0 END) FROM {_quote(self.table)} ' \
+                f'WHERE {self._complete(null)} AND {given}'
+
+        event_space_size, joint_count = self.connection().execute(query, event_parameters + given_parameters).fetchone()
+
+        return (joint_count or 0) / event_space_size if event_space_size > 0 else 0
+
+    def run(self, queries: list[tuple]) -> list[float]:
+        """
+        Answers a batch of queries, one query per null setting
+
+        Args:
+            queries (list[tuple]): (kind, events, null) tuples, kind being 'probability', 'joint' or 'conditional',
+                as registered by sf.ProbabilityQuery
+
+        Returns:
+            list[float]: the probabilities, in the order of the queries
+        """
+
+        results = [None] * len(queries)
+
+        for null in (False, True):
+            batch = [(position, kind, events) for position, (kind, events, query_null) in enumerate(queries)
+                     if query_null == null]
+            if not batch:
+                continue
+
+            aggregates = ['COUNT(*)']
+            parameters = []
+
+            for _, kind, events in batch:
+                self._check_nulls(events, null)
+
+                if kind == 'conditional':
+                    given, given_parameters = self._compile(events[1:])
+                    joint, joint_parameters = self._compile(events)
+                    aggregates += [f'SUM(CASE WHEN {given} THEN 1 ELSE 0 END)', f'SUM(CASE WHEN {joint} THEN 1 ELSE 0 END)']
+                    parameters += given_parameters + joint_parameters
+                else:
+                    joint, joint_parameters = self._compile(events)
+                    aggregates.append(f'SUM(CASE WHEN {joint} THEN 1 ELSE 0 END)')
+                    parameters += joint_parameters
+
+            query = f"SELECT {', '.join(aggregates)} FROM {_quote(self.table)} WHERE {self._complete(null)}"
+            row = self.connection().execute(query, parameters).fetchone()
+
+            total_count = row[0]
+            column = 1
+
+            for position, kind, _ in batch:
+                if kind == 'conditional':
+                    event_space_size, joint_count = row[column] or 0, row[column + 1] or 0
+                    results[position] = joint_count / event_space_size if event_space_size > 0 else 0
+                    column += 2
+                else:
+                    results[position] = (row[column] or 0) / total_count if total_count > 0 else 0
+                    column += 1
+
+        return results
+
+    def _compile(self, events: list[tuple]) -> tuple[str, list]:
+        """
+        Returns the sql of every event holding, and its parameters
+        """
+
+        clauses = []
+        parameters = []
+
+        for event in events:
+            column, operator, value = event
+
+            if column not in self.columns:
+                raise ValueError(f"No column {column} in the table {self.table}")
+            if operator not in OPERATORS:
+                raise ValueError("Invalid operator. Use one of: 'geq', 'g', 'eq', 'l', 'leq', 'in_range'.")
+
+            clauses.append(OPERATORS[operator].format(_quote(column)))
+            parameters += [_parameter(item) for item in (value if operator == 'in_range' else [value])]
+
+        return ' AND '.join(clauses) or '1', parameters
+
+    def _complete(self, null: bool) -> str:
+        """
+        The rows kept: every row, or with null set only rows without a null in any column, like df.dropna()
+        """
+
+        if not null:
+            return '1'
+
+        return ' AND '.join(f'{_quote(column)} IS NOT NULL' for column in self.columns)
+
+    def _check_nulls(self, events: list[tuple], null: bool):
+        """
+        Raises a ValueError when a column of the events holds a null, as sf.condition_mask does,
+        unless null is set and those rows are dropped
+        """
+
+        if null:
+            return
+
+        # the cached checks hold until another connection changes the database
+        version = self.connection().execute('PRAGMA data_version').fetchone()[0]
+        if version != self._data_version:
+            self._nulls = {}
+            self._data_version = version
+
+        for column in dict.fromkeys(event[0] for event in events):
+            if column not in self.columns:
+                raise ValueError(f"No column {column} in the table {self.table}")
+
+            if column not in self._nulls:
+                query = f'SELECT EXISTS (SELECT 1 FROM {_quote(self.table)} WHERE {_quote(column)} IS NULL)'
+                self._nulls[column] = bool(self.connection().execute(query).fetchone()[0])
+
+            if self._nulls[column]:
+                raise ValueError(f"Null values detected in the column {column}")
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _parameter(value):
+    """
+    Numpy scalars are bound as the python values they hold
+    """
+
+    return value.item() if hasattr(value, 'item') else value
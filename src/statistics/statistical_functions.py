@@ -1,9 +1,18 @@
 import numpy as np
 import pandas as pd
+import src.instrumentation as inst
+from src.statistics.sqlite_table import SQLiteTable
 
-def condition_indices(df, event: tuple) -> set:
+# operators accepted in the second element of a condition tuple
+OPERATORS = ('geq', 'g', 'eq', 'l', 'leq', 'in_range')
+
+
+def condition_mask(df, event: tuple) -> np.ndarray:
     """
-    Returns the indices where an event occurs as a set
+    Returns a boolean mask of the rows where an event occurs
+
+    Masks can be combined with the numpy operators & (and), | (or) and ~ (not),
+    and counted with np.count_nonzero
 
     Args:
         df (pd.DataFrame): the dataframe containing the data.
@@ -14,35 +23,81 @@ def condition_indices(df, event: tuple) -> set:
             only takes one event
 
     Returns:
-        set: The set of indices where the event occured
+        np.ndarray: A boolean array with one entry per row of the dataframe
     """
 
-    if df[event[0]].isnull().any():
+    column = df[event[0]]
+
+    # equality on a categorical compares integer codes instead of the values, codes of -1 are null
+    if event[1] == 'eq' and isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.array.codes
+
+        if (codes < 0).any():
+            raise ValueError(f"Null values detected in the column {event[0]}")
+
+        code = column.cat.categories.get_indexer([event[2]])[0]
+        return codes == code if code >= 0 else np.zeros(len(codes), dtype = bool)
+
+    if column.isnull().any():
         raise ValueError(f"Null values detected in the column {event[0]}")
 
+    values = column.to_numpy()
+    value = event[2]
+
+    # dates parsed by ds.compact_frame are still compared with the strings of the csv
+    if values.dtype.kind == 'M':
+        value = _as_datetime(value, values.dtype, event[1] == 'in_range')
+
     if event[1] == 'geq':
-        condition_occurs = df.index[df[event[0]] >= event[2]]
+        mask = values >= value
     elif event[1] == 'g':
-        condition_occurs = df.index[df[event[0]] > event[2]]
+        mask = values > value
     elif event[1] == 'eq':
-        condition_occurs = df.index[df[event[0]] == event[2]]
+        mask = values == value
     elif event[1] == 'l':
-        condition_occurs = df.index[df[event[0]] < event[2]]
+        mask = values < value
     elif event[1] == 'leq':
-        condition_occurs = df.index[df[event[0]] <= event[2]]
+        mask = values <= value
     elif event[1] == 'in_range':
-        condition_occurs = df.index[
-            (df[event[0]] >= event[2][0]) & (df[event[0]] <= event[2][1])
-            ]
+        mask = (values >= value[0]) & (values <= value[1])
     else:
         raise ValueError("Invalid operator. Use one of: 'geq', 'g', 'eq', 'l', 'leq', 'in_range'.")
-    
-    return set(condition_occurs)
+
+    return np.asarray(mask, dtype = bool)
 
 
-def probability(df, event: tuple, null = False) -> float:
+def _as_datetime(value, dtype: np.dtype, pair: bool):
+    """
+    Converts the value of a condition on a datetime column, or both bounds of a range, to the column's type
+    """
+
+    if pair:
+        return tuple(_as_datetime(bound, dtype, False) for bound in value)
+
+    return pd.Timestamp(value).to_datetime64().astype(dtype)
+
+
+def joint_mask(df, events: list[tuple]) -> np.ndarray:
+    """
+    Returns a boolean mask of the rows where every event in a list occurs
+
+    Args:
+        df (pd.DataFrame): the dataframe containing the data.
+        events (list[tuple]): A list of any number of three tuples (see condition_mask)
+
+    Returns:
+        np.ndarray: A boolean array with one entry per row of the dataframe
     """
-    Calculate the probability of an event occuring
+
+    if len(events) == 0:
+        return np.ones(len(df), dtype = bool)
+
+    return np.logical_and.reduce([condition_mask(df, event) for event in events])
+
+
+def condition_indices(df, event: tuple) -> set:
+    """
+    Returns the indices where an event occurs as a set
 
     Args:
         df (pd.DataFrame): the dataframe containing the data.
@@ -52,93 +107,259 @@ def probability(df, event: tuple, null = False) -> float:
             - the third element is the value for the condition
             only takes one event
 
+    Returns:
+        set: The set of indices where the event occured
+    """
+
+    return set(df.index[condition_mask(df, event)])
+
+
+@inst.timed()
+def probability(df, event: tuple, null = False, index = None) -> float:
+    """
+    Calculate the probability of an event occuring
+
+    Args:
+        df (pd.DataFrame or SQLiteTable): the dataframe containing the data, or a sqlite table to count rows of.
+        event (tuple): A three tuple where:
+            - The first element is the column name(str).
+            - the second element is the operator (e.g., 'geq', 'eq', 'leq', etc.).
+            - the third element is the value for the condition
+            only takes one event
+        index (ECDFIndex): optional sorted index built from df, used when the event fits it
+
     Returns:
         float: The probability
     """
 
+    # a SQLiteTable counts the rows in the database
+    if isinstance(df, SQLiteTable):
+        return df.probability(event, null)
+
+    result = _index_lookup(df, [event], null, index)
+    if result is not None:
+        return result
+
     if null != False:
         df = df.dropna()
 
     total_count = len(df[event[0]])     # changed this from .count()
-    event_count = len(condition_indices(df, event))
+    event_count = np.count_nonzero(condition_mask(df, event))
     return event_count / total_count
 
 
-def joint_probability(df, events: list[tuple]) -> float:
+@inst.timed()
+def joint_probability(df, events: list[tuple], null = False) -> float:
     """
-    Calculate the probability of two events happening together
+    Calculate the probability of several events happening together
 
     Args:
-        df (pd.DataFrame): the dataframe containing the data.
+        df (pd.DataFrame or SQLiteTable): the dataframe containing the data, or a sqlite table to count rows of.
         events (list[tuple]): A list of three tuples where:
             - The first element is the column name(str).
             - the second element is the operator (e.g., 'geq', 'eq', 'leq', etc.).
             - the third element is the value for the condition
-            takes only two events
+            takes any number of events
 
     Returns:
         float: The joint probability
     """
 
+    if isinstance(df, SQLiteTable):
+        return df.joint_probability(events, null)
+
+    if null != False:
+        df = df.dropna()
+
     # Get the total number of rows
     total_count = len(df)
-    
-    # Find the indices where both conditions hold
-    condition_1_indices = condition_indices(df, events[0])
-    condition_2_indices = condition_indices(df, events[1])
-    
-    # Find the intersection of both conditions
-    joint_indices = condition_1_indices & condition_2_indices
-    
+
+    # count the rows where every condition holds
+    joint_count = np.count_nonzero(joint_mask(df, events))
+
     # Calculate joint probability
-    joint_prob = len(joint_indices) / total_count if total_count > 0 else 0
-    
+    joint_prob = joint_count / total_count if total_count > 0 else 0
+
     return joint_prob
 
-    
-def conditional_probability(df, conditions: list[tuple], null = False) -> float:
+
+@inst.timed()
+def conditional_probability(df, conditions: list[tuple], null = False, index = None) -> float:
     """
     Calculates the probability of an event occurring given that conditions have been met.
     
     Args:
-        df (pd.DataFrame): The dataframe containing the data.
+        df (pd.DataFrame or SQLiteTable): The dataframe containing the data, or a sqlite table to count rows of.
         conditions (list[tuple]): A list of three-tuples where:
             - The first element is the column name (str).
             - The second element is the operator (e.g., 'geq', 'eq', 'leq', etc.).
             - The third element is the value for the condition.
             The event is the first tuple, and the conditions are the subsequent tuples.
+        index (ECDFIndex): optional sorted index built from df, used when the conditions fit it
             
     Returns:
         float: The conditional probability.
     """
 
+    if isinstance(df, SQLiteTable):
+        return df.conditional_probability(conditions, null)
+
+    result = _index_lookup(df, conditions, null, index)
+    if result is not None:
+        return result
+
     if null != False:
         df = df.dropna()
 
-    # put in an option to print the number of rows that met the condition
-    
-    # Step 1: Get the indices where the event occurs (first condition in the list)
-    event_indices = condition_indices(df, conditions[0])
-
-    # Step 2: Create a set for condition indices based on the first condition after the event
-    condition_indices_set = condition_indices(df, conditions[1])
+    # Step 1: Get the mask of rows where the event occurs (first condition in the list)
+    event_mask = condition_mask(df, conditions[0])
 
-    # Step 3: Check for additional conditions and find intersection of indices
-    for i in range(2, len(conditions)):
-        condition_indices_set &= condition_indices(df, conditions[i])
+    # Step 2: Combine the remaining conditions into a single mask
+    given_mask = joint_mask(df, conditions[1:])
 
-    # Step 4: Calculate the number of rows where the condition occurs (event space)
-    event_space_size = len(condition_indices_set)
+    # Step 3: Calculate the number of rows where the conditions occur (event space)
+    event_space_size = np.count_nonzero(given_mask)
 
-    # Step 5: Find the rows where both the event and conditions occur
-    joint_indices = condition_indices_set & event_indices
+    # Step 4: Count the rows where both the event and conditions occur
+    joint_count = np.count_nonzero(event_mask & given_mask)
 
-    # Step 6: Calculate the conditional probability
-    conditional_prob = len(joint_indices) / event_space_size if event_space_size > 0 else 0
+    # Step 5: Calculate the conditional probability
+    conditional_prob = joint_count / event_space_size if event_space_size > 0 else 0
 
     return conditional_prob
 
 
+class ProbabilityQuery:
+    """
+    Batches probability queries against a single dataframe.
+
+    Queries are registered with the same arguments as the module level functions and
+    evaluated together by run(). Each distinct condition is evaluated once per frame,
+    and the frame is only copied by dropna() once, no matter how many queries ask for it.
+    Against a SQLiteTable the batch is a single query. Queries an ECDFIndex fits are answered from the index
+
+    Args:
+        df (pd.DataFrame or SQLiteTable): the data the queries count
+        index (ECDFIndex): optional sorted index built from df
+
+    Example:
+        query = ProbabilityQuery(df)
+        query.conditional_probability([('weighted_yards', 'geq', 267.5), ('category', 'eq', 'over')], null = True)
+        query.probability(('6_game_avg', 'geq', 301), null = True)
+        hit_line, hit_avg = query.run()
+    """
+
+    def __init__(self, df, index = None):
+        self.df = df
+        self.index = index
+        self.queries = []
+
+    def probability(self, event: tuple, null = False) -> int:
+        """
+        Registers a marginal probability query, returns its position in the results of run()
+        """
+        return self._register('probability', [event], null)
+
+    def joint_probability(self, events: list[tuple], null = False) -> int:
+        """
+        Registers a joint probability query, returns its position in the results of run()
+        """
+        return self._register('joint', events, null)
+
+    def conditional_probability(self, conditions: list[tuple], null = False) -> int:
+        """
+        Registers a conditional probability query, returns its position in the results of run()
+        The event is the first tuple, and the conditions are the subsequent tuples
+        """
+        return self._register('conditional', conditions, null)
+
+    @inst.timed('probability_query')
+    def run(self) -> list[float]:
+        """
+        Evaluates every registered query
+
+        Returns:
+            list[float]: the probabilities, in the order the queries were registered
+        """
+
+        frames = {}
+        masks = {}
+
+        def mask(event, null):
+            key = (null, _event_key(event))
+            if key not in masks:
+                if null not in frames:
+                    frames[null] = self.df.dropna() if null else self.df
+                masks[key] = condition_mask(frames[null], event)
+            return masks[key]
+
+        # a SQLiteTable answers the whole batch in one pass over the table
+        if isinstance(self.df, SQLiteTable):
+            return self.df.run(self.queries)
+
+        results = []
+
+        for kind, events, null in self.queries:
+
+            if kind != 'joint':
+                result = _index_lookup(self.df, events, null, self.index)
+                if result is not None:
+                    results.append(result)
+                    continue
+
+            if kind == 'probability':
+                results.append(np.count_nonzero(mask(events[0], null)) / len(frames[null]))
+                continue
+
+            if null not in frames:
+                frames[null] = self.df.dropna() if null else self.df
+
+            total_count = len(frames[null])
+
+            if kind == 'joint':
+                joint = np.ones(total_count, dtype = bool)
+                for event in events:
+                    joint = joint & mask(event, null)
+                results.append(np.count_nonzero(joint) / total_count if total_count > 0 else 0)
+
+            else:
+                given = np.ones(total_count, dtype = bool)
+                for event in events[1:]:
+                    given = given & mask(event, null)
+                event_space_size = np.count_nonzero(given)
+                joint_count = np.count_nonzero(given & mask(events[0], null))
+                results.append(joint_count / event_space_size if event_space_size > 0 else 0)
+
+        return results
+
+    def _register(self, kind: str, events: list[tuple], null) -> int:
+        self.queries.append((kind, list(events), null != False))
+        return len(self.queries) - 1
+
+
+def _index_lookup(df, conditions: list[tuple], null, index):
+    """
+    Answers a query from an ECDFIndex when one is given, was built from the columns of this frame
+    with the same null handling, and fits the conditions. Returns None otherwise
+    """
+
+    if index is None or index.null != (null != False) or not index.built_from(df, conditions):
+        return None
+
+    return index.lookup(conditions)
+
+
+def _event_key(event: tuple) -> tuple:
+    """
+    Returns a hashable key for a condition tuple, so that equal conditions share a mask
+    """
+
+    value = event[2]
+    if isinstance(value, list):
+        value = tuple(value)
+    return (event[0], event[1], value)
+
+
 def bayes(df, conditions: list[tuple]) -> float:
     """
     Calculate the reverse conditional probability
@@ -0,0 +1,47 @@
+# shared test setup
+
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import src.data.datasets as ds
+import src.data.database_functions as db
+import src.statistics.model_log as ml
+
+defense_folder = os.path.join(ds.DATA_DIR, 'raw', 'defense')
+
+
+@pytest.fixture(autouse = True)
+def model_log(tmp_path):
+    # model runs logged by the tests go to the test's own folder, not the repo's logging folder
+    ml.configure(str(tmp_path / 'logging' / 'runs.jsonl'))
+    yield
+    ml.configure()
+
+
+@pytest.fixture
+def rows():
+    # the rows a query returns from a sqlite database, as a frame
+    def read(database, query):
+        conn = sqlite3.connect(database)
+        df = pd.read_sql_query(query, conn)
+        conn.close()
+        return df
+
+    return read
+
+
+@pytest.fixture
+def defense_database(tmp_path):
+    # a database in the test's folder with defense seasons and their weights,
+    # seasons maps every year added to the year of the raw defense file added for it
+    def build(seasons, table = 'defense_stats'):
+        database = str(tmp_path / 'test.db')
+        for year, source in seasons.items():
+            db.add_defense(database, table, year, pd.read_csv(os.path.join(defense_folder, f'{source}_nfl_defense_data.txt')))
+        db.calculate_weights(database, table)
+        return database
+
+    return build
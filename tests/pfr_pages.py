@@ -0,0 +1,85 @@
+# synthetic pro football reference pages, laid out like the live site, for offline scraper tests
+
+import html
+
+# team_stats columns on years/{year}/opp.htm, as (header, data-stat)
+DEFENSE_COLUMNS = [
+    ('Tm', 'team'), ('G', 'g'), ('PA', 'points'), ('Yds', 'total_yards'), ('Ply', 'plays_offense'),
+    ('Y/P', 'yds_per_play_offense'), ('TO', 'turnovers'), ('FL', 'fumbles_lost'), ('1stD', 'first_down'),
+    ('Cmp', 'pass_cmp'), ('Att', 'pass_att'), ('Yds', 'pass_yds'), ('TD', 'pass_td'), ('Int', 'pass_int'),
+    ('NY/A', 'pass_net_yds_per_att'), ('1stD', 'pass_fd'), ('Att', 'rush_att'), ('Yds', 'rush_yds'),
+    ('TD', 'rush_td'), ('Y/A', 'rush_yds_per_att'), ('1stD', 'rush_fd'), ('Pen', 'penalties'),
+    ('Yds', 'penalties_yds'), ('1stPy', 'pen_fd'), ('Sc%', 'score_pct'), ('TO%', 'turnover_pct'),
+    ('EXP', 'exp_pts_tot'),
+]
+
+# passing columns on years/{year}/passing.htm, as (header, data-stat, row key)
+PASSING_COLUMNS = [
+    ('Player', 'name_display', 'name'), ('Age', 'age', None), ('Team', 'team_name_abbr', 'team'),
+    ('Pos', 'pos', None), ('G', 'games', 'games'), ('GS', 'games_started', 'games'),
+    ('Cmp', 'pass_cmp', None), ('Att', 'pass_att', None), ('Yds', 'pass_yds', 'pass_yards'),
+    ('TD', 'pass_td', None), ('Int', 'pass_int', None), ('Sk', 'pass_sacked', None),
+    ('Yds', 'pass_sacked_yds', None),
+]
+
+
+def _cell(tag: str, stat: str, value) -> str:
+    value = '' if value is None or value != value else value
+    return f'<{tag} data-stat="{stat}">{html.escape(str(value))}</{tag}>'
+
+
+def defense_page(rows: list[list], commented: bool = False) -> str:
+    """
+    Renders an opp.htm page from rows of team_stats values, in DEFENSE_COLUMNS order
+    """
+
+    over_header = '<tr class="over_header"><th></th><th colspan="9"></th><th colspan="6">Passing</th>' \
+                  '<th colspan="5">Rushing</th><th colspan="3">Penalties</th><th colspan="4"></th></tr>'
+    header = '<tr><th data-stat="ranker">Rk</th>' + ''.join(
+        f'<th data-stat="{stat}">{name}</th>' for name, stat in DEFENSE_COLUMNS) + '</tr>'
+
+    body = ''.join(
+        f'<tr><th data-stat="ranker">{rank}</th>' + ''.join(
+            _cell('td', stat, value) for (_, stat), value in zip(DEFENSE_COLUMNS, row)) + '</tr>'
+        for rank, row in enumerate(rows, start = 1)
+        )
+
+    footer = ''.join(
+        f'<tr><th data-stat="ranker"></th>' + _cell('td', 'team', label) + ''.join(
+            _cell('td', stat, 0) for _, stat in DEFENSE_COLUMNS[1:]) + '</tr>'
+        for label in ('Avg Team', 'League Total', 'Avg Tm/G')
+        )
+
+    table = f'<table class="stats_table" id="team_stats"><thead>{over_header}{header}</thead>' \
+            f'<tbody>{body}</tbody><tfoot>{footer}</tfoot></table>'
+
+    return _page(table, commented)
+
+
+def passing_page(rows: list[dict], commented: bool = False) -> str:
+    """
+    Renders a passing.htm page from rows with name, team, games and pass_yards keys
+    """
+
+    header = '<tr><th data-stat="ranker">Rk</th>' + ''.join(
+        f'<th data-stat="{stat}">{name}</th>' for name, stat, _ in PASSING_COLUMNS) + '</tr>'
+
+    body = ''
+    for rank, row in enumerate(rows, start = 1):
+        body += f'<tr><th data-stat="ranker">{rank}</th>' + ''.join(
+            _cell('td', stat, row.get(key) if key else 0) for _, stat, key in PASSING_COLUMNS) + '</tr>'
+
+        # the live table repeats its header every 30 rows
+        if rank % 30 == 0:
+            body += header.replace('<tr>', '<tr class="thead">', 1)
+
+    table = f'<table class="stats_table" id="passing"><thead>{header}</thead><tbody>{body}</tbody></table>'
+
+    return _page(table, commented)
+
+
+def _page(table: str, commented: bool) -> str:
+    if commented:
+        table = f'<div class="placeholder"></div>\n<!--\n{table}\n-->'
+    return f'<html><head><title>Pro Football Reference</title></head><body>' \
+           f'<div id="content"><div class="table_wrapper">{table}</div></div></body></html>'
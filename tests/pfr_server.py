@@ -0,0 +1,202 @@
+# a local stand-in for pro football reference, for offline scraper tests and load benchmarks
+# serves years/{year}/opp.htm and years/{year}/passing.htm pages, recorded or rendered from the raw
+# defense files, and can add latency, throttle clients with 429 Retry-After responses, and fail requests
+#
+# usage:
+#     with PFRServer(latency = 0.05, rate_limit = (20, 60)) as server:
+#         wf.scrape_def(2020, base_url = server.url)
+
+import os
+import glob
+import json
+import time
+import random
+import hashlib
+import threading
+import http.server
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+import pfr_pages
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFENSE_DIR = os.path.join(ROOT_DIR, 'data', 'raw', 'defense')
+
+
+def rendered_pages(years = range(2005, 2025)) -> dict:
+    """
+    Pages rendered with pfr_pages: defense pages from the raw defense files, passing pages with
+    synthetic quarterbacks
+
+    Returns:
+        dict: page bodies by url path
+    """
+
+    pages = {}
+
+    for year in years:
+        paths = glob.glob(os.path.join(DEFENSE_DIR, f'{year}_nfl_defense_data.*'))
+        if paths:
+            # the 2024 export has a rank column, and a league average row at the end
+            defense = pd.read_csv(paths[0]).dropna(subset = ['G'])
+            defense = defense.drop(columns = [column for column in ('Rk',) if column in defense.columns])
+            pages[f'/years/{year}/opp.htm'] = pfr_pages.defense_page(defense.values.tolist(), commented = year % 2 == 0)
+
+        rows = [{'name': f'Player {i}', 'team': 'GNB', 'games': 17, 'pass_yards': 3000 + year + i} for i in range(70)]
+        pages[f'/years/{year}/passing.htm'] = pfr_pages.passing_page(rows)
+
+    return pages
+
+
+def recorded_pages(directory: str) -> dict:
+    """
+    Pages recorded in a response cache directory (see src.data.response_cache), by url path
+    """
+
+    pages = {}
+
+    for meta_path in glob.glob(os.path.join(directory, '*.json')):
+        with open(meta_path) as file:
+            url = json.load(file)['url']
+        with open(meta_path[:-len('.json')] + '.html', 'rb') as file:
+            pages[urlsplit(url).path] = file.read().decode('utf-8', errors = 'replace')
+
+    return pages
+
+
+class PFRServer:
+    """
+    A threaded http server answering with fixed pages
+
+    Args:
+        pages (dict): page bodies by url path, defaults to rendered_pages()
+        latency (float or tuple): seconds before every response, or a (low, high) range
+        rate_limit (tuple): (requests, seconds), clients asking for more within the window get a 429
+        retry_after (float): the Retry-After header of a 429
+        error_rate (float): share of requests answered with a 503
+        failures (dict): statuses to answer the first requests for a path with, i.e. {'/years/2020/opp.htm': [500, 429]}
+        seed (int): seeds the injected errors
+    """
+
+    def __init__(self, pages: dict = None, latency = 0.0, rate_limit: tuple = None, retry_after: float = 1,
+                 error_rate: float = 0.0, failures: dict = None, seed: int = 0):
+
+        self.pages = rendered_pages() if pages is None else pages
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.failures = {path: list(statuses) for path, statuses in (failures or {}).items()}
+
+        # (time, path, status) of every request
+        self.log = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = []
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self, port: int = 0):
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target = self._server.serve_forever, daemon = True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def statuses(self) -> list:
+        with self._lock:
+            return [status for _, _, status in self.log]
+
+    def respond(self, path: str, headers) -> tuple:
+        """
+        Decides the status, headers and body for a request
+        """
+
+        with self._lock:
+            now = time.monotonic()
+
+            # 429 past the rate limit, like the live site
+            if self.rate_limit is not None:
+                requests, seconds = self.rate_limit
+                self._window = [start for start in self._window if now - start < seconds]
+                if len(self._window) >= requests:
+                    return 429, {'Retry-After': f'{self.retry_after:g}'}, b''
+                self._window.append(now)
+
+            scripted = self.failures.get(path)
+            if scripted:
+                status = scripted.pop(0)
+                return status, ({'Retry-After': f'{self.retry_after:g}'} if status == 429 else {}), b''
+
+            if self.error_rate and self._random.random() < self.error_rate:
+                return 503, {}, b''
+
+        if path not in self.pages:
+            return 404, {}, b''
+
+        body = self.pages[path].encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+        if headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+
+        return 200, {'ETag': etag, 'Content-Type': 'text/html; charset=utf-8'}, body
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+                try:
+                    latency = server.latency
+                    if isinstance(latency, tuple):
+                        with server._lock:
+                            latency = server._random.uniform(*latency)
+                    if latency:
+                        time.sleep(latency)
+
+                    path = urlsplit(self.path).path
+                    status, headers, body = server.respond(path, self.headers)
+
+                    with server._lock:
+                        server.log.append((time.monotonic(), path, status))
+
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -1,11 +1,12 @@
 # test bayes
 
 from src.statistics.bayes import *
+import src.data.datasets as ds
 import pandas as pd
 import numpy as np
 
 # data
-all_qb_weighted_1 = pd.read_csv(r"C:\Users\jonat\OneDrive\projects\scrape_and_score\data\processed\all_quarterbacks_weighted.txt")
+all_qb_weighted_1 = ds.load('quarterbacks_weighted')
 all_qb_weighted = last_n_avg(all_qb_weighted_1, 6, 'weighted_yards', '6_game_avg', 'name')
 
 
@@ -55,11 +56,28 @@ def test_handled_next_qb():
 
 
 # testing the bayes model
-test_df2 = over_under(all_qb_weighted_1, 'geno smith', 267.5, 6, 301)[0]
+test_df2 = over_under(all_qb_weighted_1, 'geno smith', 267.5, 6, 301, log = False)[0]
 
 def test_category_col_null():
     assert test_df2['category'].notnull().all()
 
 def test_category_col_values():
     assert 1 in test_df2['category'] 
-    
\ No newline at end of file
+    
+# testing the player categories
+
+def test_categories_match_conditional():
+    categories, hit_rates = player_categories(all_qb_weighted, 267.5)
+    for player in all_qb_weighted['name'].unique():
+        prob = sf.conditional_probability(all_qb_weighted, [('weighted_yards', 'geq', 267.5), ('name', 'eq', player)])
+        assert hit_rates[player] == prob
+        assert categories[player] == ('over' if prob > 0.5 else 'under')
+
+def test_categories_of_subset():
+    player_categories(all_qb_weighted, 267.5)
+
+    # the subset inherits the attrs of the full frame, its hit rates are still its own
+    subset = all_qb_weighted[all_qb_weighted['Year'] >= 2022]
+    categories, hit_rates = player_categories(subset, 267.5)
+    for player in subset['name'].unique():
+        assert hit_rates[player] == sf.conditional_probability(subset, [('weighted_yards', 'geq', 267.5), ('name', 'eq', player)])
@@ -0,0 +1,56 @@
+# testing bootstrap confidence intervals for the bayes model
+
+import numpy as np
+import pytest
+
+import src.data.datasets as ds
+import src.statistics.bayes as bayes
+import src.statistics.bootstrap as bs
+
+all_qb_weighted = ds.load('quarterbacks_weighted')
+
+# (qb, line, games, avg_yards), one quarterback of each category
+props = [('geno smith', 267.5, 6, 301), ('patrick mahomes', 250.5, 5, 230)]
+
+
+@pytest.mark.parametrize('prop', props)
+@pytest.mark.parametrize('block', ['game', 'player'])
+def test_unit_weights_match_model(prop, block):
+    qb, line, games, avg_yards = prop
+    df = bayes.last_n_avg(all_qb_weighted.copy(), games, 'weighted_yards', f'{games}_game_avg', 'name')
+    expected = bayes.project_line(df, qb, line, games, avg_yards, log = False)[1]
+
+    # the original data is the resample that draws every game, or every player, once
+    branch = bayes.player_categories(df, line)[0][qb]
+    problem = bs.prepare(df, qb, line, games, avg_yards, branch, block)
+    units = len(df) if block == 'game' else problem['players']
+    probability = bs.statistics(problem, np.ones((1, units)))[1]
+
+    assert probability[0] == expected
+
+
+def test_seeded():
+    qb, line, games, avg_yards = props[0]
+    df = bayes.last_n_avg(all_qb_weighted.copy(), games, 'weighted_yards', f'{games}_game_avg', 'name')
+
+    first = bs.confidence_intervals(df, qb, line, games, avg_yards, 'under', resamples = 300, seed = 7, chunk_size = 100)
+    second = bs.confidence_intervals(df, qb, line, games, avg_yards, 'under', resamples = 300, seed = 7, chunk_size = 100,
+                                     processes = 2)
+
+    assert first == second
+
+
+def test_over_under_intervals():
+    qb, line, games, avg_yards = props[0]
+    df, probability, intervals = bayes.over_under(all_qb_weighted, qb, line, games, avg_yards, log = False,
+                                                  bootstrap = 1000, seed = 1)
+
+    low, high = intervals['probability']
+    assert 0 <= low <= high <= 1
+    assert intervals['qb_is_cat_over'][0] <= intervals['qb_is_cat_over'][1]
+
+
+def test_block():
+    qb, line, games, avg_yards = props[0]
+    with pytest.raises(ValueError):
+        bayes.over_under(all_qb_weighted, qb, line, games, avg_yards, log = False, bootstrap = 10, block = 'season')
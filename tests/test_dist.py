@@ -0,0 +1,107 @@
+# testing the cached per quarterback distributions
+
+import math
+import numpy as np
+import pytest
+
+import src.data.datasets as ds
+import src.statistics.distributions as dist
+
+all_qb_weighted = ds.load('quarterbacks_weighted')
+
+
+@pytest.fixture(autouse = True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(dist, 'CACHE_DIR', str(tmp_path))
+    dist.clear_cache()
+    yield tmp_path
+    dist.clear_cache()
+
+
+def test_erf():
+    x = np.linspace(-5, 5, 1001)
+    assert np.abs(dist.erf(x) - np.array([math.erf(value) for value in x])).max() < 1.5e-7
+
+
+@pytest.mark.parametrize('kind', dist.KINDS)
+def test_close_to_empirical(kind):
+    values = all_qb_weighted.loc[all_qb_weighted['name'] == 'geno smith', 'weighted_yards']
+    probability = dist.line_probability(all_qb_weighted, 'geno smith', 267.5, kind)
+
+    assert abs(probability - (values >= 267.5).mean()) < 0.05
+    assert dist.player_distribution(all_qb_weighted, 'geno smith', kind).probability() == 1
+
+
+def test_normal():
+    distribution = dist.fit([200.0, 300.0], 'normal')
+    std = np.std([200.0, 300.0], ddof = 1)
+
+    assert distribution.cdf(250) == pytest.approx(0.5)
+    assert distribution.probability(250 - std, 250 + std) == pytest.approx(0.6827, abs = 1e-3)
+
+
+def test_persisted(cache_dir, monkeypatch):
+    first = dist.player_distribution(all_qb_weighted, 'geno smith')
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # a fresh process, or a new dataset version with the same games, loads the fit instead of refitting
+    dist.clear_cache()
+    monkeypatch.setattr(dist, 'fit', lambda *args, **kwargs: pytest.fail('refit'))
+    second = dist.player_distribution(all_qb_weighted.copy(), 'geno smith')
+
+    assert np.array_equal(first.table, second.table)
+
+
+def test_subset_refit():
+    full = dist.player_distribution(all_qb_weighted, 'geno smith', 'normal')
+
+    # the subset inherits the attrs of the loaded frame, its fit is still its own
+    subset = all_qb_weighted[all_qb_weighted['Year'] >= 2022]
+    values = subset.loc[subset['name'] == 'geno smith', 'weighted_yards'].to_numpy()
+    fitted = dist.player_distribution(subset, 'geno smith', 'normal')
+
+    assert not np.array_equal(fitted.table, full.table)
+    assert np.array_equal(fitted.table, dist.fit(values, 'normal').table)
+
+    # the fingerprint covers the modelled column, here given new values in a copy of the frame
+    passing = dist.player_distribution(all_qb_weighted, 'geno smith', 'normal', 'PassYds')
+    changed = all_qb_weighted.copy(deep = False)
+    changed['PassYds'] = changed['PassYds'] + 50
+    assert dist.player_distribution(changed, 'geno smith', 'normal', 'PassYds').cdf(300) < passing.cdf(300)
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        dist.fit([250.0], 'kde')
+    with pytest.raises(ValueError):
+        dist.fit([250.0, 300.0], 'beta')
+    with pytest.raises(ValueError):
+        dist.player_distribution(all_qb_weighted, 'nobody')
+
+
+def test_grid_spans_sample():
+    # yards past the old fixed grid still have mass
+    distribution = dist.fit([150.0, 420.0, 610.0, 905.0], 'kde')
+
+    assert distribution.grid[-1] > 905
+    assert 0 < distribution.sf(850) < 1
+    assert distribution.cdf(distribution.grid[0]) <= dist.TAIL_MASS
+
+    # a grid that cuts off the fit is refused rather than truncating it
+    with pytest.raises(ValueError):
+        dist.fit([200.0, 300.0], 'normal', grid = np.linspace(0, 260, 521))
+    with pytest.raises(ValueError):
+        dist.fit([200.0, 300.0], 'gamma', grid = np.linspace(0, 260, 521))
+
+
+def test_cache_bounded(monkeypatch):
+    fits = []
+    fit = dist.fit
+    monkeypatch.setattr(dist, 'fit', lambda *args, **kwargs: fits.append(args) or fit(*args, **kwargs))
+    monkeypatch.setattr(dist, '_cache_size', 2)
+
+    # the oldest fit is dropped for the third, and fit again when asked for
+    for qb in ['geno smith', 'jared goff', 'josh allen', 'josh allen', 'geno smith']:
+        dist.player_distribution(all_qb_weighted, qb, 'normal', persist = False)
+
+    assert len(fits) == 4
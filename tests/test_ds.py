@@ -0,0 +1,106 @@
+# testing the dataset loader and its binary cache
+
+import os
+import numpy as np
+import pandas as pd
+
+import src.data.datasets as ds
+import src.statistics.bayes as bayes
+
+test_df = pd.DataFrame({
+    'name': ['alice', 'bob', None, 'alice'],
+    'Tm': ['GNB', 'DET', 'DAL', 'GNB'],
+    'Yds': [178.0, np.nan, 290.5, 165.0],
+    'Week': [1, 2, 3, 4],
+    'Home': [True, False, True, False],
+})
+
+
+def test_binary_round_trip(tmp_path):
+    path = tmp_path / 'games.txt'
+    test_df.to_csv(path, index = False)
+    cache = str(tmp_path / 'cache' / 'games')
+
+    first = ds.read_cached(path, cache)
+    assert os.path.exists(cache + '.npz')
+
+    second = ds.read_cached(path, cache)
+    pd.testing.assert_frame_equal(second, pd.read_csv(path))
+    assert first.attrs['version'] == second.attrs['version']
+
+
+def test_source_changed(tmp_path):
+    path = tmp_path / 'games.txt'
+    test_df.to_csv(path, index = False)
+    cache = str(tmp_path / 'games')
+    version = ds.read_cached(path, cache).attrs['version']
+
+    test_df.iloc[:2].to_csv(path, index = False)
+    df = ds.read_cached(path, cache)
+
+    assert len(df) == 2
+    assert df.attrs['version'] != version
+
+
+def test_load_is_cached():
+    df = ds.load('defense')
+    df['extra'] = 1
+    assert 'extra' not in ds.load('defense').columns
+
+
+def test_compact_frame():
+    df = pd.DataFrame({
+        'name': ['alice', 'bob', 'alice', 'bob'],
+        'Date': ['2020-09-13', '2020-09-20', '2020-09-27', '2020-10-04'],
+        'Week': [1.0, 2.0, 3.0, 4.0],
+        'def_rk': [3.0, np.nan, 12.0, 30.0],
+        'weighted_yards': [250.25, 198.5, 301.0, 180.75],
+    })
+    df.attrs['version'] = 'v1'
+
+    compact = ds.compact_frame(df)
+
+    assert isinstance(compact['name'].dtype, pd.CategoricalDtype)
+    assert compact['Date'].dtype.kind == 'M'
+    assert compact['Week'].dtype == np.int32
+    assert compact['def_rk'].dtype == np.float32
+    assert compact['weighted_yards'].dtype == np.float64
+    assert compact.attrs['version'] == 'v1'
+    assert compact['Date'].dt.strftime('%Y-%m-%d').tolist() == df['Date'].tolist()
+    for column in ('Week', 'def_rk', 'weighted_yards'):
+        pd.testing.assert_series_equal(compact[column].astype(float), df[column])
+
+
+def test_compact_arithmetic():
+    df = pd.DataFrame({'Att': [40, 52, 38], 'Yds': [312.0, 405.0, 250.0]})
+    compact = ds.compact_frame(df)
+
+    # small counts are still wide enough to scale and sum without wrapping
+    assert (compact['Att'] * 10).tolist() == [400, 520, 380]
+    assert (compact['Yds'] * 1000).sum() == 967000
+
+
+def test_compact_load():
+    df = ds.load('quarterbacks_weighted')
+    compact = ds.load('quarterbacks_weighted', compact = True)
+
+    assert compact.memory_usage(deep = True).sum() < df.memory_usage(deep = True).sum() / 2
+    assert (compact['name'] == df['name']).all()
+    assert (compact['weighted_yards'] == df['weighted_yards']).all()
+
+    # the model gives the same probability on either frame
+    qb = df.loc[0, 'name']
+    assert bayes.over_under(compact, qb, 250.5, 6, 280, log = False)[1] == \
+        bayes.over_under(df, qb, 250.5, 6, 280, log = False)[1]
+
+
+def test_fingerprint():
+    df = ds.load('quarterbacks_weighted')
+    version = ds.fingerprint(df, ['name', 'weighted_yards'])
+
+    assert ds.fingerprint(df.copy(deep = False), ['name', 'weighted_yards']) == version
+    assert ds.fingerprint(df.iloc[:-1], ['name', 'weighted_yards']) != version
+
+    changed = df.copy(deep = False)
+    changed['weighted_yards'] = changed['weighted_yards'] + 1
+    assert ds.fingerprint(changed, ['name', 'weighted_yards']) != version
@@ -0,0 +1,77 @@
+# testing the sorted ecdf index
+
+import pickle
+
+import numpy as np
+
+from src.statistics import statistical_functions as sf
+from src.statistics.ecdf import ECDFIndex
+import benchmarks.synthetic as syn
+
+rng = np.random.default_rng(0)
+
+# game logs with a column of averages that has nulls
+test_df = syn.player_logs(['alice', 'bob', 'carol'], 170)
+test_df['avg'] = np.where(rng.random(len(test_df)) < 0.1, np.nan, rng.normal(240, 30, size = len(test_df)))
+
+index = ECDFIndex(test_df)
+null_index = ECDFIndex(test_df, null = True)
+
+events = [('weighted_yards', op, value) for op in ('geq', 'g', 'eq', 'l', 'leq') for value in (180, 240.5, 300)]
+events.append(('weighted_yards', 'in_range', (200, 275)))
+
+
+def test_marginal():
+    for event in events:
+        assert sf.probability(test_df, event, index = index) == sf.probability(test_df, event)
+
+
+def test_conditional():
+    for player in ['alice', 'bob', 'carol', 'dave']:
+        for event in events:
+            conditions = [event, ('name', 'eq', player)]
+            assert sf.conditional_probability(test_df, conditions, index = index) == sf.conditional_probability(test_df, conditions)
+
+
+def test_null():
+    # columns with nulls are only indexed on the dropna frame
+    assert 'avg' not in index.columns
+    event = ('avg', 'geq', 250)
+    assert sf.probability(test_df, event, null = True, index = null_index) == sf.probability(test_df, event, null = True)
+
+
+def test_fallback():
+    assert index.lookup([('name', 'eq', 'alice')]) is None
+    assert index.lookup([('weighted_yards', 'geq', 200), ('avg', 'geq', 200)]) is None
+
+
+def test_other_frame():
+    # same length, different values: the index isn't used
+    other = test_df.assign(weighted_yards = test_df['weighted_yards'] + 100)
+    event = ('weighted_yards', 'geq', 240.5)
+    assert sf.probability(other, event, index = index) == sf.probability(other, event)
+
+    changed = test_df.copy(deep = False)
+    changed_index = ECDFIndex(changed)
+    changed['weighted_yards'] = changed['weighted_yards'] + 100
+    assert sf.probability(changed, event, index = changed_index) == sf.probability(changed, event)
+
+
+def test_query_batch():
+    query = sf.ProbabilityQuery(test_df, index = null_index)
+    query.conditional_probability([('avg', 'geq', 250), ('name', 'eq', 'bob')], null = True)
+    query.probability(('weighted_yards', 'l', 200), null = True)
+
+    assert query.run() == [sf.conditional_probability(test_df, [('avg', 'geq', 250), ('name', 'eq', 'bob')], null = True),
+                           sf.probability(test_df, ('weighted_yards', 'l', 200), null = True)]
+
+
+def test_pickled_with_frame():
+    built = ECDFIndex(test_df, group_column = 'name', columns = ['weighted_yards'])
+    frame, copy = pickle.loads(pickle.dumps((test_df, built)))
+
+    # the unpickled index answers for the unpickled frame, and not for the original
+    conditions = [('weighted_yards', 'geq', 250.5), ('name', 'eq', 'alice')]
+    assert copy.built_from(frame, conditions)
+    assert not copy.built_from(test_df, conditions)
+    assert copy.lookup(conditions) == built.lookup(conditions)
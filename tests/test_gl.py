@@ -0,0 +1,105 @@
+# testing incremental game log ingestion
+
+import os
+import shutil
+import pandas as pd
+import pytest
+
+import src.data.database_functions as db
+
+folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'raw')
+gl_table = 'gamelogs'
+table = 'defense_stats'
+
+
+@pytest.fixture
+def build(tmp_path, defense_database):
+    # game logs of a few quarterbacks, and the defenses they played
+    directory = tmp_path / 'quarterbacks'
+    directory.mkdir()
+    for filename in ['josh_allen_career.txt', 'brock_purdy_career.txt', 'geno_smith_career.txt']:
+        shutil.copy(os.path.join(folder, 'quarterbacks', filename), directory)
+
+    database = defense_database({year: year for year in range(2018, 2024)}, table)
+
+    return directory, database
+
+
+def test_unchanged_files_skipped(build, rows):
+    directory, database = build
+    first = db.create_gamelogs(directory, database, gl_table, table)
+    second = db.create_gamelogs(directory, database, gl_table, table)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert len(rows(database, f'SELECT * FROM {gl_table}_files')) == 3
+    assert (first['adjusted_yards'] == first['pass_yards'] * first['weight']).all()
+
+
+def test_changed_file_upserted(build, rows):
+    directory, database = build
+    db.create_gamelogs(directory, database, gl_table, table)
+    games = len(rows(database, f'SELECT * FROM {gl_table}'))
+
+    # a corrected game, and the last game dropped
+    path = directory / 'josh_allen_career.txt'
+    df = pd.read_csv(path)
+    df = df[df['Year'] == 2022]
+    df.loc[df.index[0], 'Yds'] = 999
+    allen = len(rows(database, f"SELECT * FROM {gl_table} WHERE name = 'josh allen'"))
+    df.iloc[:-1].to_csv(path, index = False)
+
+    db.create_gamelogs(directory, database, gl_table, table)
+    allen_df = rows(database, f"SELECT * FROM {gl_table} WHERE name = 'josh allen' ORDER BY year, week")
+
+    assert len(allen_df) == len(df) - 1
+    assert len(rows(database, f'SELECT * FROM {gl_table}')) == games - allen + len(df) - 1
+    assert allen_df['pass_yards'].iloc[0] == 999
+    assert allen_df['adjusted_yards'].iloc[0] == 999 * allen_df['weight'].iloc[0]
+
+
+def test_removed_file_deleted(build, rows):
+    directory, database = build
+    db.create_gamelogs(directory, database, gl_table, table)
+
+    os.remove(directory / 'brock_purdy_career.txt')
+    df = db.create_gamelogs(directory, database, gl_table, table)
+
+    assert 'brock purdy' not in set(df['name'])
+    assert len(rows(database, f'SELECT * FROM {gl_table}_files')) == 2
+
+
+def test_unique_games(build, rows):
+    directory, database = build
+    db.create_gamelogs(directory, database, gl_table, table)
+
+    # the same games under a second file name belong to the file read last
+    shutil.copy(directory / 'geno_smith_career.txt', directory / 'geno_smith_copy.txt')
+    db.create_gamelogs(directory, database, gl_table, table)
+
+    df = rows(database, f"SELECT * FROM {gl_table}")
+    assert not df.duplicated(['qb_id', 'year', 'week']).any()
+
+
+def test_shared_games_kept(build, rows):
+    directory, database = build
+    db.create_gamelogs(directory, database, gl_table, table)
+    games = rows(database, f"SELECT * FROM {gl_table} ORDER BY qb_id, year, week")
+
+    # the copy is read last and takes over the games, removing it gives them back to the original
+    shutil.copy(directory / 'geno_smith_career.txt', directory / 'geno_smith_copy.txt')
+    db.create_gamelogs(directory, database, gl_table, table)
+    os.remove(directory / 'geno_smith_copy.txt')
+    db.create_gamelogs(directory, database, gl_table, table)
+
+    pd.testing.assert_frame_equal(rows(database, f"SELECT * FROM {gl_table} ORDER BY qb_id, year, week"), games)
+
+    # a changed copy keeps only some of the games, the original gets the rest back
+    shutil.copy(directory / 'geno_smith_career.txt', directory / 'geno_smith_copy.txt')
+    db.create_gamelogs(directory, database, gl_table, table)
+    copy = pd.read_csv(directory / 'geno_smith_copy.txt')
+    copy.iloc[:5].to_csv(directory / 'geno_smith_copy.txt', index = False)
+    db.create_gamelogs(directory, database, gl_table, table)
+
+    after = rows(database, f"SELECT * FROM {gl_table} ORDER BY qb_id, year, week")
+    assert len(after) == len(games)
+    assert (after['source'] == 'geno_smith_copy.txt').sum() == 5
@@ -0,0 +1,34 @@
+# testing the targeted html table extraction
+
+import numpy as np
+
+import src.data.html_tables as ht
+
+page = '''<html><body>
+<table id="other"><tbody><tr><td data-stat="team">Wrong</td></tr></tbody></table>
+<!--
+<table class="stats_table" id="team_stats">
+<thead><tr><th data-stat="team">Tm</th><th data-stat="pass_yds">Yds</th></tr></thead>
+<tbody>
+<tr><th data-stat="ranker">1</th><td data-stat="team"><a href="/teams/gnb/">Green Bay &amp; Co</a></td><td data-stat="pass_yds">3,263</td><td data-stat="g">17</td></tr>
+<tr class="thead"><th data-stat="team">Tm</th><th data-stat="pass_yds">Yds</th></tr>
+<tr><th data-stat="ranker">2</th><td data-stat="team">Detroit Lions</td><td data-stat="pass_yds"></td><td data-stat="g">17</td></tr>
+</tbody>
+<tfoot><tr><td data-stat="team">League Total</td><td data-stat="pass_yds">6000</td></tr></tfoot>
+</table>
+-->
+</body></html>'''
+
+
+def test_extract_table():
+    df = ht.extract_table(page, 'team_stats', {'team': 'team', 'pass_yds': 'yards'}, numeric = ('yards',))
+
+    assert list(df.columns) == ['team', 'yards']
+    assert df['team'].tolist() == ['Green Bay & Co', 'Detroit Lions']
+    assert df['yards'][0] == 3263
+    assert np.isnan(df['yards'][1])
+
+
+def test_aliases():
+    df = ht.extract_table(page, 'team_stats', {('team_name', 'team'): 'team'})
+    assert len(df) == 2
@@ -0,0 +1,63 @@
+# testing the rate limited http client
+
+import time
+
+import src.data.http_client as hc
+
+
+class Response:
+
+    def __init__(self, status_code, headers = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class Session:
+    # replays a list of status codes, recording when each request was made
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.times = []
+
+    def get(self, url, headers = None, timeout = None):
+        self.times.append(time.monotonic())
+        status = self.statuses.pop(0)
+        return Response(status, {'Retry-After': '0'} if status == 429 else {})
+
+
+def client(statuses, **kwargs):
+    test_client = hc.Client(**kwargs)
+    test_client._session = Session(statuses)
+    return test_client
+
+
+def test_rate_limit():
+    test_client = client([200] * 4, interval = 0.05, backoff = 0)
+    for _ in range(4):
+        test_client.get('http://localhost/page')
+    gaps = [b - a for a, b in zip(test_client._session.times, test_client._session.times[1:])]
+    assert min(gaps) >= 0.045
+
+
+def test_retries():
+    test_client = client([429, 503, 200], interval = 0, backoff = 0)
+    assert test_client.get('http://localhost/page').status_code == 200
+    assert len(test_client._session.times) == 3
+
+
+def test_retries_exhausted():
+    test_client = client([503, 503], interval = 0, backoff = 0, retries = 1)
+    try:
+        test_client.get('http://localhost/page')
+        assert False
+    except RuntimeError as error:
+        assert error.args == (503,)
+
+
+def test_retry_after():
+    assert hc.retry_after(Response(429, {'Retry-After': '7'})) == 7
+    assert hc.retry_after(Response(429)) is None
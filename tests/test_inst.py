@@ -0,0 +1,138 @@
+# testing pipeline and model instrumentation
+
+import sys
+import json
+import subprocess
+import urllib.request
+
+import numpy as np
+import pytest
+
+import src.instrumentation as inst
+from src.data.datasets import ROOT_DIR
+import src.statistics.bayes as bayes
+import src.statistics.slate as sl
+import benchmarks.synthetic as syn
+
+test_df = syn.player_logs(['alice', 'bob', 'carol'], 60, seed = 11)
+
+slate = [('alice', 230.5, 4, 210), ('bob', 240.5, 6, 265), ('carol', 255.5, 6, 250)]
+
+
+@pytest.fixture
+def enabled():
+    inst.reset()
+    inst.enable()
+    yield
+    inst.disable()
+    inst.reset()
+
+
+def test_disabled():
+    inst.reset()
+    with inst.span('stage') as stage:
+        stage.rows = 10
+    bayes.over_under(test_df.copy(), *slate[0], log = False)
+
+    assert inst.records() == []
+
+
+def test_nested(enabled):
+    with inst.span('pipeline'):
+        with inst.span('read', rows = 5):
+            pass
+        with inst.span('write') as stage:
+            stage.rows = 3
+
+    records = {record['stage']: record for record in inst.records()}
+    assert set(records) == {'pipeline', 'pipeline/read', 'pipeline/write'}
+    assert records['pipeline/read']['rows'] == 5 and records['pipeline/write']['rows'] == 3
+    assert records['pipeline']['wall'] >= records['pipeline/read']['wall'] + records['pipeline/write']['wall']
+
+
+def test_memory():
+    inst.reset()
+    inst.enable(memory = True)
+    try:
+        with inst.span('outer'):
+            with inst.span('allocate'):
+                block = bytearray(8_000_000)
+            del block
+        records = {record['stage']: record for record in inst.records()}
+    finally:
+        inst.disable()
+        inst.reset()
+
+    # the outer span's peak includes its children
+    assert records['outer/allocate']['peak_traced'] >= 8_000_000
+    assert records['outer']['peak_traced'] >= records['outer/allocate']['peak_traced']
+
+
+@pytest.mark.skipif(inst.resource is None, reason = 'no resource module')
+def test_rss(enabled):
+    with inst.span('allocate'):
+        block = np.ones(64_000_000 // 8)
+    del block
+    with inst.span('idle'):
+        pass
+    records = {record['stage']: record for record in inst.records()}
+
+    # the high-water mark stays with the process, a stage's growth is only what it added after the last stage
+    assert records['idle']['max_rss'] >= records['allocate']['max_rss']
+    assert 0 <= records['idle']['rss_growth'] <= records['idle']['max_rss'] - records['allocate']['max_rss']
+    assert records['allocate']['rss_growth'] >= 0
+    assert 'rss_growth' in inst.summary().columns
+
+
+def test_records_bounded(enabled):
+    inst.extend({'stage': 'stage', 'wall': 0.0, 'cpu': 0.0, 'rows': i} for i in range(inst.MAX_RECORDS + 10))
+
+    # the oldest spans are dropped
+    records = inst.records()
+    assert len(records) == inst.MAX_RECORDS
+    assert records[0]['rows'] == 10
+
+
+def test_no_http_on_import():
+    code = 'import sys, src.statistics.statistical_functions; print("http.server" in sys.modules)'
+    output = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True, check = True,
+                            cwd = ROOT_DIR)
+    assert output.stdout.strip() == 'False'
+
+
+def test_over_under_stages(enabled):
+    bayes.over_under(test_df.copy(), *slate[0], log = False)
+    table = inst.summary()
+
+    assert table['stage'].iloc[0] == 'over_under'
+    assert 'over_under/last_n_avg' in set(table['stage'])
+    assert table.loc[table['stage'] == 'over_under/last_n_avg', 'rows'].iloc[0] == len(test_df)
+
+
+def test_slate_workers(enabled):
+    results = sl.run_slate(slate, test_df, processes = 2)
+    stages = results.attrs['stages'].set_index('stage')
+
+    # every prop was evaluated in a worker, whose spans came back with the results
+    assert stages.loc['run_slate/project_line', 'calls'] == len(slate)
+    assert len({record['pid'] for record in inst.records()}) > 1
+
+
+def test_exports(enabled, tmp_path):
+    with inst.span('stage', rows = 2):
+        pass
+
+    path = tmp_path / 'stages.jsonl'
+    inst.export_jsonl(str(path))
+    assert json.loads(path.read_text())['stage'] == 'stage'
+
+    server = inst.serve(port = 0)
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+        text = urllib.request.urlopen(url).read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert text == inst.prometheus()
+    assert 'stage_rows_total{stage="stage"} 2' in text
@@ -0,0 +1,97 @@
+# testing the background model run log
+
+import json
+import queue
+
+import pandas as pd
+import pytest
+
+import src.data.datasets as ds
+import src.statistics.model_log as ml
+import src.statistics.slate as sl
+import src.statistics.bayes as bayes
+import benchmarks.synthetic as syn
+
+test_df = syn.player_logs(['alice', 'bob', 'carol'], 60, seed = 5)
+
+slate = [('alice', 230.5, 4, 210), ('bob', 240.5, 6, 265), ('carol', 255.5, 6, 250)]
+
+
+@pytest.fixture
+def run_log(tmp_path):
+    path = tmp_path / 'runs.jsonl'
+    ml.configure(str(path))
+    yield path
+    ml.configure()
+
+
+def runs(path):
+    ml.flush()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_one_line_per_run(run_log):
+    for prop in slate:
+        bayes.over_under(test_df.copy(), *prop)
+
+    records = runs(run_log)
+    assert [record['name'] for record in records] == [prop[0] for prop in slate]
+    assert records[0]['rows'] == len(test_df) and 'frame' not in records[0]
+
+
+def test_frame_sample(tmp_path):
+    path = tmp_path / 'runs.jsonl'
+    ml.configure(str(path), frame_sample = 1)
+    try:
+        df, probability = bayes.over_under(test_df.copy(), *slate[0])
+        record = runs(path)[0]
+    finally:
+        ml.configure()
+
+    assert record['odds_hits_over'] in (probability, 1 - probability)
+    pd.testing.assert_frame_equal(ds.read_frame(record['frame']), df)
+    assert not list(tmp_path.glob('frames/*.pkl'))
+
+
+def test_frames_rotate_out(tmp_path):
+    path = tmp_path / 'runs.jsonl'
+    ml.configure(str(path), frame_sample = 1, max_bytes = 2000, backups = 1)
+    try:
+        for _ in range(6):
+            for prop in slate:
+                bayes.over_under(test_df.copy(), *prop)
+        ml.flush()
+    finally:
+        ml.configure()
+
+    kept = [json.loads(line)['frame'] for log in (path, tmp_path / 'runs.jsonl.1')
+            for line in log.read_text().splitlines()]
+
+    # the frames of runs still in the log are there, the rest went with the file they rotated out in
+    assert len(kept) < 6 * len(slate)
+    assert sorted(str(frame) for frame in tmp_path.glob('frames/*.npz')) == sorted(frame + '.npz' for frame in kept)
+
+
+def test_slate_workers(run_log):
+    sl.run_slate(slate, test_df, processes = 2, log = True)
+
+    # the workers hand their runs back, so every run is written once by this process
+    assert sorted(record['name'] for record in runs(run_log)) == sorted(prop[0] for prop in slate)
+
+
+def test_full_queue_drops():
+    handler = ml.DroppingQueueHandler(queue.Queue(1))
+    record = ml._logger.makeRecord(ml._logger.name, 20, __file__, 0, {'run': 1}, None, None)
+
+    handler.handle(record)
+    handler.handle(record)
+
+    assert handler.dropped == 1
+
+
+def test_stop_writes_queued(run_log):
+    for prop in slate:
+        ml.log_run({'name': prop[0]})
+    ml.stop()
+
+    assert len([json.loads(line) for line in run_log.read_text().splitlines()]) == len(slate)
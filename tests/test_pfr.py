@@ -0,0 +1,99 @@
+# testing the scrapers end to end against the local pro football reference stand-in
+
+import pandas as pd
+import pytest
+import requests
+
+import src.data.http_client as hc
+import src.data.response_cache as rc
+import src.data.webscraping_functions as wf
+from pfr_server import PFRServer, DEFENSE_DIR, rendered_pages
+
+years = range(2015, 2025)
+pages = rendered_pages(years)
+
+
+@pytest.fixture(autouse = True)
+def cache(tmp_path, monkeypatch):
+    response_cache = rc.ResponseCache(str(tmp_path))
+    monkeypatch.setattr(rc, 'default_cache', lambda: response_cache)
+
+
+def client(**kwargs):
+    settings = {'interval': 0, 'backoff': 0.01, 'max_connections': 2, **kwargs}
+    return hc.Client(**settings)
+
+
+def test_scrape_def():
+    with PFRServer(pages) as server:
+        df = wf.scrape_def(2020, client = client(), base_url = server.url)
+
+    defense = pd.read_csv(f'{DEFENSE_DIR}/2020_nfl_defense_data.txt')
+
+    # every column of the table, as in the raw defense files
+    pd.testing.assert_frame_equal(df, defense, check_dtype = False)
+
+
+def test_scrape_def_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(wf.ds, 'CACHE_DIR', str(tmp_path))
+    raw = open(f'{DEFENSE_DIR}/2020_nfl_defense_data.txt').read()
+
+    with PFRServer(pages) as server:
+        df = wf.scrape_def(2020, cache = True, client = client(), base_url = server.url)
+
+    # the table goes to the cache folder, the tracked raw file is left alone
+    pd.testing.assert_frame_equal(pd.read_csv(wf.defense_cache_path(2020)), df, check_dtype = False)
+    assert open(f'{DEFENSE_DIR}/2020_nfl_defense_data.txt').read() == raw
+
+
+def test_scrape_pass():
+    with PFRServer(pages) as server:
+        df = wf.scrape_pass(2024, client = client(), base_url = server.url, refresh = True)
+        again = wf.scrape_pass(2024, client = client(), base_url = server.url, refresh = True)
+
+    assert len(df) == 70
+    assert df['team'].eq('Green Bay Packers').all()
+
+    # the cached page is revalidated with its etag
+    pd.testing.assert_frame_equal(df, again)
+    assert server.statuses() == [200, 304]
+
+
+def test_rebuild_concurrency():
+    with PFRServer(pages, latency = 0.02) as server:
+        seasons = dict(wf.scrape_many(years, max_workers = 8, client = client(max_connections = 3),
+                                      base_url = server.url))
+
+    # every season arrives, and the client never has more than its cap in flight
+    assert sorted(seasons) == list(years)
+    assert all(len(df) == 32 for df in seasons.values())
+    assert 1 < server.max_in_flight <= 3
+
+
+def test_retry_after():
+    path = '/years/2020/opp.htm'
+    with PFRServer(pages, failures = {path: [429, 503]}, retry_after = 0.2) as server:
+        df = wf.scrape_def(2020, client = client(), base_url = server.url)
+        log = list(server.log)
+
+    assert len(df) == 32
+    assert [status for _, _, status in log] == [429, 503, 200]
+
+    # the server's Retry-After is waited out before the next attempt
+    assert log[1][0] - log[0][0] >= 0.2
+
+
+def test_rate_limit():
+    with PFRServer(pages, rate_limit = (3, 0.3), retry_after = 0.3) as server:
+        seasons = dict(wf.scrape_many(years[:6], max_workers = 6, client = client(), base_url = server.url))
+
+    assert len(seasons) == 6
+    assert 429 in server.statuses()
+
+
+def test_errors_exhausted():
+    with PFRServer(pages, error_rate = 1) as server:
+        with pytest.raises(requests.HTTPError):
+            wf.scrape_def(2020, client = client(retries = 2), base_url = server.url)
+
+    assert server.statuses() == [503] * 3
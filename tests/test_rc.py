@@ -0,0 +1,106 @@
+# testing the on-disk response cache and offline replay
+
+import os
+
+import pandas as pd
+import pytest
+
+import src.data.response_cache as rc
+import src.data.webscraping_functions as wf
+import pfr_pages
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+defense = pd.read_csv(os.path.join(ROOT_DIR, 'data', 'raw', 'defense', '2022_nfl_defense_data.txt'))
+
+
+class Response:
+
+    def __init__(self, status_code, content = b'', headers = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class Client:
+    # serves one page with an etag, answering conditional requests with 304
+
+    def __init__(self, body: str):
+        self.body = body.encode()
+        self.requests = []
+
+    def get(self, url, headers = None):
+        self.requests.append(headers or {})
+        if (headers or {}).get('If-None-Match') == '"v1"':
+            return Response(304)
+        return Response(200, self.body, {'ETag': '"v1"'})
+
+
+def replay(monkeypatch, directory):
+    # the shared cache replays pages from directory, and is put back after the test
+    monkeypatch.setattr(rc, 'default_cache', lambda: rc.ResponseCache(str(directory), offline = True))
+
+
+def test_conditional_request(tmp_path):
+    cache = rc.ResponseCache(str(tmp_path))
+    client = Client('<html>page</html>')
+
+    assert cache.fetch('https://example.com/a', client) == '<html>page</html>'
+    assert cache.fetch('https://example.com/a', client) == '<html>page</html>'
+    assert client.requests[1] == {'If-None-Match': '"v1"'}
+
+    # pages that don't need refreshing never reach the client
+    cache.fetch('https://example.com/a', client, refresh = False)
+    assert len(client.requests) == 2
+
+
+def test_offline(tmp_path):
+    rc.ResponseCache(str(tmp_path)).fetch('https://example.com/a', Client('<html>page</html>'))
+    offline = rc.ResponseCache(str(tmp_path), offline = True)
+
+    assert offline.fetch('https://example.com/a') == '<html>page</html>'
+    with pytest.raises(LookupError):
+        offline.fetch('https://example.com/b')
+
+
+@pytest.mark.parametrize('commented', [False, True])
+def test_scrape_def_replay(tmp_path, monkeypatch, commented):
+    url = 'https://www.pro-football-reference.com/years/2022/opp.htm'
+    rc.ResponseCache(str(tmp_path)).fetch(url, Client(pfr_pages.defense_page(defense.values.tolist(), commented)))
+
+    replay(monkeypatch, tmp_path)
+    df = wf.scrape_def(2022)
+
+    assert len(df) == 32
+    assert df['Tm'].tolist() == defense['Tm'].tolist()
+    assert df['Yds.1'].tolist() == defense['Yds.1'].tolist()
+
+
+def test_scrape_pass_replay(tmp_path, monkeypatch):
+    rows = [{'name': f'Player {i}', 'team': 'GNB', 'games': 17, 'pass_yards': 3000 + i} for i in range(45)]
+    url = 'https://www.pro-football-reference.com/years/2024/passing.htm'
+    rc.ResponseCache(str(tmp_path)).fetch(url, Client(pfr_pages.passing_page(rows)))
+
+    replay(monkeypatch, tmp_path)
+    df = wf.scrape_pass(2024)
+
+    # the repeated header row is skipped
+    assert len(df) == 45
+    assert df['name'][0] == 'player 0'
+    assert df['team'][0] == 'Green Bay Packers'
+    assert df['pass_yards'].sum() == sum(row['pass_yards'] for row in rows)
+
+
+def test_parsed_without_pickle(tmp_path, monkeypatch):
+    monkeypatch.setattr(wf.ds, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(wf, '_parsed', {})
+    table = pfr_pages.defense_page(defense.values.tolist())
+
+    first = wf.parsed(table, wf.parse_def)
+    assert sorted(path.suffix for path in (tmp_path / 'parsed').iterdir()) == ['.json', '.npz']
+
+    # a fresh process reads the stored arrays instead of parsing again
+    def parse_def(table):
+        pytest.fail('parsed again')
+
+    monkeypatch.setattr(wf, '_parsed', {})
+    pd.testing.assert_frame_equal(wf.parsed(table, parse_def), first)
@@ -0,0 +1,83 @@
+# testing the database schema and connection settings
+
+import copy
+
+import pytest
+
+import src.data.schema as schema
+
+
+def test_connection_settings(tmp_path):
+    conn = schema.connect(str(tmp_path / 'test.db'))
+
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1
+    assert conn.execute('PRAGMA temp_store').fetchone()[0] == 2
+    conn.close()
+
+
+def test_created_with_indexes(tmp_path):
+    conn = schema.connect(str(tmp_path / 'test.db'))
+
+    assert schema.ensure(conn, 'gamelogs')
+    assert not schema.ensure(conn, 'gamelogs')
+
+    indexes = {row[1] for row in conn.execute('PRAGMA index_list(gamelogs)')}
+    assert {'gamelogs_defense', 'gamelogs_name', 'gamelogs_source'} <= indexes
+
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM gamelogs WHERE defense_id = 'x'").fetchall()
+    assert 'gamelogs_defense' in plan[0][3]
+    conn.close()
+
+
+def test_legacy_table_rebuilt(tmp_path):
+    conn = schema.connect(str(tmp_path / 'test.db'))
+
+    # a game log table written by pandas, without keys, holding the same game twice
+    conn.execute('CREATE TABLE gamelogs (qb_id TEXT, year INT, week INT, team TEXT, pass_yards REAL)')
+    conn.executemany('INSERT INTO gamelogs VALUES (?, ?, ?, ?, ?)',
+                     [('a', 2023, 1, 'Detroit Lions', 100.0), ('a', 2023, 1, 'Detroit Lions', 120.0),
+                      ('a', 2023, 2, 'Detroit Lions', 80.0), ('b', 2023, 1, None, 50.0)])
+    conn.commit()
+
+    assert not schema.ensure(conn, 'gamelogs')
+
+    rows = conn.execute('SELECT qb_id, week, pass_yards, source FROM gamelogs ORDER BY week').fetchall()
+    assert rows == [('a', 1, 120.0, None), ('a', 2, 80.0, None)]
+    assert conn.execute("SELECT version FROM schema_versions WHERE name = 'gamelogs'").fetchone()[0] == 1
+    conn.close()
+
+
+def test_version_bump_migrates(tmp_path, monkeypatch):
+    conn = schema.connect(str(tmp_path / 'test.db'))
+    schema.ensure(conn, 'gamelog_files', 'files')
+    conn.execute("INSERT INTO files VALUES ('a.txt', 10, 1, 'abc')")
+    conn.commit()
+
+    tables = copy.deepcopy(schema.TABLES)
+    tables['gamelog_files']['version'] = 2
+    tables['gamelog_files']['create'] = 'CREATE TABLE {table} (path TEXT PRIMARY KEY, size INTEGER, sha256 TEXT, rows INTEGER)'
+    monkeypatch.setattr(schema, 'TABLES', tables)
+
+    schema.ensure(conn, 'gamelog_files', 'files')
+
+    assert conn.execute('SELECT * FROM files').fetchall() == [('a.txt', 10, 'abc', None)]
+    conn.close()
+
+
+def test_migration_without_required_column(tmp_path):
+    conn = schema.connect(str(tmp_path / 'test.db'))
+
+    # a legacy game log table without the week the template requires
+    conn.execute('CREATE TABLE gamelogs (qb_id TEXT, year INT, team TEXT)')
+    conn.execute("INSERT INTO gamelogs VALUES ('a', 2023, 'Detroit Lions')")
+    conn.commit()
+
+    with pytest.raises(ValueError):
+        schema.ensure(conn, 'gamelogs')
+
+    # the rows are kept, and the table is still unversioned
+    assert conn.execute('SELECT * FROM gamelogs').fetchall() == [('a', 2023, 'Detroit Lions')]
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'gamelogs_rebuilt'").fetchone() is None
+    assert conn.execute("SELECT version FROM schema_versions WHERE name = 'gamelogs'").fetchone() is None
+    conn.close()
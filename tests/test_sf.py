@@ -6,6 +6,7 @@ import pandas as pd
 import numpy as np
 
 from src.statistics import statistical_functions as sf
+import src.data.datasets as ds
 
 test_data = {
     'Name': ['Alice', 'Bob', 'Charlie', 'David', 'Eve'],
@@ -51,3 +52,53 @@ def test_bayes():
     # what are the odds, based on historical data, that this team is the worst in a four team league
     assert sf.bayes(test_df_3, [('d_rank', 'eq', 4), ('yards', 'geq', 170)]) == 0.5 
 
+
+def test_condition_mask():
+    mask = sf.condition_mask(test_df, ('Age', 'in_range', (22, 27)))
+    assert mask.tolist() == [True, True, False, True, False]
+    assert np.count_nonzero(~mask | sf.condition_mask(test_df, ('Name', 'eq', 'Eve'))) == 2
+
+def test_joint_probability_many():
+    events = [('Age', 'geq', 22), ('Age', 'l', 30), ('Name', 'eq', 'Alice')]
+    assert sf.joint_probability(test_df, events) == 0.2
+
+def test_probability_query():
+    query = sf.ProbabilityQuery(test_df)
+    query.probability(('Name', 'eq', 'David'))
+    query.conditional_probability([('Name', 'eq', 'David'), ('Age', 'leq', 25)])
+    query.joint_probability([('Name', 'eq', 'Bob'), ('Age', 'l', 25)])
+    query.conditional_probability([('Name', 'eq', 'Bob'), ('Age', 'g', 40)])
+    assert query.run() == [0.2, 1 / 3, 0, 0]
+
+
+def test_categorical_equality():
+    names = pd.Series(['alice', 'bob', 'alice', 'carol'])
+    df = pd.DataFrame({'name': names.astype('category')})
+
+    assert (sf.condition_mask(df, ('name', 'eq', 'alice')) == (names == 'alice').to_numpy()).all()
+    assert not sf.condition_mask(df, ('name', 'eq', 'dave')).any()
+
+    df.loc[1, 'name'] = None
+    with pytest.raises(ValueError):
+        sf.condition_mask(df, ('name', 'eq', 'alice'))
+
+
+def test_date_equality():
+    df = ds.load('quarterbacks_weighted')
+    compact = ds.load('quarterbacks_weighted', compact = True)
+
+    # the string of the csv matches the parsed date
+    expected = sf.condition_mask(df, ('Date', 'eq', '2008-09-08'))
+    assert expected.any()
+    assert (sf.condition_mask(compact, ('Date', 'eq', '2008-09-08')) == expected).all()
+
+
+def test_date_comparison():
+    df = ds.load('quarterbacks_weighted')
+    compact = ds.load('quarterbacks_weighted', compact = True)
+
+    for event in [('Date', 'geq', '2020-01-01'), ('Date', 'l', '2010-09-13'),
+                  ('Date', 'in_range', ('2015-09-01', '2016-02-07'))]:
+        expected = sf.condition_mask(df, event)
+        assert expected.any()
+        assert (sf.condition_mask(compact, event) == expected).all()
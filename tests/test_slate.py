@@ -0,0 +1,46 @@
+# testing slate mode
+
+import pandas as pd
+
+import src.statistics.bayes as bayes
+import src.statistics.slate as sl
+import benchmarks.synthetic as syn
+
+test_df = syn.player_logs(['alice', 'bob', 'carol', 'dave', 'erin'], 80, seed = 3)
+
+slate = [
+    ('carol', 255.5, 6, 280),
+    ('alice', 230.5, 4, 210),
+    ('erin', 255.5, 6, 250),
+    ('bob', 240.5, 8, 265),
+]
+
+
+def expected():
+    return [bayes.over_under(test_df.copy(), *prop, log = False)[1] for prop in slate]
+
+
+def test_slate_in_process():
+    results = sl.run_slate(slate, test_df, processes = 1)
+    assert results['qb'].tolist() == [prop[0] for prop in slate]
+    assert results['probability'].tolist() == expected()
+
+
+def test_slate_pool():
+    results = sl.run_slate(pd.DataFrame(slate, columns = sl.SLATE_COLUMNS), test_df, processes = 2)
+    assert results['probability'].tolist() == expected()
+
+
+def test_slate_leaves_input():
+    sl.run_slate(slate, test_df, processes = 1)
+    assert list(test_df.columns) == ['name', 'weighted_yards']
+
+
+def test_shared_line_index():
+    frames = sl.prepare_frames(test_df.copy(), slate)
+
+    # only the line two props share gets an index, built on a frame holding that line's categories
+    assert [key for key in frames if isinstance(key, tuple)] == [(6, 255.5)]
+    frame, index = frames[(6, 255.5)]
+    assert index.built_from(frame, [('category', 'eq', 'over')])
+    assert 'category' not in frames[6].columns
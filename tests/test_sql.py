@@ -0,0 +1,79 @@
+# testing probability queries answered by sqlite
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.statistics import statistical_functions as sf
+from src.statistics.sqlite_table import SQLiteTable
+import benchmarks.synthetic as syn
+
+rng = np.random.default_rng(3)
+
+# game logs shaped like the gamelogs table, with a column of averages that has nulls
+test_df = syn.player_logs(['alice', 'bob', 'carol'], 135, seed = 3).rename(columns = {'weighted_yards': 'adjusted_yards'})
+test_df['opp_rank'] = rng.integers(1, 33, size = len(test_df))
+test_df['avg'] = np.where(rng.random(len(test_df)) < 0.1, np.nan, rng.normal(240, 30, size = len(test_df)))
+
+conditions = [
+    [('adjusted_yards', 'geq', 250.5)],
+    [('adjusted_yards', 'geq', 250.5), ('name', 'eq', 'bob')],
+    [('opp_rank', 'in_range', [1, 10]), ('adjusted_yards', 'l', 200), ('name', 'eq', 'carol')],
+    [('adjusted_yards', 'g', 240), ('name', 'eq', 'nobody')],
+]
+
+
+@pytest.fixture
+def table(tmp_path):
+    database = str(tmp_path / 'quarterback.db')
+    with sqlite3.connect(database) as conn:
+        test_df.to_sql('gamelogs', conn, index = False)
+        conn.execute('CREATE INDEX gamelogs_name ON gamelogs (name)')
+    conn.close()
+
+    with SQLiteTable(database, 'gamelogs') as gamelogs:
+        yield gamelogs
+
+
+def test_matches_dataframe(table):
+    frame = test_df.drop(columns = 'avg')
+
+    for events in conditions:
+        assert sf.conditional_probability(table, events) == pytest.approx(sf.conditional_probability(frame, events))
+        assert sf.joint_probability(table, events) == pytest.approx(sf.joint_probability(frame, events))
+
+    assert sf.probability(table, ('opp_rank', 'leq', 8)) == pytest.approx(sf.probability(frame, ('opp_rank', 'leq', 8)))
+
+
+def test_null_rows_dropped(table):
+    events = [('avg', 'geq', 250), ('name', 'eq', 'alice')]
+
+    with pytest.raises(ValueError):
+        sf.conditional_probability(table, events)
+
+    assert sf.conditional_probability(table, events, null = True) == \
+        pytest.approx(sf.conditional_probability(test_df, events, null = True))
+
+
+def test_query_batch(table):
+    query = sf.ProbabilityQuery(table)
+    frame_query = sf.ProbabilityQuery(test_df)
+
+    for batch in (query, frame_query):
+        batch.conditional_probability(conditions[1], null = True)
+        batch.probability(('adjusted_yards', 'geq', np.float64(250.5)))
+        batch.joint_probability(conditions[2])
+
+    assert query.run() == pytest.approx(frame_query.run())
+
+
+def test_identifiers_checked(table):
+    with pytest.raises(ValueError):
+        sf.probability(table, ('adjusted_yards; DROP TABLE gamelogs', 'geq', 1))
+
+    with pytest.raises(ValueError):
+        SQLiteTable(table.database, 'passing')
+
+    # values are parameters, not sql
+    assert sf.probability(table, ('name', 'eq', "alice' OR '1' = '1")) == 0
@@ -0,0 +1,41 @@
+# testing the synthetic league used by the benchmarks
+
+import pandas as pd
+
+import src.data.datasets as ds
+import src.data.database_functions as db
+import benchmarks.synthetic as syn
+import benchmarks.bench_suite as bench
+
+
+def test_league_shape():
+    real = ds.load('quarterbacks_weighted')
+    df = syn.league(5000, seed = 1)
+
+    assert len(df) == 5000
+    assert list(df.columns) == list(real.columns)
+    assert (df.dtypes == real.dtypes).all()
+    pd.testing.assert_frame_equal(df, syn.league(5000, seed = 1))
+
+
+def test_gamelogs_join(tmp_path):
+    database = str(tmp_path / 'test.db')
+    for year in range(syn.FIRST_YEAR, syn.LAST_YEAR + 1):
+        db.add_defense(database, 'defense_stats', year, syn.defense_season(year))
+    db.calculate_weights(database, 'defense_stats')
+
+    syn.write_gamelogs(str(tmp_path / 'gamelogs'), 600)
+    df = db.create_gamelogs(str(tmp_path / 'gamelogs'), database, 'gamelogs', 'defense_stats')
+
+    # every game finds its opponent's defense
+    assert len(df) == 600
+    assert (df['opp_rank'] > 0).all()
+
+
+def test_compare():
+    baseline = {'case/1000': {'seconds': 1.0, 'peak_bytes': 100}}
+
+    assert bench.compare({'case/1000': {'seconds': 1.4, 'peak_bytes': 100}}, baseline) == []
+    assert bench.compare({'case/1000': {'seconds': 1.6, 'peak_bytes': 100}}, baseline) == ['case/1000']
+    assert bench.compare({'case/1000': {'seconds': 1.0, 'peak_bytes': 200}}, baseline) == ['case/1000']
+    assert bench.compare({'other/1000': {'seconds': 9.0, 'peak_bytes': 900}}, baseline) == []
@@ -1,13 +1,136 @@
+import os
+import pandas as pd
+import pytest
 
+import src.data.hash as hs
+import src.data.database_functions as db
 import src.data.update_db_functions as uf
 
 # initialize entire database, and then write all these functions
 # write tests to ensure that the database is always proper before any of this
 # maybe create a database schema
 
+folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'raw', 'defense')
+gl_table = 'gamelogs'
+agg_table = 'agg_passing_stats'
 
-def test_table_created():
-    pass
 
-def test_rows():
-    pass
\ No newline at end of file
+def passing(rows):
+    # season to date totals, as returned by wf.scrape_pass
+    df = pd.DataFrame(rows, columns = ['name', 'team', 'games', 'pass_yards'])
+    df['qb_id'] = [hs.generate_key(position = 'quarterback', name = name) for name in df['name']]
+    return df
+
+
+@pytest.fixture
+def build(tmp_path, defense_database):
+    database = defense_database({2024: 2023})
+
+    # week 2 is a bye for the bills
+    schedule = tmp_path / 'schedule.txt'
+    pd.DataFrame({
+        'Week': [1, 1, 1, 1, 2, 2],
+        'team': ['Detroit Lions', 'Los Angeles Rams', 'Buffalo Bills', 'Arizona Cardinals', 'Detroit Lions', 'Tampa Bay Buccaneers'],
+        'opp': ['Los Angeles Rams', 'Detroit Lions', 'Arizona Cardinals', 'Buffalo Bills', 'Tampa Bay Buccaneers', 'Detroit Lions'],
+    }).to_csv(schedule)
+
+    week_1 = passing([('jared goff', 'Detroit Lions', 1, 216), ('josh allen', 'Buffalo Bills', 1, 232),
+                      ('matthew stafford', 'Los Angeles Rams', 1, 317), ('kyler murray', 'Arizona Cardinals', 0, 0)])
+    week_2 = passing([('jared goff', 'Detroit Lions', 2, 523), ('josh allen', 'Buffalo Bills', 1, 232),
+                      ('matthew stafford', 'Los Angeles Rams', 1, 317), ('kyler murray', 'Arizona Cardinals', 0, 0),
+                      ('baker mayfield', 'Tampa Bay Buccaneers', 1, 185)])
+
+    return database, schedule, week_1, week_2
+
+
+def test_table_created(build, rows):
+    database, schedule, week_1, _ = build
+    df = uf.update_gamelogs(database, gl_table, agg_table, schedule, 2024, 1, df = week_1)
+
+    # the quarterback who didn't play is left out
+    assert set(df['name']) == {'jared goff', 'josh allen', 'matthew stafford'}
+    assert (df['opp_rank'] > 0).all()
+    assert (df['adjusted_yards'] == df['pass_yards'] * df['weight']).all()
+    assert len(rows(database, f'SELECT * FROM {agg_table} WHERE week = 1')) == 4
+
+
+def test_rows(build, rows):
+    database, schedule, week_1, week_2 = build
+    uf.update_gamelogs(database, gl_table, agg_table, schedule, 2024, 1, df = week_1)
+    df = uf.update_gamelogs(database, gl_table, agg_table, schedule, 2024, 2, df = week_2)
+
+    # yards are the difference from last week, the bye and the idle quarterbacks are skipped
+    assert dict(zip(df['name'], df['pass_yards'])) == {'jared goff': 307, 'baker mayfield': 185}
+    assert dict(zip(df['name'], df['opponent'])) == {'jared goff': 'Tampa Bay Buccaneers', 'baker mayfield': 'Detroit Lions'}
+    assert len(rows(database, f'SELECT * FROM {gl_table}')) == 5
+
+
+def test_week_rerun(build, rows):
+    database, schedule, week_1, week_2 = build
+    uf.update_gamelogs(database, gl_table, agg_table, schedule, 2024, 1, df = week_1)
+    uf.update_gamelogs(database, gl_table, agg_table, schedule, 2024, 2, df = week_2)
+
+    # a stat correction, the week is replaced rather than appended
+    week_2.loc[week_2['name'] == 'jared goff', 'pass_yards'] = 530
+    df = uf.update_gamelogs(database, gl_table, agg_table, schedule, 2024, 2, df = week_2)
+
+    assert df.loc[df['name'] == 'jared goff', 'pass_yards'].iloc[0] == 314
+    assert len(rows(database, f'SELECT * FROM {gl_table}')) == 5
+
+
+def defense_week(week, bye = None):
+    # season to date defense totals after a week, as returned by wf.scrape_def
+    df = pd.read_csv(os.path.join(folder, '2023_nfl_defense_data.txt'))
+    games = pd.Series(week, index = df.index)
+    if bye is not None:
+        games[df['Tm'] == bye] = week - 1
+    df['Yds.1'] = (df['Yds.1'] * games / 17).round()
+    df['G'] = games
+    return df
+
+
+def test_update_defense(defense_database, rows):
+    database = defense_database({year: year for year in range(2020, 2023)})
+    history = db.calculate_weights(database, 'defense_stats')
+
+    uf.update_defense(database, 2024, 1, df = defense_week(1))
+    df = uf.update_defense(database, 2024, 2, df = defense_week(2, bye = 'Detroit Lions'))
+
+    # the week's own games and yards come from the difference with last week
+    lions = df.loc[df['team'] == 'Detroit Lions'].iloc[0]
+    assert lions['week_games'] == 0 and lions['week_yards'] == 0
+    assert (df.loc[df['team'] != 'Detroit Lions', 'week_games'] == 1).all()
+
+    # ranked by yards per game, weighted like finished seasons of the same rank
+    per_game = df['pyds_allowed'] / df['games']
+    assert (df['rank'] == per_game.rank(method = 'dense').astype(int)).all()
+    weights = history.groupby('rank')['weight'].first()
+    assert (df['weight'] - df['rank'].map(weights)).abs().max() < 1e-12
+
+    current = rows(database, 'SELECT * FROM defense_stats WHERE year = 2024')
+    assert len(current) == 32
+    assert set(zip(current['defense_id'], current['rank'])) == set(zip(df['defense_id'], df['rank']))
+
+
+def test_partial_season_kept_out_of_totals(defense_database, rows):
+    database = defense_database({year: year for year in range(2020, 2023)})
+    history = db.calculate_weights(database, 'defense_stats')
+
+    uf.update_defense(database, 2024, 1, df = defense_week(1))
+    after = db.calculate_weights(database, 'defense_stats')
+
+    # the season to date rows don't move the rank averages of finished seasons
+    assert rows(database, 'SELECT * FROM defense_stats_rank_totals WHERE year = 2024').empty
+    weights = after.loc[after['year'] != 2024].sort_values('defense_id').reset_index(drop = True)
+    pd.testing.assert_frame_equal(weights, history.sort_values('defense_id').reset_index(drop = True))
+
+    # a mid season add keeps the season out, the finished season is counted once it's added
+    db.add_defense(database, 'defense_stats', 2024, defense_week(2))
+    db.calculate_weights(database, 'defense_stats', 2024)
+    assert rows(database, 'SELECT * FROM defense_stats_rank_totals WHERE year = 2024').empty
+
+    db.add_defense(database, 'defense_stats', 2024, pd.read_csv(os.path.join(folder, '2023_nfl_defense_data.txt')),
+                   final = True)
+    db.calculate_weights(database, 'defense_stats', 2024)
+    assert len(rows(database, 'SELECT * FROM defense_stats_rank_totals WHERE year = 2024')) > 0
+    assert rows(database, 'SELECT * FROM defense_stats_in_progress').empty
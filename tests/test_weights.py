@@ -0,0 +1,53 @@
+# testing defensive weights, rebuilt and incremental
+
+import os
+import sqlite3
+import pandas as pd
+
+import src.data.database_functions as db
+
+folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'raw', 'defense')
+table = 'defense_stats'
+
+
+def add_seasons(database, years):
+    for year in years:
+        defense = pd.read_csv(os.path.join(folder, f'{year}_nfl_defense_data.txt'))
+        db.add_defense(database, table, year, defense)
+
+
+def test_weights(tmp_path):
+    database = str(tmp_path / 'test.db')
+    add_seasons(database, range(2018, 2024))
+    df = db.calculate_weights(database, table)
+
+    ranked_avg = df.groupby('rank')['pyds_allowed'].mean()
+    global_avg = df['pyds_allowed'].mean()
+    weights = global_avg / ranked_avg
+
+    assert (df['rank'].map(weights) == df['weight']).all()
+
+
+def test_incremental_matches_rebuild(tmp_path):
+    database = str(tmp_path / 'test.db')
+    add_seasons(database, range(2018, 2023))
+    db.calculate_weights(database, table)
+
+    add_seasons(database, [2023])
+    incremental = db.calculate_weights(database, table, year = 2023)
+    rebuilt = db.calculate_weights(database, table)
+
+    pd.testing.assert_frame_equal(incremental, rebuilt)
+    assert len(incremental) == 6 * 32
+
+
+def test_schema_kept(tmp_path):
+    database = str(tmp_path / 'test.db')
+    add_seasons(database, [2023])
+    db.calculate_weights(database, table)
+
+    conn = sqlite3.connect(database)
+    indexes = {row[1] for row in conn.execute(f'PRAGMA index_list({table})')}
+    conn.close()
+
+    assert {'defense_stats_year_rank', 'defense_stats_team'} <= indexes